@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from model_to_cnf import FileHandler, CNFConverter, Helper, specification_data
+from cardinality import CardinalityEncoder
+import caller
+from caller import Solver, Budget
+from kinduction import prove
+import pdr
+from counterexample import TraceDecoder
+
+'''
+    asyncio façade of the model checker, for services that must not block their event
+    loop. The encoding (parsing, normalization, templates) runs in an executor (the
+    loop's default thread pool unless `executor` is given), and the solver in a worker
+    thread: the CaDiCaL calls go through ctypes, which releases the GIL for the
+    duration of the native call, so the event loop keeps running while the solver
+    searches.
+
+    Cancelling the awaiting task stops the solver through its terminate callback (see
+    `Budget`), or the stream of clauses if the solver is not running yet: the worker
+    thread returns at the next poll of the callback or chunk of clauses, the session
+    is released, and the cancellation is propagated. A check can also be given a
+    timeout and conflict or decision limits, reported as UNKNOWN with the reason. The
+    limits need the helper library (make -C cadical-lib): the worker threads count the
+    search natively, never through the process's standard output.
+
+    Example:
+        result = await check ("model2.JSON", 10, semantics = "sequential", trace = True)
+        async for depth in check_depths ("model2.JSON", 50, semantics = "sequential"):
+            print (depth ["step"], depth ["verdict"])
+'''
+
+result_names = {10: "SAT", 20: "UNSAT", 0: "UNKNOWN"}
+
+engines = ["bmc", "incremental", "kinduction", "pdr"]
+
+'''
+    Builds the `CNFConverter` of `spec` (the path of a JSON specification, or its
+    content as a dictionary), `steps` steps unrolled.
+'''
+def build_converter (spec, steps, incremental, cnf_encoding, int_encoding, amo_encoding, semantics, streaming):
+    if isinstance (spec, dict):
+        data = specification_data (spec)
+    else:
+        file = FileHandler (spec, None, None)
+        file.read_file ()
+        data = file.data
+    return CNFConverter (incremental, steps, data, cnf_encoding, int_encoding, amo_encoding, None, semantics, False,
+                        streaming)
+
+async def encode (spec, steps, incremental, cnf_encoding, int_encoding, amo_encoding, semantics, streaming, executor):
+    loop = asyncio.get_running_loop ()
+    return await loop.run_in_executor (executor, build_converter, spec, steps, incremental, cnf_encoding, int_encoding,
+                                      amo_encoding, semantics, streaming)
+
+# without the helper library, the counters of a budget are read by redirecting fd 1 (see `Solver.statistics`)
+def check_limits (conflicts, decisions):
+    if (conflicts is not None or decisions is not None) and caller.bulk is None:
+        raise ValueError ("conflict and decision limits need the helper library (make -C cadical-lib)")
+
+'''
+    Runs `work` (a function without arguments, stopping once `cancelled` is set) in a
+    worker thread and returns its result. If the awaiting task is cancelled, sets
+    `cancelled`, waits for the worker to stop, and propagates the cancellation.
+'''
+async def run_cancellable (work, cancelled):
+    loop = asyncio.get_running_loop ()
+    future = loop.run_in_executor (None, work)
+    try:
+        return await asyncio.shield (future)
+    except asyncio.CancelledError:
+        cancelled.set ()
+        await asyncio.wait ([future])
+        future.exception ()
+        raise
+
+'''
+    Checks `spec` (a path or a dictionary) with `engine` up to k = `steps`, and returns
+    {"verdict": "SAT" | "UNSAT" | "UNKNOWN", "step": ..., "reason": ...}, "step" being
+    the step of the verdict (as in the messages of the solver) and "reason" why an
+    UNKNOWN check stopped ("timeout", "conflicts" or "decisions"), if it ran out of
+    its budget. With `trace` (bmc and incremental engines), a counterexample is added
+    under "trace", decoded by `TraceDecoder`.
+'''
+async def check (spec, steps, engine = "bmc", semantics = Helper.same_step_semantics_str,
+                cnf_encoding = Helper.tseitin_encoding_str, int_encoding = Helper.onehot_encoding_str,
+                amo_encoding = CardinalityEncoder.auto_str, timeout = None, conflicts = None, decisions = None,
+                trace = False, executor = None):
+    if engine not in engines:
+        raise ValueError (f"unknown engine: {engine}")
+    if engine in ("kinduction", "pdr") and semantics == Helper.same_step_semantics_str:
+        raise ValueError (f"the {engine} engine needs a relational semantics (\"sequential\" or \"parallel\")")
+    check_limits (conflicts, decisions)
+    bmc = engine == "bmc"
+    cnfConverter = await encode (spec, steps if bmc else 0, 1, cnf_encoding, int_encoding, amo_encoding, semantics,
+                                bmc, executor)
+    cancelled = threading.Event ()
+    budget = Budget (timeout, conflicts, decisions, cancelled.is_set)
+
+    def work ():
+        with Solver () as solver, Solver () as step:
+            solver.verbose = step.verbose = False
+            solver.set_budget (budget)
+            step.set_budget (budget)
+            if bmc:
+                chunks = cancellable_chunks (cnfConverter.clause_chunks (), cancelled)
+                result, depth = solver.solve_stream (cnfConverter.nvars, chunks,
+                                                    list (cnfConverter.temporal_bool_vars.values ()),
+                                                    cnfConverter.cumulative_assumptions)
+            elif engine == "incremental":
+                next_step = lambda t: (cnfConverter.step_literals (t), cnfConverter.step_activation (t))
+                result, depth = solver.solve_incremental (next_step, steps, None, cnfConverter.cumulative_assumptions)
+            elif engine == "kinduction":
+                result, depth = prove (cnfConverter, steps, False, None, solver, step, False)
+            else:
+                result, depth = pdr.prove (cnfConverter, steps, None, solver, False)
+            answer = {"verdict": result_names.get (result, "UNKNOWN"), "step": depth + 1}
+            if result not in (10, 20) and budget.reason is not None:
+                answer ["reason"] = budget.reason
+            if trace and result == 10 and engine in ("bmc", "incremental"):
+                answer ["trace"] = TraceDecoder (cnfConverter).decode (solver, depth)
+            return answer
+
+    return await run_cancellable (work, cancelled)
+
+# the clause chunks of `chunks`, stopping the stream (before the solver runs) once `cancelled` is set
+def cancellable_chunks (chunks, cancelled):
+    for chunk in chunks:
+        if cancelled.is_set ():
+            raise asyncio.CancelledError ()
+        yield chunk
+
+'''
+    Incremental BMC of `spec` as an async iterator: yields {"step": t+1, "verdict":
+    ...} after every depth t, up to `max_depth` or the first verdict other than UNSAT.
+    Every depth is solved in a worker thread; the checks stop when the iteration is
+    left or cancelled, the budget (`timeout`, `conflicts`, `decisions`) being shared
+    by all depths.
+'''
+async def check_depths (spec, max_depth, semantics = Helper.same_step_semantics_str,
+                       cnf_encoding = Helper.tseitin_encoding_str, int_encoding = Helper.onehot_encoding_str,
+                       amo_encoding = CardinalityEncoder.auto_str, timeout = None, conflicts = None,
+                       decisions = None, executor = None):
+    check_limits (conflicts, decisions)
+    cnfConverter = await encode (spec, 0, 1, cnf_encoding, int_encoding, amo_encoding, semantics, False, executor)
+    cancelled = threading.Event ()
+    budget = Budget (timeout, conflicts, decisions, cancelled.is_set)
+    solver = Solver ()
+    solver.verbose = False
+    solver.set_budget (budget)
+    next_step = lambda t: (cnfConverter.step_literals (t), cnfConverter.step_activation (t))
+    results = solver.incremental_results (next_step, max_depth, cnfConverter.cumulative_assumptions)
+    try:
+        while True:
+            answer = await run_cancellable (lambda: next (results, None), cancelled)
+            if answer is None:
+                return
+            result, t = answer
+            depth = {"step": t + 1, "verdict": result_names.get (result, "UNKNOWN")}
+            if result not in (10, 20) and budget.reason is not None:
+                depth ["reason"] = budget.reason
+            yield depth
+    finally:
+        results.close ()
+        solver.release ()
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from model_to_cnf import Helper, spec2converter, save_cnf
+from cardinality import CardinalityEncoder
+from caller import Solver, get_formula, get_assumptions
+from formula_cache import formula_memo
+from profiler import Profiler
+import generator
+
+'''
+    Stage-by-stage benchmark of the BMC pipeline on the synthetic families of
+    `generator`, across sizes n and depths k. Every run times separately:
+
+    - parse: reading the JSON specification (`FileHandler.read_file`);
+    - normalize: normalizing the formulas into CNF (`Specification`), the process-wide
+      memo of normalized formulas being cleared first;
+    - encode: allocating the variables and compiling the step templates (the rest of
+      the `CNFConverter` construction, in streaming mode);
+    - write: instantiating the k steps and writing the DIMACS file (`save_cnf`);
+    - load: reading the DIMACS file and the assumptions back (`caller.get_formula`);
+    - solve: adding the clauses to CaDiCaL and solving under the assumptions.
+
+    Each configuration is run `repeat` times and the fastest time of every stage is
+    kept (see `Profiler` for the stages), with the size of the formula, the peak memory
+    and the conflicts of the solver. The results are written as JSON, and can be saved
+    as a baseline, or compared with one: a stage is flagged as a regression when it is
+    slower than in the baseline by more than `tolerance` (relative) and `min_delta`
+    seconds (absolute).
+
+    Example:
+        python benchmark.py --family list-scan --sizes 10 100 --steps 10 50 --save-baseline base.json
+        python benchmark.py --family list-scan --sizes 10 100 --steps 10 50 --baseline base.json
+'''
+
+stages = ["parse", "normalize", "encode", "write", "load", "solve"]
+
+result_names = {10: "SAT", 20: "UNSAT", 0: "UNKNOWN"}
+
+'''
+    Runs the pipeline once on the specification file `path` with k = `steps`, and
+    returns the time of every stage, with the size of the formula and the verdict.
+'''
+def run_pipeline (path, steps, workdir, cnf_encoding = Helper.tseitin_encoding_str,
+                  int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                  semantics = Helper.same_step_semantics_str):
+    formula_memo.memory.clear ()
+    profiler = Profiler ()
+    cnfConverter = spec2converter (path, steps, 1, cnf_encoding, int_encoding, amo_encoding, None, semantics, False,
+                                   True, profiler)
+    cnf_path, assumptions_path = save_cnf (cnfConverter, path, workdir, steps)
+
+    with profiler.stage ("load"):
+        nvars, nclauses, clauses = get_formula (cnf_path)
+        assumptions = get_assumptions (assumptions_path)
+
+    with Solver () as solver:
+        solver.verbose = False
+        with profiler.stage ("solve"):
+            result, depth = solver.solve_formula (nvars, clauses, assumptions, cnfConverter.cumulative_assumptions)
+        conflicts = solver.statistics ().get ("conflicts", 0)
+
+    run = {"times": {stage: profiler.wall (stage) for stage in stages}, "nvars": nvars, "nclauses": nclauses,
+           "literals": cnfConverter.nliterals, "cnf_bytes": os.path.getsize (cnf_path),
+           "peak_rss": profiler.report () ["peak_rss"], "conflicts": conflicts,
+           "result": result_names.get (result, "UNKNOWN"), "step": depth + 1}
+    os.remove (cnf_path)
+    os.remove (assumptions_path)
+    return run
+
+'''
+    Benchmarks every family of `families` for every size of `sizes` and depth of
+    `steps`, and returns the results: the settings, and one entry per configuration
+    with the fastest time of every stage over `repeat` runs.
+'''
+def run_benchmark (families, sizes, steps, repeat = 3, values = 2, cnf_encoding = Helper.tseitin_encoding_str,
+                   int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                   semantics = Helper.same_step_semantics_str, verbose = True):
+    settings = {"repeat": repeat, "values": values, "encoding": cnf_encoding, "int_encoding": int_encoding,
+                "amo_encoding": amo_encoding, "semantics": semantics, "python": platform.python_version (),
+                "machine": platform.machine (), "date": time.strftime ("%Y-%m-%d %H:%M:%S")}
+    runs = []
+    with tempfile.TemporaryDirectory () as workdir:
+        for family in families:
+            for n in sizes:
+                path = os.path.join (workdir, f"{family}_{n}.json")
+                with open (path, 'w') as f:
+                    json.dump (generator.generate (family, n, values), f)
+                for k in steps:
+                    best = None
+                    for _ in range (repeat):
+                        run = run_pipeline (path, k, workdir, cnf_encoding, int_encoding, amo_encoding, semantics)
+                        if best is None:
+                            best = run
+                        else:
+                            best ["times"] = {stage: min (best ["times"] [stage], run ["times"] [stage]) for stage in stages}
+                    entry = {"family": family, "n": n, "k": k}
+                    entry.update (best)
+                    runs.append (entry)
+                    if verbose:
+                        print (format_run (entry))
+    return {"settings": settings, "runs": runs}
+
+def format_run (run):
+    times = " ".join (f"{stage} {run ['times'] [stage]:.3f}s" for stage in stages)
+    return f"{run ['family']} n={run ['n']} k={run ['k']}: {times} ({run ['nvars']} vars, {run ['nclauses']} clauses, {run ['result']})"
+
+'''
+    Compares `results` with the `baseline` results, configuration by configuration
+    (family, n, k), and returns the regressions: the stages slower than in the
+    baseline by more than `tolerance` (relative) and `min_delta` seconds.
+'''
+def compare (results, baseline, tolerance = 0.2, min_delta = 0.05):
+    reference = {(run ["family"], run ["n"], run ["k"]): run for run in baseline ["runs"]}
+    regressions = []
+    for run in results ["runs"]:
+        base = reference.get ((run ["family"], run ["n"], run ["k"]))
+        if base is None:
+            continue
+        for stage in stages:
+            before = base ["times"].get (stage)
+            after = run ["times"] [stage]
+            if before is not None and after > before * (1 + tolerance) and after - before > min_delta:
+                regressions.append ({"family": run ["family"], "n": run ["n"], "k": run ["k"], "stage": stage,
+                                     "baseline": before, "time": after})
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description="Stage-by-stage benchmark on synthetic specifications.")
+    parser.add_argument ("--family", action="append", choices=list (generator.families), default=None,
+                         help="family to benchmark; repeat for several (default: all)")
+    parser.add_argument ("--sizes", type=int, nargs="+", default=[4, 16, 64], help="sizes n (default: 4 16 64)")
+    parser.add_argument ("--steps", type=int, nargs="+", default=[10, 50], help="depths k (default: 10 50)")
+    parser.add_argument ("--values", type=int, default=2, help="list-scan: values per list element (default: 2)")
+    parser.add_argument ("--repeat", type=int, default=3, help="runs per configuration, the fastest is kept (default: 3)")
+    parser.add_argument ("--encoding", choices=Helper.cnf_encodings, default=Helper.tseitin_encoding_str)
+    parser.add_argument ("--int-encoding", choices=Helper.int_encodings, default=Helper.onehot_encoding_str)
+    parser.add_argument ("--amo-encoding", choices=CardinalityEncoder.encodings, default=CardinalityEncoder.auto_str)
+    parser.add_argument ("--semantics", choices=Helper.semantics, default=Helper.same_step_semantics_str)
+    parser.add_argument ("--output", default=None, help="write the JSON results to this file")
+    parser.add_argument ("--save-baseline", default=None, help="save the results as the baseline in this file")
+    parser.add_argument ("--baseline", default=None, help="flag the regressions against the baseline in this file")
+    parser.add_argument ("--tolerance", type=float, default=0.2,
+                         help="relative slowdown of a stage flagged as a regression (default: 0.2)")
+    parser.add_argument ("--min-delta", type=float, default=0.05,
+                         help="smallest slowdown of a stage flagged as a regression, in seconds (default: 0.05)")
+    args = parser.parse_args ()
+
+    results = run_benchmark (args.family or list (generator.families), args.sizes, args.steps, args.repeat, args.values,
+                             args.encoding, args.int_encoding, args.amo_encoding, args.semantics)
+    if args.baseline:
+        with open (args.baseline, 'r') as f:
+            baseline = json.load (f)
+        if baseline ["settings"] ["encoding"] != args.encoding or baseline ["settings"] ["semantics"] != args.semantics:
+            print ("warning: the baseline was run with other settings")
+        results ["regressions"] = compare (results, baseline, args.tolerance, args.min_delta)
+        for regression in results ["regressions"]:
+            print (f"REGRESSION {regression ['family']} n={regression ['n']} k={regression ['k']} {regression ['stage']}: "
+                   f"{regression ['time']:.3f}s (baseline {regression ['baseline']:.3f}s)")
+        if not results ["regressions"]:
+            print ("no regression")
+    for path in [args.output, args.save_baseline]:
+        if path:
+            with open (path, 'w') as f:
+                json.dump (results, f, indent=2)
+    if args.baseline and results ["regressions"]:
+        raise SystemExit (1)
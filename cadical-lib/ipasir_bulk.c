@@ -0,0 +1,326 @@
+/*
+    Bulk helpers around the IPASIR interface of CaDiCaL, loaded by caller.py with
+    ctypes. They take the IPASIR function to call as a pointer (e.g. ipasir_add
+    of libcadical.so), so that this library does not need to be linked against
+    the solver, and loop over a whole buffer natively instead of crossing the
+    Python/C boundary once per literal. `dimacs_parse` tokenizes DIMACS text for
+    the reader of dimacs.py, `capture_statistics` reads the statistics printed by
+    CaDiCaL, `session_learn` counts the learned clauses of a solver, and the
+    clause_ring functions share learned clauses between solvers of separate
+    processes.
+
+    Build with: make -C cadical-lib
+*/
+
+#include <pthread.h>
+#include <sched.h>
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef void (*ipasir_add_fn) (void *solver, int lit);
+typedef int (*ipasir_val_fn) (void *solver, int lit);
+
+/*
+    Adds `n` literals to the solver, clauses being terminated by 0, exactly as if
+    `add (solver, lits[i])` was called for every i.
+*/
+void ipasir_add_buffer (ipasir_add_fn add, void *solver, const int *lits,
+                        size_t n) {
+  for (size_t i = 0; i < n; i++)
+    add (solver, lits[i]);
+}
+
+/*
+    Reads the values of `n` literals of the last model into `values`: values[i] is
+    `val (solver, lits[i])`, i.e. lits[i] if it is true and -lits[i] otherwise.
+*/
+void ipasir_val_buffer (ipasir_val_fn val, void *solver, const int *lits,
+                        int *values, size_t n) {
+  for (size_t i = 0; i < n; i++)
+    values[i] = val (solver, lits[i]);
+}
+
+/*
+    Parses `n` bytes of DIMACS CNF text (whole lines) into `lits`, which must have
+    room for n / 2 + 1 ints: the literals and their 0 terminators, in order. Comment
+    lines ("c ...") are skipped, the counts of a "p cnf <vars> <clauses>" line are
+    stored in header[0] and header[1], and a "%" line (end marker of some benchmark
+    files) stops the parse and sets *done. Returns the number of ints written.
+*/
+long dimacs_parse (const char *text, size_t n, int *lits, long *header,
+                   int *done) {
+  const char *p = text, *end = text + n;
+  long count = 0;
+  int line_start = 1;
+  while (p < end) {
+    char c = *p;
+    if (c == '\n') {
+      line_start = 1;
+      p++;
+      continue;
+    }
+    if (c == ' ' || c == '\t' || c == '\r') {
+      p++;
+      continue;
+    }
+    if (line_start && (c == 'c' || c == 'p' || c == '%')) {
+      if (c == '%') {
+        *done = 1;
+        return count;
+      }
+      if (c == 'p') {
+        const char *q = p + 1;
+        int field = -1;
+        while (q < end && *q != '\n') {
+          if (*q >= '0' && *q <= '9') {
+            long v = 0;
+            while (q < end && *q >= '0' && *q <= '9')
+              v = 10 * v + (*q++ - '0');
+            if (++field < 2)
+              header[field] = v;
+          } else
+            q++;
+        }
+      }
+      while (p < end && *p != '\n')
+        p++;
+      continue;
+    }
+    line_start = 0;
+    int sign = 1;
+    if (c == '-') {
+      sign = -1;
+      p++;
+    }
+    long v = 0;
+    while (p < end && *p >= '0' && *p <= '9')
+      v = 10 * v + (*p++ - '0');
+    lits[count++] = (int) (sign * v);
+    while (p < end && *p != ' ' && *p != '\t' && *p != '\r' && *p != '\n')
+      p++; // skip anything else glued to the number
+  }
+  return count;
+}
+
+typedef void (*print_statistics_fn) (void *solver);
+
+static pthread_mutex_t capture_lock = PTHREAD_MUTEX_INITIALIZER;
+
+/*
+    Returns what `print (solver)` (ccadical_print_statistics) writes, its size in
+    *size, as a buffer to release with `capture_free`. CaDiCaL prints through the C
+    `stdout` stream, which points to a memory stream for the duration of the call;
+    file descriptor 1 is left alone, so output written through it (e.g. by Python)
+    is not affected. Captures are serialized by a process-wide lock.
+*/
+char *capture_statistics (print_statistics_fn print, void *solver,
+                          size_t *size) {
+  char *text = NULL;
+  *size = 0;
+  pthread_mutex_lock (&capture_lock);
+  fflush (stdout);
+  FILE *saved = stdout;
+  FILE *memory = open_memstream (&text, size);
+  if (memory) {
+    stdout = memory;
+    print (solver);
+    stdout = saved;
+    fclose (memory);
+  }
+  pthread_mutex_unlock (&capture_lock);
+  return text;
+}
+
+void capture_free (char *text) { free (text); }
+
+/*
+    Ring buffer of learned clauses in a shared memory block, written by the learn
+    callbacks (`ccadical_set_learn`) of several solvers and read by all of them
+    between their solve calls. Each record is [worker, level, length, literals...],
+    `level` being the number of variables of the exporting solver's formula when
+    the clause was learned. Writers and readers take a spin lock in the block;
+    `written` only grows, the ring storing the last `capacity` ints, so a reader
+    that fell behind by more than the capacity loses the overwritten clauses.
+*/
+typedef struct {
+  int lock;
+  int capacity;       /* ints in the ring, which follows the header */
+  long long written;  /* ints written since the ring was created */
+} clause_ring;
+
+/*
+    The sharing state of one solver: its worker index and level, the position up to
+    which it has read the ring, and the records read above its level, kept until it
+    reaches them (at most `capacity` ints, the newer ones being dropped).
+*/
+typedef struct {
+  clause_ring *ring;
+  int worker;
+  int level;
+  long long exported;
+  long long imported;
+  long long position;
+  int *pending;
+  size_t npending;
+} clause_sharer;
+
+#define RING_DATA(ring) ((int *) ((ring) + 1))
+
+static void ring_lock (clause_ring *ring) {
+  while (__atomic_exchange_n (&ring->lock, 1, __ATOMIC_ACQUIRE))
+    while (__atomic_load_n (&ring->lock, __ATOMIC_RELAXED))
+      sched_yield ();
+}
+
+static void ring_unlock (clause_ring *ring) {
+  __atomic_store_n (&ring->lock, 0, __ATOMIC_RELEASE);
+}
+
+/* Sets up a ring in the `size` bytes at `memory`. */
+void clause_ring_init (void *memory, size_t size) {
+  clause_ring *ring = memory;
+  ring->lock = 0;
+  ring->capacity = (int) ((size - sizeof (clause_ring)) / sizeof (int));
+  ring->written = 0;
+}
+
+void *clause_sharer_new (void *ring, int worker) {
+  clause_sharer *sharer = calloc (1, sizeof (clause_sharer));
+  sharer->ring = ring;
+  sharer->worker = worker;
+  sharer->pending = malloc (sharer->ring->capacity * sizeof (int));
+  return sharer;
+}
+
+void clause_sharer_free (void *state) {
+  clause_sharer *sharer = state;
+  free (sharer->pending);
+  free (sharer);
+}
+
+void clause_sharer_set_level (void *state, int level) {
+  ((clause_sharer *) state)->level = level;
+}
+
+/* stats[0]: clauses exported, stats[1]: clauses imported */
+void clause_sharer_counts (void *state, long long *stats) {
+  clause_sharer *sharer = state;
+  stats[0] = sharer->exported;
+  stats[1] = sharer->imported;
+}
+
+/* Appends the `length` literals of `clause` to the ring. */
+static void share_clause (clause_sharer *sharer, const int *clause,
+                          int length) {
+  clause_ring *ring = sharer->ring;
+  int *data = RING_DATA (ring);
+  if (length + 3 > ring->capacity)
+    return;
+  ring_lock (ring);
+  long long at = ring->written;
+  long long capacity = ring->capacity;
+  data[at++ % capacity] = sharer->worker;
+  data[at++ % capacity] = sharer->level;
+  data[at++ % capacity] = length;
+  for (int i = 0; i < length; i++)
+    data[at++ % capacity] = clause[i];
+  ring->written = at;
+  ring_unlock (ring);
+  sharer->exported++;
+}
+
+/*
+    Goes through the `n` ints of records: adds to the solver the clauses of the
+    other workers at a level up to the sharer's, i.e. implied by the formula of the
+    solver, and keeps the ones above it pending.
+*/
+static void import_records (clause_sharer *sharer, const int *records,
+                            size_t n, ipasir_add_fn add, void *solver) {
+  size_t capacity = (size_t) sharer->ring->capacity;
+  for (size_t i = 0; i + 3 <= n;) {
+    size_t size = 3 + (size_t) records[i + 2];
+    if (records[i] != sharer->worker) {
+      if (records[i + 1] <= sharer->level) {
+        for (size_t j = 3; j < size; j++)
+          add (solver, records[i + j]);
+        add (solver, 0);
+        sharer->imported++;
+      } else if (sharer->npending + size <= capacity) {
+        memmove (sharer->pending + sharer->npending, records + i,
+                 size * sizeof (int));
+        sharer->npending += size;
+      }
+    }
+    i += size;
+  }
+}
+
+/*
+    Adds to the solver the pending clauses now within its level, and the clauses of
+    the ring written since the last import (see `import_records`).
+*/
+void clause_sharer_import (void *state, ipasir_add_fn add, void *solver) {
+  clause_sharer *sharer = state;
+  clause_ring *ring = sharer->ring;
+  const int *data = RING_DATA (ring);
+  long long capacity = ring->capacity;
+
+  size_t npending = sharer->npending;
+  sharer->npending = 0;
+  import_records (sharer, sharer->pending, npending, add, solver);
+
+  ring_lock (ring);
+  long long written = ring->written, from = sharer->position;
+  if (written - from > capacity)
+    from = written; /* overwritten before being read */
+  size_t n = (size_t) (written - from);
+  int *records = n ? malloc (n * sizeof (int)) : NULL;
+  for (size_t i = 0; i < n; i++)
+    records[i] = data[(from + (long long) i) % capacity];
+  ring_unlock (ring);
+  sharer->position = written;
+  import_records (sharer, records, n, add, solver);
+  free (records);
+}
+
+/*
+    The learn callback of a solver (`ccadical_set_learn`): counts the learned
+    clauses, one per conflict analysis, so that the conflicts spent by a solve call
+    are known without reading the statistics of the solver, and passes the clauses
+    of at most `share_length` literals on to `sharer`, if any.
+*/
+typedef struct {
+  long long learned;
+  clause_sharer *sharer;
+  int share_length;
+} session_learner;
+
+void *session_learner_new (void) {
+  return calloc (1, sizeof (session_learner));
+}
+
+void session_learner_free (void *learner) { free (learner); }
+
+void session_learner_share (void *state, void *sharer, int share_length) {
+  session_learner *learner = state;
+  learner->sharer = sharer;
+  learner->share_length = share_length;
+}
+
+long long session_learner_learned (void *state) {
+  return ((session_learner *) state)->learned;
+}
+
+void session_learn (void *state, int *clause) {
+  session_learner *learner = state;
+  learner->learned++;
+  if (!learner->sharer)
+    return;
+  int length = 0;
+  while (clause[length])
+    length++;
+  if (length <= learner->share_length)
+    share_clause (learner->sharer, clause, length);
+}
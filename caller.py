@@ -1,8 +1,51 @@
 import ctypes
-from ctypes import c_int, c_char_p, POINTER
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import shared_memory
+from ctypes import c_int, c_char_p, c_size_t, POINTER
+from array import array
+import numpy as np
+from clause_db import ClauseDatabase
+from dimacs import read_dimacs
 
 cadical = ctypes.CDLL("./cadical-lib/libcadical.so")
 
+# optional native helpers (cadical-lib/ipasir_bulk.c, built with `make -C cadical-lib`)
+try:
+    bulk = ctypes.CDLL("./cadical-lib/libipasir_bulk.so")
+    bulk.ipasir_add_buffer.argtypes = [ctypes.c_void_p, ctypes.c_void_p, POINTER(c_int), c_size_t]
+    bulk.ipasir_add_buffer.restype = None
+    bulk.ipasir_val_buffer.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, c_size_t]
+    bulk.ipasir_val_buffer.restype = None
+    bulk.capture_statistics.argtypes = [ctypes.c_void_p, ctypes.c_void_p, POINTER(c_size_t)]
+    bulk.capture_statistics.restype = ctypes.c_void_p
+    bulk.capture_free.argtypes = [ctypes.c_void_p]
+    bulk.capture_free.restype = None
+    bulk.clause_ring_init.argtypes = [ctypes.c_void_p, c_size_t]
+    bulk.clause_ring_init.restype = None
+    bulk.clause_sharer_new.argtypes = [ctypes.c_void_p, c_int]
+    bulk.clause_sharer_new.restype = ctypes.c_void_p
+    bulk.clause_sharer_free.argtypes = [ctypes.c_void_p]
+    bulk.clause_sharer_free.restype = None
+    bulk.clause_sharer_set_level.argtypes = [ctypes.c_void_p, c_int]
+    bulk.clause_sharer_set_level.restype = None
+    bulk.clause_sharer_counts.argtypes = [ctypes.c_void_p, POINTER(ctypes.c_longlong)]
+    bulk.clause_sharer_counts.restype = None
+    bulk.clause_sharer_import.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    bulk.clause_sharer_import.restype = None
+    bulk.session_learner_new.restype = ctypes.c_void_p
+    bulk.session_learner_free.argtypes = [ctypes.c_void_p]
+    bulk.session_learner_free.restype = None
+    bulk.session_learner_share.argtypes = [ctypes.c_void_p, ctypes.c_void_p, c_int]
+    bulk.session_learner_share.restype = None
+    bulk.session_learner_learned.argtypes = [ctypes.c_void_p]
+    bulk.session_learner_learned.restype = ctypes.c_longlong
+except (OSError, AttributeError):
+    bulk = None
+
 cadical.ipasir_signature.restype = c_char_p
 cadical.ipasir_init.restype = ctypes.c_void_p
 cadical.ipasir_add.argtypes = [ctypes.c_void_p, c_int]
@@ -14,44 +57,582 @@ cadical.ipasir_val.restype = c_int
 cadical.ipasir_failed.argtypes = [ctypes.c_void_p, c_int]
 cadical.ipasir_failed.restype = c_int
 cadical.ipasir_release.argtypes = [ctypes.c_void_p]
+cadical.ipasir_set_terminate.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+cadical.ccadical_set_option.argtypes = [ctypes.c_void_p, c_char_p, c_int]
+cadical.ccadical_print_statistics.argtypes = [ctypes.c_void_p]
+cadical.ccadical_active.argtypes = [ctypes.c_void_p]
+cadical.ccadical_active.restype = ctypes.c_int64
+cadical.ccadical_irredundant.argtypes = [ctypes.c_void_p]
+cadical.ccadical_irredundant.restype = ctypes.c_int64
+cadical.ccadical_limit.argtypes = [ctypes.c_void_p, c_char_p, c_int]
+cadical.ccadical_set_learn.argtypes = [ctypes.c_void_p, ctypes.c_void_p, c_int, ctypes.c_void_p]
+
+# the C library of the process, to flush the stdio buffers of CaDiCaL
+libc = ctypes.CDLL(None)
+
+# serializes the redirections of fd 1 by `Solver.print_statistics`, process-wide
+stdout_lock = threading.Lock()
+
+# int terminate (void *state): non-zero asks the solver to stop
+TERMINATE_CALLBACK = ctypes.CFUNCTYPE(c_int, ctypes.c_void_p)
+
+'''
+    The resource budget of a check, shared by all its solver calls (and sessions):
+    a wall-clock `timeout` in seconds, counted from the creation of the budget, limits
+    on the total number of `conflicts` and `decisions` of the search, and `cancel`, a
+    function without arguments asking for cooperative cancellation when it returns
+    True (e.g., a scheduler's flag). A session under a budget (`Solver.set_budget`) is
+    stopped through its terminate callback once the timeout is reached or the check is
+    cancelled, and runs each `solve` call under the conflicts and decisions left, set
+    with `ccadical_limit`; an exhausted budget makes `solve` return 0 (unknown).
+
+    The conflicts spent are counted natively by the learn callback of the session
+    (CaDiCaL learns one clause per conflict analysis, none for the few conflicts that
+    only force a literal, so the count may fall short of CaDiCaL's own). The C API has
+    no decisions counter: a decision limit reads the statistics of the session after
+    every solve call (see `Solver.statistics`), which costs about a millisecond.
+
+    Attributes:
+        spent (dict): The conflicts and decisions spent so far, for the limited ones.
+        reason (str): Why the budget ran out ("timeout", "cancelled", "conflicts" or
+                      "decisions"), None while it lasts.
+
+    Example:
+        budget = Budget (timeout = 60, conflicts = 100000)
+        with Solver () as solver:
+            solver.set_budget (budget)
+            result, depth = solver.solve_formula (nvars, clauses, assumptions)
+            # result 0: budget.reason, the property holding up to step depth
+'''
+class Budget:
+    def __init__ (self, timeout = None, conflicts = None, decisions = None, cancel = None):
+        self.timeout = timeout
+        self.deadline = time.time() + timeout if timeout is not None else None
+        self.cancel = cancel
+        self.limits = {name: limit for name, limit in (("conflicts", conflicts), ("decisions", decisions))
+                       if limit is not None}
+        self.spent = {name: 0 for name in self.limits}
+        self.reason = None
+
+    # polled by the terminate callbacks during search
+    def expired (self):
+        if self.reason is None:
+            if self.cancel is not None and self.cancel():
+                self.reason = "cancelled"
+            elif self.deadline is not None and time.time() > self.deadline:
+                self.reason = "timeout"
+        return self.reason is not None
+
+    def remaining (self):
+        return {name: limit - self.spent[name] for name, limit in self.limits.items()}
+
+    def exhausted (self):
+        if not self.expired():
+            for name, left in self.remaining().items():
+                if left <= 0:
+                    self.reason = name
+                    break
+        return self.reason is not None
+
+    def spend (self, used):
+        for name, count in used.items():
+            self.spent[name] += count
+        self.exhausted()
+
+    def describe (self):
+        if self.reason in self.limits:
+            return f"{self.reason} limit of {self.limits[self.reason]} reached"
+        if self.reason == "timeout":
+            return f"timeout of {self.timeout}s reached"
+        return self.reason
+
+'''
+    A ring buffer of learned clauses in a shared memory block (see `clause_ring` in
+    cadical-lib/ipasir_bulk.c), through which CaDiCaL sessions of separate processes
+    working on the same problem share their short learned clauses (see
+    `Solver.share_clauses`). Without `name`, a block of `size` bytes is created;
+    otherwise the block `name` is attached. Needs the helper library.
+
+    Example:
+        ring = ClauseRing (size = 4 * 1024 * 1024)
+        # in every worker, e.g. with the name of the ring and its own index
+        with Solver () as solver:
+            solver.share_clauses (ClauseRing (ring.name), worker)
+        ring.close ()
+        ring.unlink ()
+'''
+class ClauseRing:
+    def __init__ (self, name = None, size = 4 * 1024 * 1024):
+        if bulk is None:
+            raise ValueError("clause sharing needs the helper library (make -C cadical-lib)")
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.base = ctypes.c_char.from_buffer(self.memory.buf)
+        self.address = ctypes.addressof(self.base)
+        if name is None:
+            bulk.clause_ring_init(self.address, self.memory.size)
+        self.name = self.memory.name
+
+    def __del__ (self):
+        self.close()
+
+    def close (self):
+        if getattr(self, 'base', None) is not None:
+            # the ctypes view must go before the mapping can be closed
+            self.base = None
+            self.memory.close()
+
+    def unlink (self):
+        self.memory.unlink()
+
+def max_variable(literals):
+    if hasattr(literals, 'max'):  # NumPy arrays
+        return int(max(literals.max(), -literals.min()))
+    return max(max(literals), -min(literals))
+
+'''
+    A CaDiCaL session with its own IPASIR handle. The library is loaded once per
+    process (at import), and a session can be kept warm and reused for many checks:
+    `reset` drops every clause by replacing the handle with a fresh one. Sessions
+    are context managers, releasing the handle on exit.
+
+    Attributes:
+        handle (c_void_p): The IPASIR solver handle.
+        numvars (int): The largest variable added so far.
+        verbose (bool): Print the result of every solver call (default True).
+
+    Example:
+        with Solver () as solver:
+            solver.solve_formula (nvars, clauses, assumptions)
+            solver.reset ()
+            solver.solve_incremental (next_step, 50)
+'''
+class Solver:
+    def __init__ (self):
+        self.handle = cadical.ipasir_init()
+        self.numvars = 0
+        self.verbose = True
+        self.terminate = None
+        self.terminate_callback = None
+        self.budget = None
+        self.sharing = None
+        self.learner = None
+        self.counted = {}
+        self.assumptions = []
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+    def __del__ (self):
+        self.release()
+
+    def release (self):
+        if getattr(self, 'handle', None) is not None:
+            cadical.ipasir_release(self.handle)
+            self.handle = None
+        if getattr(self, 'sharing', None) is not None:
+            bulk.clause_sharer_free(self.sharing["sharer"])
+            self.sharing = None
+        if getattr(self, 'learner', None) is not None:
+            bulk.session_learner_free(self.learner)
+            self.learner = None
+
+    def reset (self):
+        self.release()
+        self.handle = cadical.ipasir_init()
+        self.numvars = 0
+        self.terminate = None
+        self.terminate_callback = None
+        self.budget = None
+        self.counted = {}
+        self.assumptions = []
+
+    '''
+        Sets a CaDiCaL option (e.g., "seed", "stabilizeonly"); most options can only be
+        changed before any clause is added.
+    '''
+    def set_option (self, name, val):
+        cadical.ccadical_set_option(self.handle, name.encode(), int(val))
 
-solver = cadical.ipasir_init()
+    '''
+        Registers `terminate`, a function without arguments polled by the solver during
+        search; when it returns True, the running `solve` call stops with result 0.
+        `None` removes the callback.
+    '''
+    def set_terminate (self, terminate):
+        self.terminate = terminate
+        self.install_terminate()
 
+    '''
+        Runs the following solver calls under `budget` (a `Budget`, possibly shared with
+        other sessions of the same check); `None` removes it.
+    '''
+    def set_budget (self, budget):
+        self.budget = budget
+        self.install_terminate()
+        self.install_learn()
+        self.counted = self.spent_counters()
 
-clauses = []
-assumptions = []
-numvars = 0
+    '''
+        Shares learned clauses through `ring` (a `ClauseRing`) with the sessions of other
+        processes solving the same problem, this session being `worker` (an index unique
+        among them). During search, the learned clauses of at most `max_length` literals
+        are appended to the ring natively by the learn callback of CaDiCaL, and before
+        every solve call the clauses of the other workers are added to the session. A
+        solve call runs in slices of `interval` conflicts, the new clauses being
+        imported between slices. The state of the sharing is native (see
+        `clause_sharer` in cadical-lib/ipasir_bulk.c).
 
-def add_clauses(clauses):
-    for clause in clauses:
-        add_clause(clause)
+        The sessions must add the same clauses in the same order, possibly not all of
+        them yet (incremental BMC, one step at a time): a clause is only imported if the
+        exporting session had no more variables when it learned it, so that it is
+        implied by the clauses of the importing session; the others are kept until it
+        has enough variables. `None` stops the sharing.
+    '''
+    def share_clauses (self, ring, worker = 0, max_length = 2, interval = 10000):
+        previous = self.sharing
+        # the ring is kept alive with the session
+        self.sharing = None if ring is None else {"ring": ring, "sharer": bulk.clause_sharer_new(ring.address, worker),
+                                                  "max_length": max_length, "interval": interval}
+        self.install_learn()
+        if previous is not None:
+            bulk.clause_sharer_free(previous["sharer"])
 
-def add_clause(clause):
-    for literal in clause:
-        cadical.ipasir_add(solver, literal)
-    cadical.ipasir_add(solver, 0)
+    # learned clauses exported to and imported from the ring
+    def shared_clauses (self):
+        if self.sharing is None:
+            return {"exported": 0, "imported": 0}
+        counts = (ctypes.c_longlong * 2)()
+        bulk.clause_sharer_counts(self.sharing["sharer"], counts)
+        return {"exported": counts[0], "imported": counts[1]}
 
-def add_assmuptions (current_assumptions):
-    for assumption in current_assumptions:
-        cadical.ipasir_assume(solver, assumption)
+    def import_clauses (self):
+        sharer = self.sharing["sharer"]
+        bulk.clause_sharer_set_level(sharer, self.numvars)
+        bulk.clause_sharer_import(sharer, ctypes.cast(cadical.ipasir_add, ctypes.c_void_p), self.handle)
 
+    '''
+        Connects the learn callback of CaDiCaL to the learner of the session
+        (`session_learn` in cadical-lib/ipasir_bulk.c) while it is needed: to count the
+        conflicts of a conflict budget and to share learned clauses. Without the helper
+        library, the conflicts are read from the statistics instead.
+    '''
+    def install_learn (self):
+        counting = bulk is not None and self.budget is not None and "conflicts" in self.budget.limits
+        sharing = self.sharing
+        if not counting and sharing is None:
+            if self.learner is not None:
+                cadical.ccadical_set_learn(self.handle, None, 0, None)
+            return
+        if self.learner is None:
+            self.learner = bulk.session_learner_new()
+        bulk.session_learner_share(self.learner, sharing["sharer"] if sharing is not None else None,
+                                   sharing["max_length"] if sharing is not None else 0)
+        cadical.ccadical_set_learn(self.handle, self.learner, 2**31 - 1 if counting else sharing["max_length"],
+                                   ctypes.cast(bulk.session_learn, ctypes.c_void_p))
+
+    # the conflicts and decisions spent by the session so far, for the limits of its budget
+    def spent_counters (self):
+        if self.budget is None:
+            return {}
+        counters = {}
+        if "conflicts" in self.budget.limits and bulk is not None:
+            counters["conflicts"] = bulk.session_learner_learned(self.learner)
+        if any(name not in counters for name in self.budget.limits):
+            stats = self.statistics()
+            counters.update({name: stats[name] for name in self.budget.limits if name not in counters})
+        return counters
+
+    def install_terminate (self):
+        terminate = self.terminate
+        budget = self.budget
+        if terminate is None and budget is None:
+            self.terminate_callback = None
+            cadical.ipasir_set_terminate(self.handle, None, None)
+            return
+        def stop (state):
+            return 1 if (terminate is not None and terminate()) or (budget is not None and budget.expired()) else 0
+        self.terminate_callback = TERMINATE_CALLBACK(stop)
+        cadical.ipasir_set_terminate(self.handle, None, ctypes.cast(self.terminate_callback, ctypes.c_void_p))
+
+    '''
+        Packs the clauses into one contiguous, zero-terminated int32 buffer and adds
+        them to the solver with a single native call. The buffer of a `ClauseDatabase`
+        is added as is, in chunks.
+    '''
+    def add_clauses (self, clauses):
+        if isinstance(clauses, ClauseDatabase):
+            for literals in clauses.chunks():
+                self.add_literals(literals)
+            return
+        literals = array('i')
+        for clause in clauses:
+            literals.extend(clause)
+            literals.append(0)
+        self.add_literals(literals)
+
+    '''
+        Adds a flat buffer of zero-terminated clauses (an `array('i')`, a NumPy int32
+        array, or any writable contiguous buffer of C ints). Falls back to one
+        `ipasir_add` call per literal if the bulk helper library is not built.
+    '''
+    def add_literals (self, literals):
+        n = len(literals)
+        if n == 0:
+            return
+        self.numvars = max(self.numvars, max_variable(literals))
+        if bulk is None:
+            for literal in literals:
+                cadical.ipasir_add(self.handle, int(literal))
+            return
+        buffer = (c_int * n).from_buffer(literals)
+        bulk.ipasir_add_buffer(ctypes.cast(cadical.ipasir_add, ctypes.c_void_p), self.handle, buffer, n)
+
+    def add_clause (self, clause):
+        for literal in clause:
+            self.numvars = max(self.numvars, abs(literal))
+            cadical.ipasir_add(self.handle, literal)
+        cadical.ipasir_add(self.handle, 0)
+
+    def add_assmuptions (self, current_assumptions):
+        for assumption in current_assumptions:
+            cadical.ipasir_assume(self.handle, assumption)
+        self.assumptions.extend(current_assumptions)
+
+    def solve (self):
+        assumptions = self.assumptions
+        self.assumptions = []
+        budget = self.budget
+        sharing = self.sharing
+        if budget is None and sharing is None:
+            return cadical.ipasir_solve(self.handle)
+        while True:
+            if budget is not None and budget.exhausted():
+                return 0
+            if sharing is not None:
+                self.import_clauses()
+            allowed = budget.remaining() if budget is not None else {}
+            limits = dict(allowed)
+            if sharing is not None:
+                limits["conflicts"] = min(limits.get("conflicts", sharing["interval"]), sharing["interval"])
+            for name, left in limits.items():
+                cadical.ccadical_limit(self.handle, name.encode(), min(left, 2**31 - 1))
+            result = cadical.ipasir_solve(self.handle)
+            if budget is not None and budget.limits:
+                counters = self.spent_counters()
+                used = {name: counters[name] - self.counted.get(name, 0) for name in budget.limits}
+                self.counted = counters
+                # stopped by the conflicts left, all spent (the learned clauses may fall short of the conflicts)
+                if result == 0 and "conflicts" in allowed and limits["conflicts"] == allowed["conflicts"] \
+                        and used.get("decisions", 0) < allowed.get("decisions", 1) and not budget.expired() \
+                        and not (self.terminate is not None and self.terminate()):
+                    used["conflicts"] = max(used["conflicts"], allowed["conflicts"])
+                budget.spend(used)
+            # a slice of a shared search ends with result 0 at its conflict limit: import and go on
+            if result != 0 or sharing is None or (budget is not None and budget.exhausted()) \
+                    or (self.terminate is not None and self.terminate()):
+                return result
+            # the assumptions only hold for one call
+            for assumption in assumptions:
+                cadical.ipasir_assume(self.handle, assumption)
+
+    def val (self, literal):
+        return cadical.ipasir_val(self.handle, literal)
+
+    def failed (self, literal):
+        return cadical.ipasir_failed(self.handle, literal)
+
+    '''
+        Returns the values of `literals` (a sequence of ints) in the last model as an
+        int32 NumPy array, like `val`: the literal if it is true, its negation
+        otherwise. The values are read with a single native call (`ipasir_val_buffer`),
+        or one `ipasir_val` call per literal if the bulk helper library is not built.
+    '''
+    def values (self, literals):
+        literals = np.ascontiguousarray(literals, dtype=np.int32)
+        values = np.empty(len(literals), dtype=np.int32)
+        if bulk is None:
+            for i, literal in enumerate(literals.tolist()):
+                values[i] = cadical.ipasir_val(self.handle, literal)
+        elif len(literals) > 0:
+            bulk.ipasir_val_buffer(ctypes.cast(cadical.ipasir_val, ctypes.c_void_p), self.handle,
+                                   literals.ctypes.data, values.ctypes.data, len(literals))
+        return values
+
+    '''
+        Returns the search statistics of the session as a dictionary: the numbers of
+        active variables and irredundant clauses (`ccadical_active`,
+        `ccadical_irredundant`), and the counters of `ccadical_print_statistics`
+        (conflicts, decisions, propagations, restarts, learned clauses, ...), which the
+        C API only prints. They are parsed from the "statistics" section of the
+        printout ("c --- [ statistics ] ---", then "c name: value ..." lines), so they
+        depend on its layout.
+
+        The printout is captured in memory by the helper library (`capture_statistics`,
+        which briefly points the C `stdout` stream of the process elsewhere). Without the
+        library, the process's standard output (file descriptor 1) is redirected to a
+        temporary file during the call (one session at a time, under `stdout_lock`), and
+        whatever other threads print meanwhile is lost: worker threads must not call it
+        without the library. Either way, this is meant for reports at the end of a check; the only
+        solver calls reading it are those of a decision budget (see `Budget`).
+    '''
+    def statistics (self):
+        # CaDiCaL leaves out the counters that are still 0
+        stats = {"active": cadical.ccadical_active(self.handle),
+                 "irredundant": cadical.ccadical_irredundant(self.handle),
+                 "conflicts": 0, "decisions": 0, "propagations": 0}
+        if bulk is not None:
+            size = c_size_t()
+            buffer = bulk.capture_statistics(ctypes.cast(cadical.ccadical_print_statistics, ctypes.c_void_p),
+                                             self.handle, ctypes.byref(size))
+            text = ctypes.string_at(buffer, size.value).decode() if buffer else ""
+            bulk.capture_free(buffer)
+        else:
+            text = self.print_statistics()
+        section = None
+        for line in text.splitlines():
+            fields = line[1:].split() if line.startswith("c") else []
+            if len(fields) >= 2 and fields[0] == "---":
+                section = fields[2] if len(fields) > 2 else None
+            elif section == "statistics" and len(fields) >= 2 and fields[0].endswith(":"):
+                try:
+                    stats[fields[0][:-1]] = int(fields[1])
+                except ValueError:
+                    continue
+        return stats
+
+    # the printout of `ccadical_print_statistics`, through a temporary file as fd 1
+    def print_statistics (self):
+        with stdout_lock, tempfile.TemporaryFile() as f:
+            sys.stdout.flush()
+            saved = os.dup(1)
+            os.dup2(f.fileno(), 1)
+            try:
+                cadical.ccadical_print_statistics(self.handle)
+                libc.fflush(None)
+            finally:
+                os.dup2(saved, 1)
+                os.close(saved)
+            f.seek(0)
+            return f.read().decode()
+
+    def print_result (self, result, i):
+        if result == 10:
+            print(f"")
+            print ("Assignments")
+            print ("-----")
+            values = self.values(np.arange(1, self.numvars+1)) > 0
+            print("".join(f"x{var} = {'True' if value else 'False'}, "
+                          for var, value in enumerate(values.tolist(), 1)), end='')
+            print("-----")
+            print ("-----")
+            print (f"SATISFIABLE. The property does not hold at step {i+1}")
+            return 10
+        elif result == 20:
+            print(f"UNSATISFIABLE up to step {i + 1}. The property holds!")
+            return 20
+        else:
+            reason = f" ({self.budget.describe()})" if self.budget is not None and self.budget.reason else ""
+            holds = f", the property holds up to step {i}" if i > 0 else ""
+            print(f"UNKNOWN or UNSOLVED at step {i + 1}{reason}{holds}")
+            return 0
+
+    '''
+        Solves a formula given in memory: `clauses` is an iterable of clauses (lists of
+        literals) and `assumptions` the list of activation literals, which are assumed
+        cumulatively, one more per solver call, until the formula becomes satisfiable.
+        Unless `cumulative`, each call assumes only the activation literal of its step.
+
+        Returns [result, step] with result 10 (SAT), 20 (UNSAT) or 0 (unknown).
+    '''
+    def solve_formula (self, nv, clauses, assumptions, cumulative = True):
+        self.add_clauses(clauses)
+        return self.solve_assumptions(nv, assumptions, cumulative)
+
+    '''
+        As `solve_formula`, the clauses being given as an iterable of zero-terminated
+        chunks (see `add_literals`), e.g. `CNFConverter.clause_chunks ()`, added one
+        chunk at a time.
+    '''
+    def solve_stream (self, nv, chunks, assumptions, cumulative = True):
+        for literals in chunks:
+            self.add_literals(literals)
+        return self.solve_assumptions(nv, assumptions, cumulative)
+
+    def solve_assumptions (self, nv, assumptions, cumulative = True):
+        self.numvars = max(self.numvars, nv)
+        current_assumtions = []
+        result = 0
+        i = 0
+        for i, assumption in enumerate(assumptions):
+            if not cumulative:
+                current_assumtions = []
+            current_assumtions.append (assumption)
+            self.add_assmuptions (current_assumtions)
+            result = self.solve()
+            if self.verbose:
+                self.print_result (result, i)
+            if result != 20:
+                break
+        return [result, i]
+
+    '''
+        Incremental BMC on the live solver: the steps are added one at a time, step t+1
+        being encoded and added only once step t is proved UNSAT, so the clauses learned
+        at smaller depths are kept and steps that are never reached cost nothing.
+
+        `next_step(t)` returns the zero-terminated clauses of step t (see `add_literals`)
+        and its activation literal. Stops at the first SAT result, after `max_depth`, or
+        once `timeout` seconds have elapsed (checked between depths). The activation
+        literals are assumed as in `solve_formula`.
+
+        Returns [result, depth] with result 10 (SAT), 20 (UNSAT up to depth) or 0 (unknown).
+    '''
+    def solve_incremental (self, next_step, max_depth, timeout = None, cumulative = True):
+        start = time.time()
+        result = 0
+        for result, t in self.incremental_results(next_step, max_depth, cumulative):
+            if self.verbose:
+                self.print_result (result, t)
+            if result != 20:
+                return [result, t]
+            if timeout is not None and time.time() - start > timeout and t < max_depth:
+                if self.verbose:
+                    print(f"UNKNOWN: timeout of {timeout}s reached after step {t + 1}")
+                return [0, t]
+        return [result, max_depth]
+
+    '''
+        The loop of `solve_incremental`, as a generator: adds the steps one at a time
+        and yields [result, t] after solving depth t, up to `max_depth` or the first
+        result other than 20. The caller decides between depths whether to go on.
+    '''
+    def incremental_results (self, next_step, max_depth, cumulative = True):
+        current_assumtions = []
+        for t in range(max_depth + 1):
+            literals, assumption = next_step(t)
+            self.add_literals(literals)
+            if not cumulative:
+                current_assumtions = []
+            current_assumtions.append (assumption)
+            self.add_assmuptions (current_assumtions)
+            result = self.solve()
+            yield [result, t]
+            if result != 20:
+                return
+
+'''
+    Reads a DIMACS CNF file (plain, .gz or .xz) into a flat clause buffer (see
+    `dimacs.read_dimacs`), and returns [nvars, nclauses, clauses].
+'''
 def get_formula(formulapath):
-    with open(formulapath, 'r') as file:
-        clauses = []
-        nvars = nclauses = 0
-
-        for line in file:
-            if line.startswith('c') or line.strip() == '':
-                continue
-            if line.startswith('p'):
-                parts = line.split()
-                nvars = int(parts[2])
-                nclauses = int(parts[3])
-            else:
-                clause = list(map(int, line.strip().split()[:-1]))
-                clauses.append(clause)
-    
-    return [nvars, nclauses, clauses]
+    return read_dimacs(formulapath)
 
 def get_assumptions(assumptionspath):
     with open(assumptionspath, 'r') as file:
@@ -59,42 +640,28 @@ def get_assumptions(assumptionspath):
         a = list(map(int, line.split(',')))
     return a
 
-    
-def print_result (result, i):
-    if result == 10:
-        print(f"")
-        print ("Assignments")
-        print ("-----")
-        for var in range(1, numvars+1):
-            value = cadical.ipasir_val(solver, var)
-            print(f"x{var} = {'True' if value > 0 else 'False'}", end=', ')
-        print("-----")
-        print ("-----")
-        print (f"SATISFIABLE. The property does not hold at step {i+1}")
-        return 10
-    elif result == 20:
-        print(f"UNSATISFIABLE up to step {i + 1}. The property holds!")
-        return 20
-    else:
-        print(f"UNKNOWN or UNSOLVED up to step {i + 1}")
-        return 0
-
-def release ():
-    cadical.ipasir_release(solver)
-
-
-def solve (formulapath, assumptionspath):
+
+'''
+    Module-level checks, each in a fresh session; under `budget` (see `Budget`) if
+    given, a check that runs out of it returns [0, depth], the property holding up to
+    step depth.
+'''
+def solve (formulapath, assumptionspath, budget = None):
     [nv, nc, clauses] = get_formula (formulapath)
-    numvars = nv
     assumptions = get_assumptions (assumptionspath)
-    #print (clauses)
-    #print (assumptions)
-    add_clauses(clauses)
-    current_assumtions = []
-    for i, assumption in enumerate(assumptions):
-        current_assumtions.append (assumption)
-        add_assmuptions (current_assumtions)
-        result = cadical.ipasir_solve(solver)
-        print_result (result, i)
-        if result != 20:
-            return 
+    return solve_formula (nv, clauses, assumptions, True, budget)
+
+def solve_formula (nv, clauses, assumptions, cumulative = True, budget = None):
+    with Solver() as solver:
+        solver.set_budget(budget)
+        return solver.solve_formula (nv, clauses, assumptions, cumulative)
+
+def solve_stream (nv, chunks, assumptions, cumulative = True, budget = None):
+    with Solver() as solver:
+        solver.set_budget(budget)
+        return solver.solve_stream (nv, chunks, assumptions, cumulative)
+
+def solve_incremental (next_step, max_depth, timeout = None, cumulative = True, budget = None):
+    with Solver() as solver:
+        solver.set_budget(budget)
+        return solver.solve_incremental (next_step, max_depth, timeout, cumulative)
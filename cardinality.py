@@ -0,0 +1,145 @@
+from tseitin import TseitinEncoder
+
+'''
+    The `CardinalityEncoder` class generates exactly-one / at-most-one constraints over
+    literal strings, used to force a one-hot `int` atom to take exactly one value per
+    step. Besides the naive pairwise encoding (O(n^2) clauses), it provides encodings
+    with auxiliary atoms and a linear (or close to linear) number of clauses:
+
+    - sequential: sequential counter (Sinz), n-1 auxiliary atoms, 3n-4 clauses;
+    - ladder: ladder encoding (Gent & Nightingale), n-1 auxiliary atoms fully channelled
+      to the literals, which also gives at-least-one;
+    - commander: commander encoding (Klieber & Kwon), groups of 3 literals with one
+      commander atom each, recursively;
+    - product: 2-product encoding (Chen), about 2*sqrt(n) auxiliary atoms, recursively.
+
+    "auto" picks one by the number of literals. Auxiliary atoms are obtained from
+    `new_auxiliary_atom`, as for `TseitinEncoder`, whose literal helpers are reused.
+
+    Example:
+        Input: exactly_one (['x_0', 'x_1', 'x_2'], 'sequential')
+        Output: [['x_0', 'x_1', 'x_2'], ['~x_0', 'AUX0'], ['~x_1', 'AUX1'], ['~AUX0', 'AUX1'],
+                 ['~x_1', '~AUX0'], ['~x_2', '~AUX1']]
+'''
+
+class CardinalityEncoder (TseitinEncoder):
+    auto_str = "auto"
+    pairwise_str = "pairwise"
+    sequential_str = "sequential"
+    commander_str = "commander"
+    product_str = "product"
+    ladder_str = "ladder"
+    none_str = "none"
+    encodings = [auto_str, pairwise_str, sequential_str, commander_str, product_str, ladder_str, none_str]
+    commander_group_size = 3
+
+    '''
+        Picks an encoding by number of literals: pairwise while it is small enough to
+        beat the auxiliary atoms, then the sequential counter, the commander encoding,
+        and the product encoding for large domains.
+    '''
+    def choose (self, n):
+        if n <= 5:
+            return self.pairwise_str
+        if n <= 32:
+            return self.sequential_str
+        if n <= 256:
+            return self.commander_str
+        return self.product_str
+
+    def exactly_one (self, lits, encoding = auto_str):
+        if encoding == self.auto_str:
+            encoding = self.choose (len (lits))
+        if encoding == self.ladder_str:
+            return self.ladder (lits)
+        return [list (lits)] + self.at_most_one (lits, encoding)
+
+    def at_most_one (self, lits, encoding = auto_str):
+        if len (lits) <= 1:
+            return []
+        if encoding == self.auto_str:
+            encoding = self.choose (len (lits))
+        if encoding == self.pairwise_str or len (lits) <= 2:
+            return self.pairwise (lits)
+        if encoding == self.sequential_str:
+            return self.sequential (lits)
+        if encoding == self.commander_str:
+            return self.commander (lits)
+        if encoding == self.product_str:
+            return self.product (lits)
+        if encoding == self.ladder_str:
+            return self.ladder (lits) [1:]
+        raise ValueError (f"Unknown at-most-one encoding: {encoding}")
+
+    def pairwise (self, lits):
+        clauses = []
+        for i in range (len (lits)):
+            for j in range (i + 1, len (lits)):
+                clauses.append ([self.negate (lits [i]), self.negate (lits [j])])
+        return clauses
+
+    # s_i: one of the first i literals is true
+    def sequential (self, lits):
+        n = len (lits)
+        s = [self.new_auxiliary_atom () for i in range (n - 1)]
+        clauses = [[self.negate (lits [0]), s [0]]]
+        for i in range (1, n - 1):
+            clauses.append ([self.negate (lits [i]), s [i]])
+            clauses.append ([self.negate (s [i - 1]), s [i]])
+            clauses.append ([self.negate (lits [i]), self.negate (s [i - 1])])
+        clauses.append ([self.negate (lits [n - 1]), self.negate (s [n - 2])])
+        return clauses
+
+    '''
+        Ladder y_1 >= ... >= y_(n-1), with lit_i <-> y_(i-1) & ~y_i. The first clause
+        returned is the ladder's at-least-one part, dropped by `at_most_one`.
+    '''
+    def ladder (self, lits):
+        n = len (lits)
+        if n == 1:
+            return [[lits [0]]]
+        y = [self.new_auxiliary_atom () for i in range (n - 1)]
+        clauses = [[lits [0], y [0]]]
+        for i in range (1, n - 1):
+            clauses.append ([self.negate (y [i]), y [i - 1]])
+        clauses.append ([self.negate (lits [0]), self.negate (y [0])])
+        for i in range (1, n - 1):
+            clauses.append ([self.negate (lits [i]), y [i - 1]])
+            clauses.append ([self.negate (lits [i]), self.negate (y [i])])
+            clauses.append ([lits [i], self.negate (y [i - 1]), y [i]])
+        clauses.append ([self.negate (lits [n - 1]), y [n - 2]])
+        clauses.append ([lits [n - 1], self.negate (y [n - 2])])
+        return clauses
+
+    # c_j <-> one literal of group j is true; at most one commander recursively
+    def commander (self, lits):
+        if len (lits) <= self.commander_group_size:
+            return self.pairwise (lits)
+        clauses = []
+        commanders = []
+        for g in range (0, len (lits), self.commander_group_size):
+            group = lits [g:g + self.commander_group_size]
+            c = self.new_auxiliary_atom ()
+            commanders.append (c)
+            clauses.extend (self.pairwise (group))
+            clauses.append ([self.negate (c)] + group)
+            for lit in group:
+                clauses.append ([c, self.negate (lit)])
+        return clauses + self.commander (commanders)
+
+    # literal i sits at row i // q and column i % q of a p x q grid
+    def product (self, lits):
+        n = len (lits)
+        if n <= 4:
+            return self.pairwise (lits)
+        q = 1
+        while q * q < n:
+            q += 1
+        p = (n + q - 1) // q
+        rows = [self.new_auxiliary_atom () for i in range (p)]
+        columns = [self.new_auxiliary_atom () for j in range (q)]
+        clauses = []
+        for i, lit in enumerate (lits):
+            clauses.append ([self.negate (lit), rows [i // q]])
+            clauses.append ([self.negate (lit), columns [i % q]])
+        return clauses + self.product (rows) + self.product (columns)
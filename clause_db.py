@@ -0,0 +1,87 @@
+from array import array
+import numpy as np
+
+'''
+    The `ClauseDatabase` class stores clauses in one flat, zero-terminated int32 buffer
+    (`literals`, an `array('i')`), and the position of the first literal of every clause
+    in `offsets` (an `array('q')` ending with the length of the buffer). A literal costs
+    4 bytes and a clause 8 more, instead of a Python list of Python ints per clause.
+
+    The buffer is in the format expected by `Solver.add_literals` and
+    `DimacsWriter.write`, so the encoder, the DIMACS writer and the solver loader share
+    it without conversion. For compatibility, the database also behaves as a sequence
+    of clauses (lists of literals): `len`, indexing and iteration.
+
+    Example:
+        clauses = ClauseDatabase ()
+        clauses.append ([1, -2])
+        clauses.extend_literals (np.array ([3, 0, -1, 2, 0], dtype=np.int32))
+        len (clauses), clauses [1], list (clauses)  # 3, [3], [[1, -2], [3], [-1, 2]]
+'''
+
+class ClauseDatabase:
+    __slots__ = ("literals", "offsets")
+
+    def __init__ (self):
+        self.literals = array ('i')
+        self.offsets = array ('q', [0])
+
+    def __len__ (self):
+        return len (self.offsets) - 1
+
+    def __getitem__ (self, i):
+        if i < 0:
+            i += len (self)
+        if not 0 <= i < len (self):
+            raise IndexError ("clause index out of range")
+        return self.literals [self.offsets [i]:self.offsets [i + 1] - 1].tolist ()
+
+    def __iter__ (self):
+        literals = self.literals
+        offsets = self.offsets
+        for i in range (len (offsets) - 1):
+            yield literals [offsets [i]:offsets [i + 1] - 1].tolist ()
+
+    def append (self, clause):
+        self.literals.extend (clause)
+        self.literals.append (0)
+        self.offsets.append (len (self.literals))
+
+    def extend (self, clauses):
+        if isinstance (clauses, ClauseDatabase):
+            base = len (self.literals)
+            self.literals.extend (clauses.literals)
+            self.offsets.extend (offset + base for offset in clauses.offsets [1:])
+            return
+        for clause in clauses:
+            self.append (clause)
+
+    '''
+        Appends a chunk of zero-terminated clauses (a NumPy array or an `array('i')`).
+    '''
+    def extend_literals (self, literals):
+        literals = np.asarray (literals, dtype=np.int32)
+        base = len (self.literals)
+        self.literals.frombytes (literals.tobytes ())
+        self.offsets.frombytes ((np.flatnonzero (literals == 0) + (base + 1)).astype (np.int64).tobytes ())
+
+    # zero-copy int32 view of the buffer
+    def as_array (self):
+        return np.frombuffer (self.literals, dtype=np.int32)
+
+    '''
+        Yields the buffer in zero-terminated chunks of about `size` literals, cut at
+        clause boundaries (NumPy views, without copy).
+    '''
+    def chunks (self, size = 1 << 20):
+        literals = self.as_array ()
+        offsets = np.frombuffer (self.offsets, dtype=np.int64)
+        start = 0
+        while start < len (literals):
+            i = np.searchsorted (offsets, start + size, side='right') - 1
+            end = int (offsets [i]) if offsets [i] > start else int (offsets [np.searchsorted (offsets, start, side='right')])
+            yield literals [start:end]
+            start = end
+
+    def nbytes (self):
+        return self.literals.itemsize * len (self.literals) + self.offsets.itemsize * len (self.offsets)
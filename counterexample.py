@@ -0,0 +1,123 @@
+import csv
+import json
+import numpy as np
+
+'''
+    The `TraceDecoder` class turns the model of a satisfiable unrolling into a readable
+    counterexample: for every requested step, the value of every requested state atom,
+    and (relational semantics) the rules fired from that step to the next.
+
+    The CNF variables are laid out by step with a uniform stride (see `StepVariables`),
+    so the variables of the requested atoms at the requested steps are computed as one
+    array, and their values read with a single native call (`Solver.values`); the
+    decoding then works on a (steps x columns) table of booleans. Only the requested
+    steps and atoms are read. Values are decoded by encoding: a boolean atom is its
+    variable, a one-hot `int` atom takes the value whose variable is true, a log atom
+    the value at the position given by its bits, and an order atom the value at the
+    position given by the number of its true bits.
+
+    Steps are numbered from 1, as in the verdicts of the solver ("The property does
+    not hold at step k").
+
+    Attributes:
+        atoms (list): The symbols of the decoded state atoms.
+        rules (list): The rules whose firing is decoded (relational semantics).
+
+    Example:
+        decoder = TraceDecoder (cnfConverter, ["index", "error"])
+        result, depth = solver.solve_formula (...)
+        trace = decoder.decode (solver, depth)
+        write_trace (trace, "trace.csv")
+'''
+
+class TraceDecoder:
+    def __init__ (self, cnfConverter, atoms = None):
+        self.cnfConverter = cnfConverter
+        variables = cnfConverter.state_to_cnf_vars [0]
+        symbols = [symbol for states in cnfConverter.state_variables.values () for symbol in states]
+        if atoms is not None:
+            unknown = [symbol for symbol in atoms if symbol not in symbols]
+            if unknown:
+                raise ValueError ("unknown state atoms: " + ", ".join (unknown))
+            symbols = [symbol for symbol in symbols if symbol in atoms]
+        self.atoms = symbols
+        self.columns = []
+        self.decoders = []
+        for symbol in symbols:
+            atom = cnfConverter.symbol_atom_map [symbol]
+            first = len (self.columns)
+            self.columns.extend (variables [key] for key in cnfConverter.atom_keys (symbol))
+            self.decoders.append ((symbol, atom, first, len (self.columns)))
+        self.rules = list (cnfConverter.action_atoms) if cnfConverter.relational else []
+        self.action_columns = len (self.columns)
+        self.columns.extend (variables [(cnfConverter.action_atoms [rule], None)] for rule in self.rules)
+        self.columns = np.array (self.columns, dtype=np.int64)
+
+    '''
+        Reads the values of the decoded variables at `steps` (numbered from 1) from the
+        last model of `solver`, and returns them as a (steps x columns) boolean array.
+    '''
+    def extract (self, solver, steps):
+        offsets = (np.asarray (steps, dtype=np.int64) - 1) * self.cnfConverter.step_nvars
+        variables = (self.columns [None, :] + offsets [:, None]).ravel ()
+        return (solver.values (variables) > 0).reshape (len (offsets), len (self.columns))
+
+    '''
+        Decodes the counterexample found by `solver` at `depth` (the depth returned by
+        the solver, the violation being at step depth+1), at `steps` (numbered from 1,
+        all the steps of the counterexample by default). Returns a list with one entry
+        per step: {"step": k, "state": {atom: value}, "fired": [rules]}, "fired" being
+        present with a relational semantics only, and empty at the last step (no rule
+        fires after the violation). A value is a boolean, a value of the domain, or
+        None if the variables do not encode a value (one-hot atoms without
+        exactly-one constraints).
+    '''
+    def decode (self, solver, depth, steps = None):
+        steps = list (range (1, depth + 2)) if steps is None else sorted (set (steps))
+        if any (k < 1 or k > depth + 1 for k in steps):
+            raise ValueError (f"the counterexample has steps 1 to {depth + 1}")
+        table = self.extract (solver, steps)
+        trace = []
+        for k, row in zip (steps, table):
+            state = {}
+            for symbol, atom, first, end in self.decoders:
+                state [symbol] = self.decode_atom (atom, row [first:end])
+            entry = {"step": k, "state": state}
+            if self.cnfConverter.relational:
+                fired = row [self.action_columns:]
+                entry ["fired"] = [rule for rule, on in zip (self.rules, fired) if on] if k <= depth else []
+            trace.append (entry)
+        return trace
+
+    def decode_atom (self, atom, bits):
+        if atom.type == atom.boolean_str:
+            return bool (bits [0])
+        if atom.encoding == atom.onehot_encoding_str:
+            positions = np.flatnonzero (bits)
+            return atom.domain [positions [0]] if len (positions) == 1 else None
+        if atom.encoding == atom.log_encoding_str:
+            position = int (np.dot (bits, 1 << np.arange (len (bits)))) if len (bits) > 0 else 0
+        else:
+            position = int (np.count_nonzero (bits))
+        return atom.domain [position] if position < len (atom.domain) else None
+
+'''
+    Writes a decoded trace (see `TraceDecoder.decode`) to `path`: as JSON, or as CSV
+    (one row per step, one column per atom, and the fired rules separated by ";") if
+    the path ends with ".csv".
+'''
+def write_trace (trace, path):
+    if not path.endswith (".csv"):
+        with open (path, 'w') as f:
+            json.dump (trace, f, indent=2)
+        return
+    atoms = list (trace [0] ["state"]) if trace else []
+    fired = bool (trace) and "fired" in trace [0]
+    with open (path, 'w', newline='') as f:
+        writer = csv.writer (f)
+        writer.writerow (["step"] + atoms + (["fired"] if fired else []))
+        for entry in trace:
+            row = [entry ["step"]] + [entry ["state"] [symbol] for symbol in atoms]
+            if fired:
+                row.append (";".join (entry ["fired"]))
+            writer.writerow (row)
@@ -0,0 +1,246 @@
+import ctypes
+import gzip
+import lzma
+import mmap
+import os
+import shutil
+import tempfile
+import numpy as np
+from clause_db import ClauseDatabase
+
+# optional native tokenizer (cadical-lib/ipasir_bulk.c, built with `make -C cadical-lib`)
+try:
+    native = ctypes.CDLL ("./cadical-lib/libipasir_bulk.so")
+    native.dimacs_parse.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p,
+                                    ctypes.POINTER (ctypes.c_long), ctypes.POINTER (ctypes.c_int)]
+    native.dimacs_parse.restype = ctypes.c_long
+except (OSError, AttributeError):
+    native = None
+
+'''
+    The `DimacsWriter` class streams clauses into a DIMACS CNF file, optionally gzip or
+    xz compressed, through a write buffer of about `buffer_size` characters, so that the
+    memory used does not depend on the size of the formula.
+
+    Clauses are written in chunks of zero-terminated literals (see
+    `CNFConverter.clause_chunks`), each chunk being formatted at once. When `nvars` and
+    `nclauses` are known up front, the header is written first (and the clause count is
+    checked on `close`); otherwise the counts are collected while writing, and the
+    header, first written as a padded placeholder, is patched at the end. A compressed
+    stream cannot be patched in place, so its clauses are then spooled into a temporary
+    file, compressed behind the header on `close`.
+
+    Attributes:
+        path (str): The output file.
+        compression (str): None, "gzip" or "xz" (by default, from the extension of `path`).
+        nvars (int), nclauses (int): The counts of the clauses written so far.
+
+    Example:
+        with DimacsWriter ("model_k10.cnf.gz") as writer:
+            for literals in cnfConverter.clause_chunks ():
+                writer.write (literals)
+'''
+
+class DimacsWriter:
+    compressions = {"gzip": ".gz", "xz": ".xz"}
+    openers = {"gzip": gzip.open, "xz": lzma.open}
+    header_width = 48
+
+    def __init__ (self, path, nvars = None, nclauses = None, compression = None, buffer_size = 1 << 20):
+        if compression is None:
+            compression = next ((name for name, extension in self.compressions.items () if path.endswith (extension)), None)
+        self.path = path
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.header_nvars = nvars
+        self.header_nclauses = nclauses
+        self.nvars = 0
+        self.nclauses = 0
+        self.pending = []
+        self.pending_size = 0
+        self.spool_path = None
+        known = nvars is not None and nclauses is not None
+        if known:
+            self.file = self.open (path)
+            self.file.write (self.header (nvars, nclauses).encode ())
+        elif compression is None:
+            self.file = open (path, 'wb')
+            self.file.write (self.header (0, 0) [:-1].ljust (self.header_width - 1).encode () + b'\n')
+        else:
+            descriptor, self.spool_path = tempfile.mkstemp (suffix=".cnf", dir=os.path.dirname (os.path.abspath (path)))
+            self.file = os.fdopen (descriptor, 'wb')
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close ()
+        else:
+            self.file.close ()
+            if self.spool_path is not None:
+                os.remove (self.spool_path)
+
+    def open (self, path):
+        if self.compression is None:
+            return open (path, 'wb')
+        return self.openers [self.compression] (path, 'wb')
+
+    def header (self, nvars, nclauses):
+        return "p cnf "+str (nvars)+" "+str (nclauses)+"\n"
+
+    '''
+        Writes a chunk of zero-terminated clauses (a NumPy array, an `array('i')` or a
+        list of literals).
+    '''
+    def write (self, literals):
+        literals = np.asarray (literals)
+        if len (literals) == 0:
+            return
+        self.nclauses += int (np.count_nonzero (literals == 0))
+        self.nvars = max (self.nvars, int (np.abs (literals).max ()))
+        # a token " 0" is always a clause terminator, no literal starting with 0
+        text = " " + " ".join (map (str, literals.tolist ()))
+        text = text.replace (" 0", " 0\n").replace ("\n ", "\n") [1:]
+        self.pending.append (text)
+        self.pending_size += len (text)
+        if self.pending_size >= self.buffer_size:
+            self.flush ()
+
+    # writes a list of clauses (lists of literals), or the buffer of a `ClauseDatabase`
+    def write_clauses (self, clauses):
+        if isinstance (clauses, ClauseDatabase):
+            for literals in clauses.chunks (self.buffer_size // 8 + 1):
+                self.write (literals)
+            return
+        literals = []
+        for clause in clauses:
+            literals.extend (clause)
+            literals.append (0)
+        self.write (literals)
+
+    def flush (self):
+        if self.pending:
+            self.file.write ("".join (self.pending).encode ())
+            self.pending = []
+            self.pending_size = 0
+
+    def close (self):
+        self.flush ()
+        if self.header_nvars is not None and self.header_nclauses is not None:
+            self.file.close ()
+            if self.header_nclauses != self.nclauses:
+                raise ValueError (f"{self.path}: header announces {self.header_nclauses} clauses, {self.nclauses} written")
+            return
+        header = self.header (self.nvars, self.nclauses)
+        if self.spool_path is None:
+            if len (header) > self.header_width:
+                raise ValueError (f"{self.path}: header too long to be patched: {header}")
+            self.file.seek (0)
+            self.file.write (header [:-1].ljust (self.header_width - 1).encode () + b'\n')
+            self.file.close ()
+            return
+        self.file.close ()
+        try:
+            with self.open (self.path) as out, open (self.spool_path, 'rb') as body:
+                out.write (header.encode ())
+                shutil.copyfileobj (body, out, self.buffer_size)
+        finally:
+            os.remove (self.spool_path)
+
+'''
+    Reads a DIMACS CNF file (plain, gzip or xz compressed, by extension) into a
+    `ClauseDatabase`, and returns [nvars, nclauses, clauses], the counts being those of
+    the header.
+
+    A plain file is memory-mapped, and a compressed one decompressed as a stream; either
+    way the text is tokenized in bulk, `block_size` bytes at a time (cut at a line end),
+    straight into the flat literal buffer: by `dimacs_parse` of the native helper library
+    (cadical-lib/ipasir_bulk.c, built with `make -C cadical-lib`) when available,
+    reading the mapped pages in place, or else by NumPy (`np.fromstring` with a
+    separator), blocks holding comment lines ("c ..."), the header ("p cnf ...") or the
+    "%" end marker of some benchmark files being filtered line by line first. The
+    buffer can be handed to the solver as is (`Solver.add_clauses`).
+'''
+def read_dimacs (path, block_size = 64 << 20):
+    reader = DimacsReader ()
+    compression = next ((name for name, extension in DimacsWriter.compressions.items () if path.endswith (extension)), None)
+    if compression is not None:
+        with DimacsWriter.openers [compression] (path, 'rb') as f:
+            rest = b''
+            while not reader.done:
+                data = f.read (block_size)
+                if not data:
+                    reader.parse (np.frombuffer (rest, dtype=np.uint8))
+                    break
+                data = rest + data
+                end = data.rfind (b'\n') + 1
+                if end == 0:
+                    rest = data
+                    continue
+                reader.parse (np.frombuffer (data, dtype=np.uint8, count=end))
+                rest = data [end:]
+    else:
+        with open (path, 'rb') as f:
+            if os.fstat (f.fileno ()).st_size > 0:
+                with mmap.mmap (f.fileno (), 0, access=mmap.ACCESS_READ) as data:
+                    text = np.frombuffer (data, dtype=np.uint8)
+                    pos = 0
+                    while pos < len (data) and not reader.done:
+                        end = data.rfind (b'\n', pos, pos + block_size) + 1 if pos + block_size < len (data) else len (data)
+                        if end <= pos:
+                            end = data.find (b'\n', pos + block_size) + 1 or len (data)
+                        reader.parse (text [pos:end])
+                        pos = end
+                    del text
+    return reader.finish ()
+
+class DimacsReader:
+    special_lines = (b'c', b'p', b'%')
+
+    def __init__ (self):
+        self.clauses = ClauseDatabase ()
+        self.nvars = 0
+        self.nclauses = 0
+        self.done = False
+
+    # parses a block of whole lines (a uint8 NumPy array)
+    def parse (self, block):
+        if len (block) == 0:
+            return
+        if native is not None:
+            literals = np.empty (len (block) // 2 + 1, dtype=np.int32)
+            header = (ctypes.c_long * 2) (self.nvars, self.nclauses)
+            done = ctypes.c_int (0)
+            count = native.dimacs_parse (block.ctypes.data, len (block), literals.ctypes.data, header, ctypes.byref (done))
+            self.nvars, self.nclauses = header [0], header [1]
+            self.done = bool (done.value)
+            literals = literals [:count]
+        else:
+            literals = self.parse_text (block.tobytes ())
+        if len (literals) > 0:
+            self.clauses.extend_literals (literals)
+
+    def parse_text (self, block):
+        if block.startswith (self.special_lines) or any (b'\n' + prefix in block for prefix in self.special_lines):
+            lines = []
+            for line in block.split (b'\n'):
+                line = line.strip ()
+                if line.startswith (b'%'):
+                    self.done = True
+                    break
+                if line.startswith (b'p'):
+                    fields = line.split ()
+                    self.nvars = int (fields [2])
+                    self.nclauses = int (fields [3])
+                elif line and not line.startswith (b'c'):
+                    lines.append (line)
+            block = b' '.join (lines)
+        return np.fromstring (block, dtype=np.int32, sep=' ')
+
+    def finish (self):
+        literals = self.clauses.literals
+        if len (literals) > 0 and literals [-1] != 0:
+            # last clause without its terminator
+            self.clauses.extend_literals (np.zeros (1, dtype=np.int32))
+        return [self.nvars, self.nclauses, self.clauses]
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# bump when the normalized output of the encoder changes, to invalidate older entries
+CACHE_VERSION = 1
+
+'''
+    The `FormulaCache` class is a content-addressed, size-bounded LRU cache of JSON
+    values, kept in memory and, when `directory` is given, on disk (one file per key,
+    <directory>/<key>.json), so that it persists across runs.
+
+    The memory layer holds at most `max_entries` values; the disk layer at most
+    `max_bytes` bytes, evicting the least recently used files (by modification time,
+    which is refreshed on every hit).
+
+    Attributes:
+        directory (str): The directory of the disk layer, or None for memory only.
+        max_entries (int): The capacity of the memory layer.
+        max_bytes (int): The capacity of the disk layer.
+        hits (int), misses (int): Lookup counters.
+
+    Example:
+        cache = FormulaCache (".bmc_cache")
+        key = cache.key ("transitions", spec ["transitions"], "tseitin")
+        if cache.get (key) is None:
+            cache.put (key, {"constraints": ..., "aux": 12})
+'''
+
+class FormulaCache:
+    def __init__ (self, directory = None, max_bytes = 256 * 1024 * 1024, max_entries = 65536):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.memory = OrderedDict ()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs (directory, exist_ok=True)
+
+    '''
+        Returns the content address of `parts` (any JSON-serializable values).
+    '''
+    @staticmethod
+    def key (*parts):
+        text = json.dumps ([CACHE_VERSION] + list (parts), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256 (text.encode ()).hexdigest ()
+
+    def path (self, key):
+        return os.path.join (self.directory, str (key) + ".json")
+
+    def get (self, key):
+        if key in self.memory:
+            self.memory.move_to_end (key)
+            self.hits += 1
+            return self.memory [key]
+        if self.directory is not None and isinstance (key, str):
+            try:
+                with open (self.path (key), 'r') as f:
+                    value = json.load (f)
+                os.utime (self.path (key))
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                self.hits += 1
+                self.remember (key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put (self, key, value):
+        self.remember (key, value)
+        if self.directory is not None and isinstance (key, str):
+            tmp_path = self.path (key) + ".tmp" + str (os.getpid ())
+            with open (tmp_path, 'w') as f:
+                json.dump (value, f)
+            os.replace (tmp_path, self.path (key))
+            self.evict ()
+
+    def remember (self, key, value):
+        self.memory [key] = value
+        self.memory.move_to_end (key)
+        while len (self.memory) > self.max_entries:
+            self.memory.popitem (last=False)
+
+    def evict (self):
+        entries = []
+        total = 0
+        for name in os.listdir (self.directory):
+            if not name.endswith (".json"):
+                continue
+            try:
+                stat = os.stat (os.path.join (self.directory, name))
+            except OSError:
+                continue
+            entries.append ((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        entries.sort ()
+        for mtime, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove (os.path.join (self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+# process-wide memo of normalized formulas, shared by all specifications
+formula_memo = FormulaCache ()
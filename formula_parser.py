@@ -0,0 +1,272 @@
+import re
+from sympy import Symbol, true, false
+from sympy.logic.boolalg import And, Or, Not, Implies, Equivalent, Xor, ITE
+
+'''
+    Lexer and parser of the expression language of specifications (the SymPy syntax
+    of the "init", "transitions" and "safety" sections):
+
+    - atoms: boolean atom symbols, `int` atom symbols with a value suffix
+      (elevator_floor_2), and the constants True and False;
+    - operators, by increasing precedence: |, ^, &, >> and << (implications), ~, and
+      the comparisons <, <=, >, >=, ==, != between `int` atom symbols (without value
+      suffix) and integers. Comparisons bind tightest, unlike in Python and SymPy:
+      x < 3 | y reads (x < 3) | y;
+    - the functions Implies, Equivalent, Xor, ITE, And, Or and Not.
+
+    A formula is tokenized and parsed in a single pass into a typed AST (`Const`, `Var`,
+    `Compare` and `Operation` nodes), whose atoms are resolved against the atoms of the
+    specification (`atoms`, symbol -> `Atom`) while parsing: a `Var` holds the key
+    (symbol, val) of the atom value it denotes, val being None for boolean atoms, i.e.,
+    the key of the atom in `CNFConverter.state_to_cnf_vars`. Later stages never split
+    atom names again.
+
+    Example:
+        Input: parse ("~door_open | elevator_floor_3")
+        Output: Operation ('Or', [Operation ('Not', [Var (('door_open', None))]),
+                                  Var (('elevator_floor', '3'))])
+'''
+
+class Const:
+    __slots__ = ("value",)
+
+    def __init__ (self, value):
+        self.value = value
+
+    def __repr__ (self):
+        return f"Const ({self.value!r})"
+
+class Var:
+    __slots__ = ("key",)
+
+    def __init__ (self, key):
+        self.key = key
+
+    def __repr__ (self):
+        return f"Var ({self.key!r})"
+
+# operands are int atom symbols (str) or integers (int)
+class Compare:
+    __slots__ = ("left", "op", "right")
+
+    def __init__ (self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+    def __repr__ (self):
+        return f"Compare ({self.left!r}, {self.op!r}, {self.right!r})"
+
+# op is the name of the SymPy function: Not, And, Or, Xor, Implies, Equivalent or ITE
+class Operation:
+    __slots__ = ("op", "args")
+
+    def __init__ (self, op, args):
+        self.op = op
+        self.args = args
+
+    def __repr__ (self):
+        return f"Operation ({self.op!r}, {self.args!r})"
+
+class FormulaParser:
+    token_pattern = re.compile (r'\s*(?:(\d+)|([a-zA-Z_]\w*)|(<=|>=|==|!=|>>|<<|[<>~&|^(),]))')
+    comparison_operators = ["<=", ">=", "==", "!=", "<", ">"]
+    binary_operators = [("|", "Or"), ("^", "Xor"), ("&", "And")]
+    functions = {"Implies": Implies, "Equivalent": Equivalent, "Xor": Xor, "ITE": ITE,
+                 "And": And, "Or": Or, "Not": Not}
+    constants = {"True": True, "False": False}
+    boolean_str = "boolean"
+    underscore_str = "_"
+    negation_str = "~"
+
+    def __init__ (self, atoms):
+        self.atoms = atoms
+        self.keys = {}
+        self.tokens = []
+        self.pos = 0
+
+    '''
+        Splits `text` into (kind, value) tokens, kind being "num", "name" or "op", and
+        ends the list with an ("end", None) token.
+    '''
+    def tokenize (self, text):
+        tokens = []
+        pos = 0
+        end = len (text.rstrip ())
+        while pos < end:
+            match = self.token_pattern.match (text, pos)
+            if match is None:
+                raise ValueError (f"Unexpected character '{text [pos:].lstrip () [:1]}' in formula: {text}")
+            number, name, op = match.groups ()
+            if number is not None:
+                tokens.append (("num", int (number)))
+            elif name is not None:
+                tokens.append (("name", name))
+            else:
+                tokens.append (("op", op))
+            pos = match.end ()
+        tokens.append (("end", None))
+        return tokens
+
+    def parse (self, text):
+        self.tokens = self.tokenize (text)
+        self.pos = 0
+        node = self.parse_binary (0)
+        if self.tokens [self.pos] [0] != "end":
+            raise ValueError (f"Unexpected '{self.tokens [self.pos] [1]}' in formula: {text}")
+        return node
+
+    def accept (self, op):
+        if self.tokens [self.pos] == ("op", op):
+            self.pos += 1
+            return True
+        return False
+
+    def expect (self, op):
+        if not self.accept (op):
+            raise ValueError (f"Expected '{op}', found '{self.tokens [self.pos] [1]}'")
+
+    # |, ^ and & by increasing precedence
+    def parse_binary (self, level):
+        if level == len (self.binary_operators):
+            return self.parse_implication ()
+        token, op = self.binary_operators [level]
+        args = [self.parse_binary (level + 1)]
+        while self.accept (token):
+            args.append (self.parse_binary (level + 1))
+        return args [0] if len (args) == 1 else Operation (op, args)
+
+    # a >> b is Implies (a, b), a << b is Implies (b, a), left associative
+    def parse_implication (self):
+        node = self.parse_unary ()
+        while True:
+            if self.accept (">>"):
+                node = Operation ("Implies", [node, self.parse_unary ()])
+            elif self.accept ("<<"):
+                node = Operation ("Implies", [self.parse_unary (), node])
+            else:
+                return node
+
+    def parse_unary (self):
+        if self.accept (self.negation_str):
+            return Operation ("Not", [self.parse_unary ()])
+        return self.parse_primary ()
+
+    def parse_primary (self):
+        kind, value = self.tokens [self.pos]
+        if self.accept ("("):
+            node = self.parse_binary (0)
+            self.expect (")")
+            return node
+        if kind not in ("name", "num"):
+            raise ValueError (f"Unexpected '{value}' in formula")
+        self.pos += 1
+        next_kind, next_value = self.tokens [self.pos]
+        if next_kind == "op" and next_value in self.comparison_operators:
+            self.pos += 1
+            right_kind, right = self.tokens [self.pos]
+            if right_kind not in ("name", "num"):
+                raise ValueError (f"Unexpected '{right}' in comparison")
+            self.pos += 1
+            return Compare (value, next_value, right)
+        if kind == "num":
+            raise ValueError (f"Unexpected integer {value} outside a comparison")
+        if value in self.functions and self.accept ("("):
+            args = [self.parse_binary (0)]
+            while self.accept (","):
+                args.append (self.parse_binary (0))
+            self.expect (")")
+            return Operation (value, args)
+        if value in self.constants:
+            return Const (self.constants [value])
+        return Var (self.resolve (value))
+
+    '''
+        Returns the key (symbol, val) of an atom name: (name, None) for a boolean atom,
+        and (symbol, val) for the name symbol_val of an `int` atom taking the value val.
+    '''
+    def resolve (self, name):
+        key = self.keys.get (name)
+        if key is not None:
+            return key
+        atom = self.atoms.get (name)
+        if atom is not None and atom.type == self.boolean_str:
+            key = (name, None)
+        else:
+            symbol, _, val = name.rpartition (self.underscore_str)
+            atom = self.atoms.get (symbol)
+            if atom is None or atom.type == self.boolean_str or val not in atom.domain:
+                raise ValueError (f"Unknown atom '{name}'")
+            key = (symbol, val)
+        self.keys [name] = key
+        return key
+
+    '''
+        Returns the symbols of the atoms a parsed formula refers to, including the
+        operands of its comparisons.
+    '''
+    def symbols (self, node):
+        if isinstance (node, Var):
+            return {node.key [0]}
+        if isinstance (node, Compare):
+            return {operand for operand in (node.left, node.right) if isinstance (operand, str)}
+        if isinstance (node, Operation):
+            result = set ()
+            for arg in node.args:
+                result |= self.symbols (arg)
+            return result
+        return set ()
+
+    def key_name (self, key):
+        return key [0] if key [1] is None else key [0] + self.underscore_str + key [1]
+
+    '''
+        Converts an AST without `Compare` nodes into the equivalent SymPy expression.
+    '''
+    def to_sympy (self, node):
+        if isinstance (node, Var):
+            return Symbol (self.key_name (node.key))
+        if isinstance (node, Const):
+            return true if node.value else false
+        if isinstance (node, Operation):
+            return self.functions [node.op] (*[self.to_sympy (arg) for arg in node.args])
+        raise ValueError (f"Comparison {node.left} {node.op} {node.right} must be encoded first")
+
+    def flatten (self, node, op):
+        if isinstance (node, Operation) and node.op == op:
+            result = []
+            for arg in node.args:
+                result.extend (self.flatten (arg, op))
+            return result
+        return [node]
+
+    def literal (self, node):
+        sign = 1
+        while isinstance (node, Operation) and node.op == "Not":
+            sign = -sign
+            node = node.args [0]
+        if not isinstance (node, Var):
+            raise ValueError (f"Formula is not in CNF: {node!r}")
+        return (node.key, sign)
+
+    '''
+        Returns the clauses of an AST in CNF as lists of (key, sign) literals, sign
+        being 1 or -1. Constants are simplified away (False gives an empty clause).
+    '''
+    def cnf_clauses (self, node):
+        clauses = []
+        for conjunct in self.flatten (node, "And"):
+            clause = []
+            for disjunct in self.flatten (conjunct, "Or"):
+                if isinstance (disjunct, Const):
+                    if disjunct.value:
+                        clause = None
+                        break
+                    continue
+                clause.append (self.literal (disjunct))
+            if clause is not None:
+                clauses.append (clause)
+        return clauses
+
+    def clause_string (self, clause):
+        return "|".join ((self.negation_str if sign < 0 else "") + self.key_name (key) for key, sign in clause)
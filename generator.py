@@ -0,0 +1,107 @@
+import argparse
+import json
+
+'''
+    Parameterized families of synthetic specifications, modeled on the hand-written
+    ones of input_files/, to see how the encoder and the solver scale:
+
+    - elevator (model.JSON): an elevator over `n` floors, with a door that must stay
+      closed while moving, and one rule per move between adjacent floors. The property
+      holds.
+    - list-scan (model2.JSON): a loop scanning a list of `n` elements, each taking one
+      of `m` values, with an index running from 0 to n+1. With `bug` (the default), the
+      loop reads one element past the end, raising `error` at step n+2 (relational
+      semantics); without it, the property holds.
+    - flags: `n` independent flags, each set by its own rule, the property being that
+      they are never all set; violated at step n+1 (sequential semantics), or at step 2
+      (parallel semantics). The bounds below n+1 are hard to refute for the solver
+      under the sequential semantics, as every order of the rules must be ruled out.
+
+    Every generator returns the specification as a dictionary in the JSON format of
+    the input files.
+
+    Example:
+        python generator.py list-scan 100 --values 4 -o list_scan_100.json
+'''
+
+def elevator (n):
+    floors = [str (i) for i in range (n)]
+    transitions = {
+        "open_door": {"preconditions": ["~door_open", "~elevator_moving"], "effects": ["door_open"]},
+        "close_door": {"preconditions": ["door_open"], "effects": ["~door_open"]},
+        "start_move": {"preconditions": ["~door_open"], "effects": ["elevator_moving"]},
+    }
+    for i in range (n - 1):
+        transitions [f"move_up_{i}_to_{i + 1}"] = {
+            "preconditions": ["elevator_moving", "~door_open", f"elevator_floor_{i}"],
+            "effects": [f"elevator_floor_{i + 1}"]}
+    for i in range (n - 1, 0, -1):
+        transitions [f"move_down_{i}_to_{i - 1}"] = {
+            "preconditions": ["elevator_moving", "~door_open", f"elevator_floor_{i}"],
+            "effects": [f"elevator_floor_{i - 1}"]}
+    return {
+        "states": {
+            "boolean": {"door_open": ["true", "false"], "elevator_moving": ["true", "false"]},
+            "int": {"elevator_floor": floors}},
+        "init": "~door_open,~elevator_moving,elevator_floor_0",
+        "transitions": transitions,
+        "safety": ["~elevator_moving | ~door_open"]}
+
+def list_scan (n, m = 2, bug = True):
+    elements = [f"my_list_e{i}" for i in range (n)]
+    last = n + 1 if bug else n
+    states = {
+        "boolean": {"error": ["true", "false"], "loop_cond": ["true", "false"], "array_end": ["true", "false"]},
+        "int": {}}
+    for i, element in enumerate (elements):
+        states ["int"] [element] = [str (10 + i + j) for j in range (m)]
+    states ["int"] ["index"] = [str (i) for i in range (last + 1)]
+    init = [f"{element}_{10 + i}" for i, element in enumerate (elements)] + ["index_0", "loop_cond", "~error", "~array_end"]
+    transitions = {}
+    for i, element in enumerate (elements):
+        transitions [f"increment_i_{i}_to_{i + 1}"] = {
+            "preconditions": [f"index_{i} & loop_cond"],
+            "effects": [f"~{element}_{10 + i} | {element}_{10 + i + 1}", f"index_{i + 1}", "~error"]}
+    if bug:
+        # reads past the end of the list
+        transitions [f"increment_i_{n}_to_{n + 1}"] = {
+            "preconditions": [f"index_{n} & loop_cond"], "effects": ["error", f"index_{n + 1}"]}
+    transitions ["array_end_reached"] = {"preconditions": [f"index_{n} & ~array_end"], "effects": ["array_end"]}
+    transitions ["terminate"] = {"preconditions": [f"index_{last} & loop_cond"], "effects": ["~loop_cond"]}
+    return {"states": states, "init": ",".join (init), "transitions": transitions, "safety": ["~error"]}
+
+def flags (n):
+    names = [f"flag{i}" for i in range (n)]
+    return {
+        "states": {"boolean": {name: ["true", "false"] for name in names}},
+        "init": ",".join ("~" + name for name in names),
+        "transitions": {f"set_{name}": {"preconditions": [f"~{name}"], "effects": [name]} for name in names},
+        "safety": ["~(" + " & ".join (names) + ")"]}
+
+families = {"elevator": elevator, "list-scan": list_scan, "flags": flags}
+
+'''
+    Returns the specification of `family` with size `n` (floors, elements or flags);
+    `m` is the number of values of the list elements (list-scan only), and `safe`
+    removes the bug of list-scan.
+'''
+def generate (family, n, m = 2, safe = False):
+    if family == "list-scan":
+        return list_scan (n, m, not safe)
+    return families [family] (n)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description="Generate a synthetic JSON specification.")
+    parser.add_argument ("family", choices=list (families))
+    parser.add_argument ("n", type=int, help="number of floors (elevator), list elements (list-scan) or flags")
+    parser.add_argument ("--values", type=int, default=2, help="list-scan: values per list element (default: 2)")
+    parser.add_argument ("--safe", action="store_true", help="list-scan: without the out-of-bounds read")
+    parser.add_argument ("-o", "--output", default=None, help="output file (default: stdout)")
+    args = parser.parse_args ()
+
+    spec = generate (args.family, args.n, args.values, args.safe)
+    if args.output:
+        with open (args.output, 'w') as f:
+            json.dump (spec, f, indent=2)
+    else:
+        print (json.dumps (spec, indent=2))
@@ -1,51 +1,195 @@
-import sympy as sp
+from sympy import Symbol, And, Or, Not
+from tseitin import TseitinEncoder
 
+'''
+    The `IntComparator` class encodes comparisons (<, <=, >, >=, ==, !=) between `int`
+    atoms and/or integer constants into CNF, with a linear number of clauses.
+
+    Both sides are turned into bit-vectors of their integer value (least significant
+    bit first), whose bits are literal strings or Python booleans for known bits:
+    - a constant gives its binary digits;
+    - a 'log' atom whose domain is 0..n-1 in order gives its own bits;
+    - any other atom gives, for bit j, the disjunction of the atom taking one of the
+      values with bit j set (one auxiliary atom per bit).
+    Two bit-vectors are compared by a ripple comparator from the least significant
+    bit, with a constant number of auxiliary atoms and clauses per bit. An atom
+    compared with a constant is encoded directly as the disjunction of the values
+    satisfying the comparison.
+
+    Gates on known bits are simplified away, so the result of `compare` is either a
+    literal string or a boolean, and the clauses defining the auxiliary atoms are
+    accumulated in `clauses` (see `take_clauses`).
+
+    Example:
+        Input: compare (elevator_floor, '>=', 2)  (one-hot atom with domain 0..3)
+        Output: '~AUX0', clauses [['~AUX0', '~elevator_floor_2'], ['~AUX0', '~elevator_floor_3'],
+                                  ['AUX0', 'elevator_floor_2', 'elevator_floor_3']]
+'''
+
+class IntComparator (TseitinEncoder):
+    operators = ["<=", ">=", "==", "!=", "<", ">"]
+    onehot_encoding_str = "onehot"
+    log_encoding_str = "log"
+    order_encoding_str = "order"
+    underscore_str = "_"
+
+    def take_clauses (self):
+        clauses = self.clauses
+        self.clauses = []
+        return clauses
+
+    def neg (self, a):
+        if isinstance (a, bool):
+            return not a
+        return self.negate (a)
+
+    def gate_and (self, lits):
+        if any (l is False for l in lits):
+            return False
+        lits = [l for l in lits if l is not True]
+        if len (lits) == 0:
+            return True
+        if len (lits) == 1:
+            return lits [0]
+        aux = self.new_auxiliary_atom ()
+        for l in lits:
+            self.clauses.append ([self.negate (aux), l])
+        self.clauses.append ([aux] + [self.negate (l) for l in lits])
+        return aux
+
+    def gate_or (self, lits):
+        return self.neg (self.gate_and ([self.neg (l) for l in lits]))
+
+    def gate_xnor (self, a, b):
+        if isinstance (a, bool):
+            return b if a else self.neg (b)
+        if isinstance (b, bool):
+            return a if b else self.negate (a)
+        aux = self.new_auxiliary_atom ()
+        self.clauses.append ([self.negate (aux), self.negate (a), b])
+        self.clauses.append ([self.negate (aux), a, self.negate (b)])
+        self.clauses.append ([aux, a, b])
+        self.clauses.append ([aux, self.negate (a), self.negate (b)])
+        return aux
+
+    def pad (self, a_bits, b_bits):
+        width = max (len (a_bits), len (b_bits))
+        return a_bits + [False] * (width - len (a_bits)), b_bits + [False] * (width - len (b_bits))
+
+    # lt_i: a < b on the bits 0..i
+    def less_than (self, a_bits, b_bits):
+        a_bits, b_bits = self.pad (a_bits, b_bits)
+        lt = False
+        for a, b in zip (a_bits, b_bits):
+            lt = self.gate_or ([self.gate_and ([self.neg (a), b]), self.gate_and ([self.gate_xnor (a, b), lt])])
+        return lt
+
+    def equal (self, a_bits, b_bits):
+        a_bits, b_bits = self.pad (a_bits, b_bits)
+        return self.gate_and ([self.gate_xnor (a, b) for a, b in zip (a_bits, b_bits)])
+
+    def compare_bits (self, a_bits, op, b_bits):
+        if op == "<":
+            return self.less_than (a_bits, b_bits)
+        if op == ">":
+            return self.less_than (b_bits, a_bits)
+        if op == "<=":
+            return self.neg (self.less_than (b_bits, a_bits))
+        if op == ">=":
+            return self.neg (self.less_than (a_bits, b_bits))
+        if op == "==":
+            return self.equal (a_bits, b_bits)
+        if op == "!=":
+            return self.neg (self.equal (a_bits, b_bits))
+        raise ValueError (f"Unknown comparison operator: {op}")
+
+    def constant_bits (self, k):
+        return [bool ((k >> j) & 1) for j in range (k.bit_length ())]
+
+    def has_identity_domain (self, atom):
+        return atom.domain == [str (i) for i in range (len (atom.domain))]
+
+    # a 'log' atom over 0..n-1 is its own value bit-vector
+    def is_bitvector (self, atom):
+        return atom.encoding == self.log_encoding_str and self.has_identity_domain (atom)
+
+    '''
+        Returns a literal (or boolean) true iff `atom` takes the value `val`.
+    '''
+    def value_literal (self, atom, val):
+        i = atom.domain.index (val)
+        if atom.encoding == self.log_encoding_str:
+            return self.gate_and ([bit if (i >> b) & 1 else self.negate (bit) for b, bit in enumerate (atom.bits)])
+        if atom.encoding == self.order_encoding_str:
+            lits = []
+            if i > 0:
+                lits.append (atom.bits [i - 1])
+            if i < len (atom.bits):
+                lits.append (self.negate (atom.bits [i]))
+            return self.gate_and (lits)
+        return atom.symbol + self.underscore_str + val
+
+    def value_bits (self, atom):
+        if self.is_bitvector (atom):
+            return list (atom.bits)
+        values = {val: self.value_literal (atom, val) for val in atom.domain}
+        width = max (int (val) for val in atom.domain).bit_length ()
+        return [self.gate_or ([lit for val, lit in values.items () if (int (val) >> j) & 1]) for j in range (width)]
+
+    def holds (self, x, op, y):
+        return {"<": x < y, ">": x > y, "<=": x <= y, ">=": x >= y, "==": x == y, "!=": x != y} [op]
+
+    '''
+        Encodes `left op right`, where each side is an `Atom` of int type or an int,
+        and returns the literal (or boolean) equivalent to the comparison.
+    '''
+    def compare (self, left, op, right):
+        if op not in self.operators:
+            raise ValueError (f"Unknown comparison operator: {op}")
+        if isinstance (left, int) and isinstance (right, int):
+            return self.holds (left, op, right)
+        if isinstance (left, int):
+            swapped = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}
+            return self.compare (right, swapped.get (op, op), left)
+        if isinstance (right, int):
+            if self.is_bitvector (left):
+                return self.compare_bits (left.bits, op, self.constant_bits (right))
+            return self.gate_or ([self.value_literal (left, val) for val in left.domain
+                                  if self.holds (int (val), op, right)])
+        return self.compare_bits (self.value_bits (left), op, self.value_bits (right))
+
+'''
+    Encodes a > b for all values of a and b within the range [0, n-1], a and b being
+    given by their bits a0.. and b0.. (least significant first), and returns the CNF
+    as a SymPy expression. The comparator circuit introduces auxiliary symbols c0, c1, ...
+    and O(bits) clauses, instead of enumerating the n^2 pairs of values.
+'''
 def encode_a_greater_than_b_large_domain(n):
-    """
-    Encode a > b for all values of a and b within the range [0, n-1]
-    and convert it to CNF.
-    """
-    # Calculate number of bits needed to represent values in range [0, n-1]
-    bit_count = int(sp.ceiling(sp.log(n, 2)))
-    
-    # Generate bitwise variables for a and b
-    a_bits = [sp.Symbol(f'a{i}') for i in reversed(range(bit_count))]
-    b_bits = [sp.Symbol(f'b{i}') for i in reversed(range(bit_count))]
-    
-    # Initialize the formula as None to start building the boolean formula
-    formula = None
-    
-    # For each possible value of a and b (from 0 to n-1)
-    for a_val in range(n):
-        for b_val in range(n):
-            if a_val > b_val:
-                # Convert a_val and b_val to binary
-                a_bin = f'{a_val:0{bit_count}b}'
-                b_bin = f'{b_val:0{bit_count}b}'
-                
-                # Create the conjunction of bit conditions
-                clause = True
-                for i in range(bit_count):
-                    a_bit = a_bits[i] if a_bin[i] == '1' else ~a_bits[i]
-                    b_bit = b_bits[i] if b_bin[i] == '1' else ~b_bits[i]
-                    clause = clause & (a_bit & ~b_bit)
-                
-                # Add this clause to the overall formula
-                if formula is None:
-                    formula = clause
-                else:
-                    formula = formula | clause
-    
-    # Handle the case when formula remains None (no valid conditions)
-    if formula is None:
-        return False
-    
-    # Convert to CNF
-    cnf_expr = sp.to_cnf(formula, simplify=True)
-    return cnf_expr
-
-# Example usage: Encode for a and b in the range [0, 7]
-n = 10  # Range [0, 7]
-cnf_expr = encode_a_greater_than_b_large_domain(n)
-print("CNF for a > b in the range [0, 7]:")
-print(cnf_expr)
+    bit_count = max(1, (n - 1).bit_length())
+    counter = [0]
+    def new_auxiliary_atom():
+        counter[0] += 1
+        return f'c{counter[0] - 1}'
+    comparator = IntComparator(new_auxiliary_atom)
+    a_bits = [f'a{i}' for i in range(bit_count)]
+    b_bits = [f'b{i}' for i in range(bit_count)]
+    lit = comparator.compare_bits(a_bits, ">", b_bits)
+    clauses = comparator.take_clauses()
+    if isinstance(lit, bool):
+        return lit
+    clauses.append([lit])
+    # a and b stay within [0, n-1]
+    for bits in (a_bits, b_bits):
+        k = comparator.less_than(bits, comparator.constant_bits(n))
+        clauses.extend(comparator.take_clauses())
+        if not isinstance(k, bool):
+            clauses.append([k])
+    to_sympy = lambda l: Not(Symbol(l[1:])) if l.startswith('~') else Symbol(l)
+    return And(*[Or(*[to_sympy(l) for l in clause]) for clause in clauses])
+
+if __name__ == "__main__":
+    # Example usage: Encode for a and b in the range [0, 9]
+    n = 10
+    cnf_expr = encode_a_greater_than_b_large_domain(n)
+    print(f"CNF for a > b in the range [0, {n - 1}]:")
+    print(cnf_expr)
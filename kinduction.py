@@ -0,0 +1,141 @@
+import time
+from caller import Solver
+
+'''
+    k-induction on the relational encoding of `CNFConverter` (semantics "sequential" or
+    "parallel"), with two live CaDiCaL sessions, deepened together one step at a time:
+
+    - base case: a path of k steps from an initial state reaching a violation at step k
+      (exactly the incremental BMC query of depth k);
+    - inductive step: a path of k+1 steps from any state, the property holding at steps
+      0..k and being violated at step k+1.
+
+    A satisfiable base case is a counterexample. An unsatisfiable inductive step, the
+    base cases up to k being unsatisfiable, proves that the property holds at every
+    step (it is (k+1)-inductive), whatever the depth. With `simple_path`, the states of
+    the inductive step are pairwise distinct, which makes the method complete (it stops
+    at the latest at the longest simple path of the system) at the cost of a quadratic
+    number of clauses.
+
+    Both sessions reuse the step templates of the converter (`step_literals`). The
+    clauses stating that the property holds at a step (see `property_template`), and the
+    simple-path constraints, need auxiliary variables, allocated above the variables of
+    the last step that can be unrolled (`max_k` + 1).
+
+    Returns [result, k] with result 10 (counterexample at depth k), 20 (proved at k) or
+    0 (unknown: `max_k` or `timeout` reached).
+
+    Example:
+        cnfConverter = spec2converter ("model.JSON", 0, 1, semantics = "sequential")
+        result, k = prove (cnfConverter, 20, simple_path = True)
+'''
+def prove (cnfConverter, max_k, simple_path = False, timeout = None, base = None, step = None, verbose = True):
+    if not cnfConverter.relational:
+        raise ValueError("k-induction needs a relational semantics (\"sequential\" or \"parallel\")")
+    start = time.time()
+    sessions = []
+    if base is None:
+        base = Solver()
+        sessions.append(base)
+    if step is None:
+        step = Solver()
+        sessions.append(step)
+    base.verbose = step.verbose = verbose
+    states = cnfConverter.state_cnf_vars()
+    properties = property_template(cnfConverter)
+    last_var = [(max_k + 2) * cnfConverter.step_nvars]
+    def new_var():
+        last_var[0] += 1
+        return last_var[0]
+
+    try:
+        step.add_literals(cnfConverter.step_literals(0, False))
+        for k in range(max_k + 1):
+            base.add_literals(cnfConverter.step_literals(k))
+            base.add_assmuptions([cnfConverter.step_activation(k)])
+            result = base.solve()
+            if result != 20:
+                if verbose:
+                    base.print_result(result, k)
+                return [result, k]
+
+            step.add_clauses(property_clauses(cnfConverter, properties, k, new_var))
+            step.add_literals(cnfConverter.step_literals(k + 1, False))
+            if simple_path:
+                for i in range(k + 1):
+                    step.add_clauses(distinct_clauses(states, cnfConverter.step_nvars, i, k + 1, new_var))
+            step.add_assmuptions([cnfConverter.step_activation(k + 1)])
+            result = step.solve()
+            if result == 20:
+                if verbose:
+                    print(f"UNSATISFIABLE inductive step at k = {k}. The property is {k + 1}-inductive and holds at every step!")
+                return [20, k]
+            if result != 10 or (timeout is not None and time.time() - start > timeout and k < max_k):
+                if verbose:
+                    reason = f" ({step.budget.describe()})" if step.budget is not None and step.budget.reason else ""
+                    print(f"UNKNOWN: no proof and no counterexample up to step {k + 1}{reason}")
+                return [0, k]
+        if verbose:
+            print(f"UNKNOWN: the property is not {max_k + 1}-inductive, and holds up to step {max_k + 1}")
+        return [0, max_k]
+    finally:
+        for solver in sessions:
+            solver.release()
+
+def shift (literal, offset):
+    return literal + offset if literal > 0 else literal - offset
+
+'''
+    The safety properties themselves, compiled to clauses of (key, sign) literals over
+    the atoms of step 0. Negating the violation clauses (`CNFConverter.safety_template`)
+    is not equivalent: with a structural encoding, they also hold the clauses defining
+    the auxiliary atoms of the violation, possibly in one direction only, and the solver
+    could falsify one of those instead of the violation. Asserted as they are, the
+    clauses of the property hold exactly in the states where the property does. The
+    auxiliary atoms they introduce are registered in the converter but have no variable
+    in the step layout (see `property_clauses`).
+'''
+def property_template (cnfConverter):
+    clauses = []
+    for formula in cnfConverter.safety_property:
+        clauses.extend(cnfConverter.compile_cnf(cnfConverter.normalize_formula(formula)))
+    return clauses
+
+'''
+    Clauses stating that the property holds at step t: the clauses of `properties` (see
+    `property_template`) at step t, with fresh variables for their auxiliary atoms.
+'''
+def property_clauses (cnfConverter, properties, t, new_var):
+    variables = cnfConverter.state_to_cnf_vars[0]
+    offset = t * cnfConverter.step_nvars
+    auxiliary = {}
+    clauses = []
+    for clause in properties:
+        literals = []
+        for key, sign in clause:
+            if key in variables:
+                var = variables[key] + offset
+            else:
+                if key not in auxiliary:
+                    auxiliary[key] = new_var()
+                var = auxiliary[key]
+            literals.append(var * sign)
+        clauses.append(literals)
+    return clauses
+
+'''
+    Clauses stating that the states at steps i and j differ on one of the state
+    variables `states` (given at step 0).
+'''
+def distinct_clauses (states, step_nvars, i, j, new_var):
+    clauses = []
+    some = []
+    for var in states:
+        a = var + i * step_nvars
+        b = var + j * step_nvars
+        differ = new_var()
+        some.append(differ)
+        clauses.append([-differ, a, b])
+        clauses.append([-differ, -a, -b])
+    clauses.append(some)
+    return clauses
@@ -1,19 +1,221 @@
-import sys
-from model_to_cnf import spec2cnf
-from caller import solve
+import argparse
+import json
+from model_to_cnf import spec2converter, save_cnf, Helper
+from cardinality import CardinalityEncoder
+from caller import Solver, Budget
+from kinduction import prove
+import pdr
+from formula_cache import FormulaCache
+from profiler import Profiler, profilers
+from counterexample import TraceDecoder, write_trace
 
-def main(inputpath, ouputdir, steps, incremental):
-    formulapath, assumptionspath = spec2cnf(inputpath, ouputdir, steps, incremental)
-    solve(formulapath, assumptionspath)
+'''
+    Prints the summary of the cone-of-influence reduction of `cnfConverter`, if any,
+    and writes the full report (see `Specification.reduce_cone_of_influence`) to the
+    JSON file `path` if given.
+'''
+def report_cone_of_influence(cnfConverter, path = None):
+    if cnfConverter.cone_report is None:
+        return
+    print(cnfConverter.describe_cone_of_influence())
+    if path:
+        with open(path, 'w') as f:
+            json.dump(cnfConverter.cone_report, f, indent=2)
+
+'''
+    Encodes the specification and streams the clauses and the assumptions straight
+    into the solver, one step at a time (see `CNFConverter.clause_chunks`). Unless
+    `dimacs` is False, the CNF and the assumptions are also written to `ouputdir` as a
+    side output, the CNF being compressed with `compression` ("gzip" or "xz") if given.
+
+    Every engine records its stages, the size of the encoding and the solver
+    statistics in `profiler` (see `Profiler`) if given, and returns [result, depth].
+    The bmc and incremental engines write the counterexample, if any, to the JSON or
+    CSV file `trace`, decoded at `trace_steps` (numbered from 1, default: all) for the
+    state atoms `trace_atoms` (default: all), see `TraceDecoder`. With `budget` (see
+    `Budget`), the solver sessions stop once it runs out, with an unknown verdict
+    reporting the step up to which the property holds.
+'''
+def main(inputpath, ouputdir, steps, incremental, cnf_encoding = Helper.tseitin_encoding_str, dimacs = True,
+         int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str, formula_cache = None,
+         semantics = Helper.same_step_semantics_str, cone_of_influence = False, cone_report = None,
+         compression = None, profiler = None, trace = None, trace_steps = None, trace_atoms = None, budget = None):
+    cnfConverter = spec2converter(inputpath, steps, incremental, cnf_encoding, int_encoding, amo_encoding,
+                                  formula_cache, semantics, cone_of_influence, True, profiler)
+    profiler = cnfConverter.profiler
+    profiler.record_converter(cnfConverter)
+    report_cone_of_influence(cnfConverter, cone_report)
+    decoder = TraceDecoder(cnfConverter, trace_atoms) if trace else None
+    if dimacs:
+        save_cnf(cnfConverter, inputpath, ouputdir, steps, compression)
+    with Solver() as solver:
+        solver.set_budget(budget)
+        with profiler.stage("load"):
+            for literals in cnfConverter.clause_chunks():
+                solver.add_literals(literals)
+        with profiler.stage("solve"):
+            result = solver.solve_assumptions(cnfConverter.nvars, list(cnfConverter.temporal_bool_vars.values()),
+                                              cnfConverter.cumulative_assumptions)
+        profiler.record_solver(solver)
+        save_trace(decoder, solver, result, trace, trace_steps, profiler)
+    return result
+
+# writes the counterexample found by `solver`, if any (see `main`)
+def save_trace(decoder, solver, result, path, steps, profiler):
+    if decoder is None or result[0] != 10:
+        return
+    with profiler.stage("trace"):
+        write_trace(decoder.decode(solver, result[1], steps), path)
+
+'''
+    Incremental BMC: encodes a single step, and lets the solver deepen the unrolling
+    one step at a time up to `max_depth` (or until `timeout` seconds have elapsed).
+'''
+def main_incremental(inputpath, max_depth, cnf_encoding = Helper.tseitin_encoding_str, timeout = None,
+                     int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                     formula_cache = None, semantics = Helper.same_step_semantics_str, cone_of_influence = False,
+                     cone_report = None, profiler = None, trace = None, trace_steps = None, trace_atoms = None,
+                     budget = None):
+    cnfConverter = spec2converter(inputpath, 0, 1, cnf_encoding, int_encoding, amo_encoding, formula_cache, semantics,
+                                  cone_of_influence, False, profiler)
+    profiler = cnfConverter.profiler
+    profiler.record_converter(cnfConverter)
+    report_cone_of_influence(cnfConverter, cone_report)
+    decoder = TraceDecoder(cnfConverter, trace_atoms) if trace else None
+    next_step = lambda t: (cnfConverter.step_literals(t), cnfConverter.step_activation(t))
+    with Solver() as solver:
+        solver.set_budget(budget)
+        with profiler.stage("solve"):
+            result = solver.solve_incremental(next_step, max_depth, timeout, cnfConverter.cumulative_assumptions)
+        profiler.record_solver(solver)
+        save_trace(decoder, solver, result, trace, trace_steps, profiler)
+    return result
+
+'''
+    k-induction (see `kinduction.prove`): looks for a counterexample or a proof that
+    the property holds at every step, up to k = `max_k`.
+'''
+def main_kinduction(inputpath, max_k, cnf_encoding = Helper.tseitin_encoding_str, timeout = None,
+                    int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                    formula_cache = None, semantics = Helper.sequential_semantics_str, simple_path = False,
+                    cone_of_influence = False, cone_report = None, profiler = None, budget = None):
+    cnfConverter = spec2converter(inputpath, 0, 1, cnf_encoding, int_encoding, amo_encoding, formula_cache, semantics,
+                                  cone_of_influence, False, profiler)
+    profiler = cnfConverter.profiler
+    profiler.record_converter(cnfConverter)
+    report_cone_of_influence(cnfConverter, cone_report)
+    with Solver() as base, Solver() as step:
+        base.set_budget(budget)
+        step.set_budget(budget)
+        with profiler.stage("solve"):
+            result = prove(cnfConverter, max_k, simple_path, timeout, base, step)
+        profiler.record_solver(base, "base")
+        profiler.record_solver(step, "step")
+    return result
+
+'''
+    IC3 / PDR (see `pdr.PDR`): looks for a counterexample or an inductive invariant,
+    with at most `max_frames` frames.
+'''
+def main_pdr(inputpath, max_frames, cnf_encoding = Helper.tseitin_encoding_str, timeout = None,
+             int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+             formula_cache = None, semantics = Helper.sequential_semantics_str, cone_of_influence = False,
+             cone_report = None, profiler = None, budget = None):
+    cnfConverter = spec2converter(inputpath, 0, 1, cnf_encoding, int_encoding, amo_encoding, formula_cache, semantics,
+                                  cone_of_influence, False, profiler)
+    profiler = cnfConverter.profiler
+    profiler.record_converter(cnfConverter)
+    report_cone_of_influence(cnfConverter, cone_report)
+    with Solver() as solver:
+        solver.set_budget(budget)
+        with profiler.stage("solve"):
+            result = pdr.prove(cnfConverter, max_frames, timeout, solver)
+        profiler.record_solver(solver)
+    return result
 
 if __name__ == "__main__":
-    if len(sys.argv) != 5:
-        print("Usage: python model_checker.py <inputpath> <ouputdir> <steps> <incremental>")
-        sys.exit(1)
-    
-    inputpath = sys.argv[1]
-    outputdir = sys.argv [2]
-    steps = int(sys.argv[3])
-    incremental = int(sys.argv[4]) 
-    main (inputpath, outputdir, steps, incremental)
+    parser = argparse.ArgumentParser(description="Bounded model checking of a JSON specification with CaDiCaL.")
+    parser.add_argument("inputpath")
+    parser.add_argument("ouputdir")
+    parser.add_argument("steps", type=int)
+    parser.add_argument("incremental", type=int)
+    parser.add_argument("--encoding", choices=Helper.cnf_encodings, default=Helper.tseitin_encoding_str,
+                        help="CNF normalization of the formulas (default: tseitin)")
+    parser.add_argument("--int-encoding", choices=Helper.int_encodings, default=Helper.onehot_encoding_str,
+                        help="default encoding of int atoms, overridden per atom by the spec's \"encodings\" section (default: onehot)")
+    parser.add_argument("--amo-encoding", choices=CardinalityEncoder.encodings, default=CardinalityEncoder.auto_str,
+                        help="exactly-one constraints of one-hot int atoms (default: auto, by domain size; none: disabled)")
+    parser.add_argument("--semantics", choices=Helper.semantics, default=Helper.same_step_semantics_str,
+                        help="same-step: every rule constrains each step; sequential: one rule fires per step; "
+                             "parallel: non-interfering rules fire together (default: same-step)")
+    parser.add_argument("--no-dimacs", action="store_true",
+                        help="do not write the CNF and the assumptions to <ouputdir>")
+    parser.add_argument("--compress", choices=["gzip", "xz"], default=None,
+                        help="compress the DIMACS output (<name>_k<steps>.cnf.gz or .cnf.xz)")
+    parser.add_argument("--engine", choices=["bmc", "incremental", "kinduction", "pdr"], default="bmc",
+                        help="bmc: encode <steps> steps up front; incremental: deepen a live solver up to <steps> (no DIMACS output); "
+                             "kinduction: prove the property by k-induction, up to k = <steps>; "
+                             "pdr: prove the property by IC3, with at most <steps> frames (both need a relational --semantics)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="stop after this many seconds, with an UNKNOWN verdict")
+    parser.add_argument("--conflicts", type=int, default=None,
+                        help="stop after this many conflicts of the solver(s) in total, with an UNKNOWN verdict")
+    parser.add_argument("--decisions", type=int, default=None,
+                        help="stop after this many decisions of the solver(s) in total, with an UNKNOWN verdict")
+    parser.add_argument("--simple-path", action="store_true",
+                        help="kinduction engine: require pairwise distinct states in the inductive step")
+    parser.add_argument("--cache-dir", default=None,
+                        help="reuse the normalized formulas of earlier runs, cached in this directory")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="maximum size of the cache directory, in MB (default: 256)")
+    parser.add_argument("--coi", action="store_true",
+                        help="cone-of-influence reduction: drop the atoms and rules that cannot influence the safety properties")
+    parser.add_argument("--coi-report", default=None,
+                        help="with --coi, write the cone of every property and what was pruned to this JSON file")
+    parser.add_argument("--stats", default=None,
+                        help="write the time, CPU time and peak memory of every stage, the size of the encoding "
+                             "and the solver statistics to this JSON file")
+    parser.add_argument("--profile", default=None,
+                        help="profile the run function by function, and dump the profile to this file")
+    parser.add_argument("--profiler", choices=profilers, default="cprofile",
+                        help="with --profile: cprofile (pstats dump) or pyinstrument (text, or HTML for a .html file)")
+    parser.add_argument("--trace", default=None,
+                        help="bmc and incremental engines: write the decoded counterexample to this JSON or CSV (.csv) file")
+    parser.add_argument("--trace-steps", type=int, nargs="+", default=None,
+                        help="with --trace, decode only these steps (numbered from 1)")
+    parser.add_argument("--trace-atoms", nargs="+", default=None,
+                        help="with --trace, decode only these state atoms")
+    args = parser.parse_args()
 
+    formula_cache = None
+    if args.cache_dir:
+        formula_cache = FormulaCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    if args.engine in ("kinduction", "pdr") and args.semantics == Helper.same_step_semantics_str:
+        parser.error(f"the {args.engine} engine needs --semantics sequential or parallel")
+    try:
+        profiler = Profiler(args.profiler if args.profile else None)
+    except ValueError as e:
+        parser.error(str(e))
+    budget = None
+    if args.timeout is not None or args.conflicts is not None or args.decisions is not None:
+        budget = Budget(args.timeout, args.conflicts, args.decisions)
+    profiler.start()
+    if args.engine == "kinduction":
+        main_kinduction (args.inputpath, args.steps, args.encoding, args.timeout, args.int_encoding, args.amo_encoding,
+                         formula_cache, args.semantics, args.simple_path, args.coi, args.coi_report, profiler,
+                         budget)
+    elif args.engine == "pdr":
+        main_pdr (args.inputpath, args.steps, args.encoding, args.timeout, args.int_encoding, args.amo_encoding,
+                  formula_cache, args.semantics, args.coi, args.coi_report, profiler, budget)
+    elif args.engine == "incremental":
+        main_incremental (args.inputpath, args.steps, args.encoding, args.timeout, args.int_encoding, args.amo_encoding,
+                          formula_cache, args.semantics, args.coi, args.coi_report, profiler, args.trace,
+                          args.trace_steps, args.trace_atoms, budget)
+    else:
+        main (args.inputpath, args.ouputdir, args.steps, args.incremental, args.encoding, not args.no_dimacs,
+              args.int_encoding, args.amo_encoding, formula_cache, args.semantics, args.coi, args.coi_report,
+              args.compress, profiler, args.trace, args.trace_steps, args.trace_atoms, budget)
+    if args.profile:
+        profiler.stop(args.profile)
+    if args.stats:
+        profiler.dump(args.stats)
@@ -1,10 +1,30 @@
 import json
 import sys
-from sympy import symbols
-from sympy.logic.boolalg import to_cnf, Or, And, Not, Implies, Equivalent
-from sympy.parsing.sympy_parser import parse_expr
+from sympy.logic.boolalg import to_cnf
+from tseitin import TseitinEncoder
+from cardinality import CardinalityEncoder
+from int_comp import IntComparator
+from formula_cache import FormulaCache, formula_memo
+from formula_parser import FormulaParser, Const, Var, Compare, Operation
+from dimacs import DimacsWriter
+from clause_db import ClauseDatabase
+from profiler import Profiler
+import numpy as np
 import re, os
 
+'''
+    Returns the sections of a specification given as a dictionary (the content of a
+    JSON specification file) as the list [states, init, transitions, safety,
+    encodings] expected by `Specification`.
+'''
+def specification_data (data):
+    states = data.get('states', {})
+    init = data.get('init', {})
+    transitions = data.get('transitions', {})
+    safety = data.get('safety', [])
+    encodings = data.get('encodings', {})
+    return [states, init, transitions, safety, encodings]
+
 '''
    Hanldles File Operations
 '''
@@ -18,13 +38,7 @@ class FileHandler:
         data = []
         with open(self.__input_file, 'r') as f:
             data = json.load(f)
-            
-            states = data.get('states', {})
-            init = data.get('init', {})            
-            transitions = data.get('transitions', {})
-            safety = data.get('safety', [])
-    
-        self.data = [states, init, transitions, safety]
+        self.data = specification_data (data)
 
     def save_to_file(self, file_index, header, data):
         with open(self.output_files[file_index], 'w') as f:                
@@ -40,10 +54,8 @@ class FileHandler:
     Helper class containing helper methods
 '''
 class Helper:
+    __slots__ = ()
     underscore_str = "_"
-    atom_finder_pattern = r'(?<![&|^])\b(?:~)?([a-zA-Z_]\w*)\b'
-    atom_finder_pattern2 = r'(~)?([a-zA-Z_]+)(_(\d+))?_(\d+)'
-    state_finder_pattern = r'(?<![&|^])\b(?:~)?([a-zA-Z_]\w*|\d+)\b'
     logicalANDstr = "&"
     logicalORstr = "|"
     space_str = " "
@@ -53,90 +65,49 @@ class Helper:
     implication_str = "Implies"
     boolean_str = "boolean"
     negation_str = "~"
+    sympy_encoding_str = "sympy"
+    tseitin_encoding_str = "tseitin"
+    plaisted_greenbaum_encoding_str = "pg"
+    cnf_encodings = [sympy_encoding_str, tseitin_encoding_str, plaisted_greenbaum_encoding_str]
+    cnf_encoding = sympy_encoding_str
+    operator_names = ["Implies", "Equivalent", "Xor", "ITE", "And", "Or", "Not", "True", "False"]
+    onehot_encoding_str = "onehot"
+    log_encoding_str = "log"
+    order_encoding_str = "order"
+    int_encodings = [onehot_encoding_str, log_encoding_str, order_encoding_str]
+    log_bit_str = "b"
+    order_bit_str = "o"
+    same_step_semantics_str = "same-step"
+    sequential_semantics_str = "sequential"
+    parallel_semantics_str = "parallel"
+    semantics = [same_step_semantics_str, sequential_semantics_str, parallel_semantics_str]
 
-
-    '''
-        gets a proposition as input, and returns the atom in the proposition
-        Exacmple: 
-             input: ~x_0: x does not take the value 0
-             output: x_0
-    '''
-    def get_atom (self, s):
-        return re.findall(self.atom_finder_pattern, s)[0]
-    
-    '''
-        This function extracts the value of an atom in a proposition. The atom can belong 
-        to either a non-boolean or a boolean domain. 
-
-        - For atoms in a non-boolean domain (e.g., integer domain), the atom typically 
-          includes a number as part of its name (e.g., "x_5" where "x" is the atom, 
-          and "5" represents the value that the atom takes).
-          In this case, the function extracts the numeric value after the last underscore.
-          
-        - For atoms in a boolean domain (e.g., "y", where "y" is either True or False), 
-          there is no numeric value attached. In this case, the function will return None.
-
-        The function splits the atom string from the last underscore ('_') to determine 
-        if there is a numeric value (indicating a non-boolean domain). If the value is a 
-        valid integer, it is returned. If the atom is boolean (no numeric value), the function 
-        returns None.
-
-        Example:
-             input: "x_5"  (atom 'x' with non-boolean domain where 'x' takes the value 5)
-             output: 5  (returns the integer 5)
-             
-             input: "y"  (atom 'y' in the boolean domain, no attached value)
-             output: None  (returns None)
-             
-        Args:
-            atom (str): The atom in string format (e.g., "x_5" or "y").
-
-        Returns:
-            int or None: The numeric value if it exists (for non-boolean atoms), 
-                         otherwise None (for boolean atoms).
     '''
-
-    def get_domain_val (self, atom):
-        val = atom.rsplit('_', 1)[-1]
-        if val.isdigit() == False:
-            return None
-        else:
-            return int (val)
-
-        '''
         This function takes a boolean formula as input, normalizes it by converting 
-        it into Conjunctive Normal Form (CNF), and ensures that the state variables 
-        in the formula are properly identified and parsed as symbols. It returns the 
-        formula in CNF form as a string without any spaces.
+        it into Conjunctive Normal Form (CNF), and returns it in CNF form as a string 
+        without any spaces.
 
         Steps involved:
-        1. **Extract State Names**: 
-            - Uses a regular expression to extract all variable names (state names) from 
-              the formula, including negated variables (e.g., "~door_open"). 
-            - The regular expression captures valid variable names that start with 
-              a letter or underscore and can include alphanumeric characters or underscores.
-            - The `set()` ensures that the list of state names is unique.
-        
-        2. **Convert to Symbols**:
-            - The extracted state names are converted into symbolic variables using SymPy's 
-              `symbols()` function, which ensures that they are treated as mathematical symbols.
-
-        3. **Parse the Formula**:
-            - The formula is passed to `parse_expr()` to convert it from a string into 
-              a symbolic expression that SymPy can manipulate.
-
-        4. **Convert to CNF**:
-            - The symbolic expression is converted into Conjunctive Normal Form (CNF) 
-              using SymPy's `to_cnf()` function, which transforms the logical expression 
-              into a conjunction of clauses.
-
-        5. **Format the Formula**:
+        1. **Parse the Formula**:
+            - The formula is parsed by `formula_parser` (see `FormulaParser`) into an AST
+              whose atoms are already resolved to their (symbol, val) keys. Unknown atoms
+              raise a ValueError.
+
+        2. **Encode Comparisons and Compact Atoms**:
+            - Comparisons between `int` atoms and/or integers, and literals of `int` atoms
+              with a compact encoding, are replaced by formulas over boolean atoms
+              (see `encode_formula`).
+
+        3. **Convert to CNF**:
+            - The AST is converted into a SymPy expression, which is converted into 
+              Conjunctive Normal Form (CNF) using SymPy's `to_cnf()` function, or 
+              structurally (see `structural_normalize_formula`), depending on `cnf_encoding`.
+
+        4. **Format the Formula**:
             - The resulting CNF formula is converted back to a string.
             - All spaces in the string are removed for a more compact representation.
 
-        6. **Return the Formula**:
-            - The normalized formula in CNF form, represented as a string without spaces, 
-              is returned.
+        Normalized formulas are memoized (see `formula_memo`).
 
         Example:
             Input: "(door_open & ~elevator_moving) & elevator_floor_0"
@@ -150,134 +121,120 @@ class Helper:
     '''
 
     def normalize_formula (self, formula):
-        state_names = re.findall(self.state_finder_pattern, formula)
-        state_names = list(set(state_names)) 
-        symbols(state_names)
-        formula = parse_expr(formula)
-        formula = to_cnf(formula)
-        formula = str(formula).replace(self.space_str,"")
+        key = (self.cache_context, formula)
+        entry = formula_memo.get (key)
+        if entry is not None:
+            return self.instantiate_auxiliary_atoms (entry [0], entry [1])
+        first = len (self.auxiliary_atoms)
+        normalized = self.compute_normalized_formula (formula)
+        formula_memo.put (key, [self.abstract_auxiliary_atoms (normalized, first), len (self.auxiliary_atoms) - first])
+        return normalized
+
+    '''
+        Memoization helpers. Auxiliary atoms introduced by a normalization are only
+        meaningful within the specification that allocated them, so cached results
+        store them as placeholders @0, @1, ... (numbered from `first`, the number of
+        auxiliary atoms allocated before), and fresh auxiliary atoms are allocated for
+        them when the result is reused.
+    '''
+    def abstract_auxiliary_atoms (self, text, first):
+        def abstract (match):
+            i = int (match.group (1))
+            return "@"+str (i - first) if i >= first else match.group (0)
+        return re.sub (r'\b'+self.auxiliary_atom+r'(\d+)\b', abstract, text)
+
+    def instantiate_auxiliary_atoms (self, text, count):
+        names = [self.add_auxiliary_atom () for i in range (count)]
+        return re.sub (r'@(\d+)', lambda match: names [int (match.group (1))], text)
+
+    def compute_normalized_formula (self, formula):
+        node = self.encode_formula (self.formula_parser.parse (formula))
+        definitions = self.int_comparator.take_clauses ()
+        expr = self.formula_parser.to_sympy (node)
+        if self.cnf_encoding != self.sympy_encoding_str:
+            formula = self.structural_normalize_formula (expr)
+        else:
+            formula = to_cnf(expr)
+            formula = str(formula).replace(self.space_str,"")
+        if len (definitions) > 0:
+            formula += self.logicalANDstr + self.int_comparator.to_string (definitions)
         return formula
 
-        '''
-        This function processes a given symbol and removes the numeric value that follows 
-        the last underscore (`_`), if it exists. The symbol is assumed to represent an atom 
-        in either a boolean or non-boolean (e.g., integer) domain.
+    '''
+        Rewrites a parsed formula so that it only refers to boolean and one-hot atoms:
+        - every comparison between `int` atoms and/or integer constants (e.g.,
+          "index < 3", "my_list_zero >= my_list_one", "elevator_floor != 2") is replaced
+          by a literal equivalent to it, built by `IntComparator` with a linear number of
+          clauses; the clauses defining its auxiliary atoms are left in `int_comparator`
+          for `normalize_formula` to append to the CNF;
+        - every literal of an `int` atom with a compact (log or order) encoding is
+          replaced by the equivalent formula over the atom's bit atoms.
+
+        Example (index has domain 0..5 and the log encoding):
+            Input: "index_4 & loop_cond"
+            Output: "(index_b2&~index_b1&~index_b0) & loop_cond"
+
+        Example (elevator_floor is one-hot, with domain 0..3):
+            Input: "elevator_moving & elevator_floor >= 2"
+            Output: "elevator_moving & ~AUX0",
+                    [['~AUX0', '~elevator_floor_2'], ['~AUX0', '~elevator_floor_3'],
+                     ['AUX0', 'elevator_floor_2', 'elevator_floor_3']]
+    '''
+    def encode_formula (self, node):
+        if isinstance (node, Var):
+            atom = self.symbol_atom_map [node.key [0]]
+            if atom.encoding in (None, self.onehot_encoding_str):
+                return node
+            return self.encode_formula (self.formula_parser.parse (atom.value_formula (node.key [1])))
+        if isinstance (node, Compare):
+            lit = self.int_comparator.compare (self.comparison_operand (node.left), node.op,
+                                               self.comparison_operand (node.right))
+            if isinstance (lit, bool):
+                return Const (lit)
+            return self.formula_parser.parse (lit)
+        if isinstance (node, Operation):
+            return Operation (node.op, [self.encode_formula (arg) for arg in node.args])
+        return node
+
+    def comparison_operand (self, token):
+        if isinstance (token, int):
+            return token
+        atom = self.symbol_atom_map.get (token)
+        if atom is None or atom.type == self.boolean_str:
+            raise ValueError (f"'{token}' in a comparison is neither an int atom nor an integer")
+        return atom
 
-        - For symbols that belong to a non-boolean domain (i.e., those that have an integer 
-          value appended after an underscore, such as "x_5"), this function removes the 
-          numeric value and returns the base atom (e.g., "x").
-          
-        - For symbols that do not have a numeric value after the last underscore or do not 
-          belong to a non-boolean domain, the function returns the symbol unchanged.
+    '''
+        Structural counterpart of `normalize_formula`, used when `cnf_encoding` is
+        "tseitin" or "pg" (Plaisted-Greenbaum). Instead of distributing the SymPy
+        expression with `to_cnf`, each non-literal sub-formula is named by a fresh
+        auxiliary atom (see `TseitinEncoder`), so the CNF grows linearly with the
+        formula. The auxiliary atoms are boolean state atoms, hence `CNFConverter`
+        allocates a fresh copy of them at every time step.
 
-        Steps involved:
-        1. **Identify the Part After the Last Underscore**:
-            - The symbol is split at the last underscore (`_`), and the part after the last 
-              underscore is stored as `part2`.
-              
-        2. **Check if the Part is a Number**:
-            - If `part2` is composed of digits (i.e., it represents a numeric value), 
-              the function removes the numeric value and returns the part before the last 
-              underscore.
-              
-        3. **Return the Symbol**:
-            - If the part after the last underscore is not numeric, or if the symbol 
-              doesn't have an underscore, the function returns the symbol unchanged.
+        The output has the same textual form as `normalize_formula`.
 
         Example:
-            Input: "x_5"   (atom 'x' with non-boolean domain and value 5)
-            Output: "x"    (returns the atom name without the value)
-            
-            Input: "y"     (atom 'y' with boolean domain)
-            Output: "y"    (returns the symbol unchanged)
-            
-            Input: "x_var" (symbol without numeric suffix)
-            Output: "x_var" (returns the symbol unchanged)
-
-        Args:
-            symbol (str): The input symbol representing an atom.
-
-        Returns:
-            str: The symbol without the numeric value if it's present, or the original 
-                 symbol if no numeric value exists.
+            Input: Implies (index_0 | loop_cond, index_1 & ~error)
+            Output: "(~AUX0|index_1)&(~AUX0|~error)&(AUX0|~index_0)&(AUX0|~loop_cond)"
+                    (modulo ordering)
     '''
+    def structural_normalize_formula (self, expr):
+        clauses = self.tseitin_encoder.encode (expr)
+        return self.tseitin_encoder.to_string (clauses)
 
-    def remove_domain_val (self, symbol):
-        splitted_symbol = symbol.rsplit(self.underscore_str, 1)
-        last = ''
-        if len(splitted_symbol)>1:
-            last = splitted_symbol [1] 
-        if last.isdigit(): #indicating a atom, which has int domain
-            return splitted_symbol[0]
-        else:
-            return symbol
-
-        '''
-        This function extracts and returns the base atom, its value, and its type 
-        for a given literal (lit). The literal can represent either a boolean or 
-        non-boolean (e.g., integer) atom. The function determines whether the atom 
-        is negated and assigns the appropriate value based on its type.
-
-        Steps involved:
-        
-        1. **Extract the Atom Symbol**:
-            - The atom symbol (possibly with an appended numeric value) is extracted 
-              from the literal using the `self.get_atom()` method.
-
-        2. **Remove Numeric Value (if applicable)**:
-            - The `self.remove_domain_val()` method removes the numeric value (for atoms in 
-              non-boolean domains) from the atom symbol, leaving the base atom name.
-              If the atom is in the boolean domain, no numeric value is removed.
-
-        3. **Determine the Atom's Type**:
-            - The type of the atom is retrieved from `self.symbol_atom_map` using the 
-              base atom symbol (`atomsymbol0`). The type can be either 'boolean' or a 
-              non-boolean type (e.g., integer).
-
-        4. **Determine the Atom's Value**:
-            - If the atom is of type 'boolean', the function checks whether the 
-              literal contains a negation symbol (`~`). If negated, the value is set to 0, 
-              otherwise it remains 1.
-            - If the atom is non-boolean (e.g., an integer domain atom), the numeric 
-              value is extracted using `self.get_val()`.
-
-        5. **Return the Atom Symbol, Value, and Type**:
-            - The function returns a list containing:
-                - The base atom symbol (with any numeric value removed for non-boolean atoms).
-                - The value of the atom (1 or 0 for boolean atoms, or the extracted 
-                  numeric value for non-boolean atoms).
-                - The type of the atom ('boolean' or non-boolean).
+    '''
+        Parses a formula in CNF (as returned by `normalize_formula`) and returns its
+        clauses as lists of (key, sign) literals, whose keys (symbol, val) index the
+        CNF variables of a step (`CNFConverter.state_to_cnf_vars`).
 
         Example:
-            Input: "~door_open"  (a negated boolean literal)
-            Output: ["door_open", 0, "boolean"]  (the atom is boolean and negated)
-
-            Input: "elevator_floor_3" (an integer literal where the atom takes the value 3)
-            Output: ["elevator_floor", 3, "int"] (the atom is non-boolean and has a value of 3)
-
-        Args:
-            lit (str): The literal (boolean or non-boolean) in string format.
-
-        Returns:
-            list: A list containing the base atom symbol (str), the atom's value (int), 
-                  and the atom's type (str, such as 'boolean' or 'int').
+            Input: "(door_open|~elevator_moving)&elevator_floor_0"
+            Output: [[(('door_open', None), 1), (('elevator_moving', None), -1)],
+                     [(('elevator_floor', '0'), 1)]]
     '''
-
-    def get_atom_val_type (self, lit):
-        [atomsymbol, atomsymbol_no_domainval] = self.trim_proposition (lit)
-        val = 1
-        type = self.symbol_atom_map [atomsymbol_no_domainval].type
-        if type == self.boolean_str:
-            if self.negation_str in lit:
-                val = 0
-        else:
-            val = self.get_domain_val (atomsymbol)  
-        return [atomsymbol_no_domainval, val, type]
-    
-    def trim_proposition (self, proposition):
-        atomsymbol = self.get_atom (proposition)
-        atomsymbol_noval = self.remove_domain_val (atomsymbol)
-        return [atomsymbol, atomsymbol_noval]
+    def compile_cnf (self, formula):
+        return self.formula_parser.cnf_clauses (self.formula_parser.parse (formula))
 
     '''
         This function takes a boolean formula in CNF (Conjunctive Normal Form), 
@@ -294,41 +251,13 @@ class Helper:
               using the `self.normalize_formula()` function, which converts the formula 
               into a standard CNF format and removes spaces.
 
-        2. **Split the Formula into Clauses**:
-            - The formula is split into individual clauses using the `&` operator, 
-              which separates each clause in a CNF expression.
-
-        3. **Process Each Clause**:
-            - For each clause, the literals are further split by the `|` operator, 
-              which separates the literals (variables) in each clause.
-              
-            - For each literal, the following steps are performed:
-                a. **Extract Atom Information**:
-                    - The atom symbol, its value, and its type (boolean or non-boolean) 
-                      are extracted using the `self.get_atom_val_type()` function.
-                
-                b. **Map to Boolean Variables**:
-                    - If the atom is boolean, the corresponding boolean variable is 
-                      retrieved from the provided `map` using the atom symbol as a key.
-                      
-                    - If the atom is non-boolean (e.g., integer domain), the value is also 
-                      considered, and the correct boolean variable is retrieved from the 
-                      `map` using both the atom symbol and its value.
-                      
-                c. **Negate Literal if Necessary**:
-                    - If the literal is negated (i.e., prefixed with `~`), the value of 
-                      the boolean variable is negated (multiplied by -1).
-                
-                d. **Append to Clause**:
-                    - The boolean variable (with its correct sign) is appended to the current clause.
-
-        4. **Store Clauses**:
-            - Each processed clause (now a list of integers representing boolean variables) 
-              is added to the final list of clauses (`formula_clauses`).
-
-        5. **Return CNF Clauses**:
-            - The function returns the final list of clauses, where each clause is a list of 
-              boolean variables or their negations.
+        2. **Parse the Formula into Clauses**:
+            - The formula is parsed once (see `compile_cnf`) into clauses of literals
+              already resolved to their (symbol, val) keys and signs.
+
+        3. **Map to Boolean Variables**:
+            - The key of each literal is looked up in the provided `map`, and the
+              variable is negated (multiplied by -1) for negative literals.
 
         Example:
             Input: "(door_open | ~elevator_moving) & elevator_floor_0"
@@ -350,40 +279,7 @@ class Helper:
     def get_cnf_clause (self, formula, map, normalize):
         if normalize:
             formula = self.normalize_formula (formula)
-        clauses = formula.split (self.logicalANDstr)
-        formula_clauses = []
-        for clause in clauses:
-            formula_clause = []
-            lits = clause.split (self.logicalORstr)
-            for lit in lits:
-                [atomsymbol, val, type] = self.get_atom_val_type (lit)
-                # print (lit)
-                # print ('------------------')
-                # print (atomsymbol, val, lit, lit.rsplit('_', 1)[1])
-                bool_var = 0 
-                bool_val = 1
-                if type == self.boolean_str:
-                    bool_var = map [(atomsymbol, None)]  
-                else:
-                    bool_var = map [(self.remove_domain_val (atomsymbol), str(val))]   
-                if self.negation_str in lit:
-                    bool_val = -1  
-                formula_clause.append (bool_var*bool_val)
-            formula_clauses.append (formula_clause)
-        
-        return formula_clauses
-
-       
-    def extract_atom_info(self, atom):
-        match = re.match(self.atom_finder_pattern2, atom)
-        if match:
-            negation = match.group(1)  # "~" if present, None if absent
-            atomsymbol = match.group(2)
-            val = match.group(4) if match.group(4) else None  # 'val' only if it exists, else None
-            t = match.group(5)  # Always extract t from the last part
-            return atomsymbol, val if val != None else None, t
-        return None
-                        
+        return [[map [key] * sign for key, sign in clause] for clause in self.compile_cnf (formula)]
 
 
     '''
@@ -399,6 +295,10 @@ class Helper:
         domain (list): The domain of the atom. For boolean atoms, the domain is [0, 1], 
                        representing False and True. For non-boolean atoms, the domain is 
                        passed as a list of possible values.
+        encoding (str): For non-boolean atoms, how values are mapped to CNF variables: 'onehot' 
+                        (one variable per value), 'log' (binary code of the value's position) or 
+                        'order' (one variable per "value at position i or later"). None for boolean atoms.
+        bits (list): The symbols of the boolean atoms encoding a 'log' or 'order' atom.
     
     Methods:
         __init__(self, symbol, type, domain):
@@ -423,22 +323,80 @@ class Helper:
         symbol (str): The name of the atom.
         type (str): The type of the atom, either 'boolean' or another type like 'int'.
         domain (list): The domain of possible values for the atom (ignored for boolean atoms).
+        encoding (str): 'onehot' (default), 'log' or 'order' (ignored for boolean atoms).
 
     Returns:
         An instance of the Atom class with the specified attributes.
     '''
 
 class Atom (Helper):
-    def __init__ (self,symbol, type, domain):
+    __slots__ = ("symbol", "type", "domain", "encoding", "bits")
+
+    def __init__ (self,symbol, type, domain, encoding = None):
         self.symbol = symbol
         self.type = type
         self.domain = self.parse_domain (type, domain) 
+        self.encoding = None if type == self.boolean_str else (encoding or self.onehot_encoding_str)
+        self.bits = self.parse_bits ()
     
     def parse_domain (self, type, domain):
         if type == self.boolean_str:
             return [0, 1]
         else:
             return domain
+
+    '''
+        Returns the symbols of the boolean atoms encoding a compact `int` atom:
+        - log: bits x_b0 (least significant) ... x_b(m-1), the value at position i of
+          the domain being represented by the binary code of i;
+        - order: x_o1 ... x_o(n-1), x_oi being true iff the value is at position i of
+          the domain or later.
+        One-hot and boolean atoms have no bits (their values are atoms themselves).
+    '''
+    def parse_bits (self):
+        n = len (self.domain)
+        if self.encoding == self.log_encoding_str:
+            return [self.symbol+self.underscore_str+self.log_bit_str+str (i) for i in range ((n - 1).bit_length ())]
+        if self.encoding == self.order_encoding_str:
+            return [self.symbol+self.underscore_str+self.order_bit_str+str (i) for i in range (1, n)]
+        return []
+
+    '''
+        Returns the formula over the bit atoms stating that a compact atom takes `val`.
+    '''
+    def value_formula (self, val):
+        i = self.domain.index (val)
+        if self.encoding == self.log_encoding_str:
+            lits = [bit if (i >> b) & 1 else self.negation_str+bit for b, bit in reversed (list (enumerate (self.bits)))]
+        else:
+            lits = []
+            if i > 0:
+                lits.append (self.bits [i - 1])
+            if i < len (self.bits):
+                lits.append (self.negation_str+self.bits [i])
+        if len (lits) == 0:
+            return "True"
+        return self.opening_square_brace+self.logicalANDstr.join (lits)+self.closing_square_brace
+
+    '''
+        Returns the formulas that must hold at every step for the bits to encode a value
+        of the domain: codes beyond the domain are excluded for the log encoding, and the
+        bits are kept monotone (x_o(i+1) -> x_oi) for the order encoding.
+    '''
+    def domain_formulas (self):
+        formulas = []
+        if self.encoding == self.log_encoding_str:
+            # code <= n-1, one clause per zero bit of n-1 (lexicographic comparison)
+            k = len (self.domain) - 1
+            for i, bit in enumerate (self.bits):
+                if (k >> i) & 1 == 0:
+                    lits = [self.negation_str+bit] + [self.negation_str+self.bits [j]
+                                                      for j in range (i + 1, len (self.bits)) if (k >> j) & 1]
+                    formulas.append (self.logicalORstr.join (lits))
+        elif self.encoding == self.order_encoding_str:
+            for i in range (1, len (self.bits)):
+                formulas.append (self.negation_str+self.bits [i]+self.logicalORstr+self.bits [i - 1])
+        return formulas
             
 
 
@@ -499,44 +457,260 @@ class Atom (Helper):
         Args:
             steps (int): The number of steps (time frames) to consider in the model.
             data (list): A list containing the state variables, initial state, transition relations, and safety properties.
+            cnf_encoding (str): How formulas are normalized into CNF: "sympy" (distribution with `to_cnf`),
+                                "tseitin" or "pg" (structural encoding with auxiliary atoms, see `TseitinEncoder`).
+            int_encoding (str): Default encoding of the `int` atoms ("onehot", "log" or "order"), overridden 
+                                per atom by the optional "encodings" section of the specification (data [4]).
+            amo_encoding (str): Encoding of the exactly-one constraints of one-hot atoms (see `CardinalityEncoder`).
+            formula_cache (FormulaCache): Optional persistent cache of the normalized sections (see `cached_build`).
+            semantics (str): How the transition rules relate the steps: "same-step" (every rule constrains the
+                             state of each step), or "sequential" / "parallel" (a rule fires from step t to t+1,
+                             see `build_action_constraints`).
+            cone_of_influence (bool): Drop the atoms, rules and initial state formulas that cannot influence
+                                      the safety properties (see `reduce_cone_of_influence`).
 
         Returns:
             An instance of the `Specification` class with fully constructed constraints.
     '''
 
 class Specification (Helper):
-    def __init__ (self, steps, data, incremental_encoding):
+    def __init__ (self, steps, data, incremental_encoding, cnf_encoding = Helper.sympy_encoding_str,
+                  int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                  formula_cache = None, semantics = Helper.same_step_semantics_str, cone_of_influence = False):
         self.state_variables = data [0]
         self.initial_state = data [1]
         self.initial_state = self.initial_state.split (self.comma_str)
         self.transition_relations = data [2]
         self.safety_property = data [3]
+        self.int_encoding = int_encoding
+        self.atom_encodings = data [4] if len (data) > 4 else {}
         self.steps = steps
         self.incremental_encoding = incremental_encoding
+        self.semantics = semantics
+        self.relational = semantics != self.same_step_semantics_str
         self.temporal_atom = "TV"
+        self.auxiliary_atom = "AUX"
+        self.action_atom = "ACT"
+        self.cnf_encoding = cnf_encoding
+        self.tseitin_encoder = TseitinEncoder (self.add_auxiliary_atom,
+                                               cnf_encoding == self.plaisted_greenbaum_encoding_str)
+        self.amo_encoding = amo_encoding
+        self.cardinality_encoder = CardinalityEncoder (self.add_auxiliary_atom)
+        self.int_comparator = IntComparator (self.add_auxiliary_atom)
         self.state_atoms = []
         self.initial_state_constraints = []
         self.transition_constraints = {}
+        self.domain_constraints = {}
         self.safety_violation_constraints = []
+        self.precondition_constraints = {}
+        self.effect_constraints = {}
+        self.interference_constraints = []
+        self.action_atoms = {}
+        self.bit_owners = {}
         self.symbol_atom_map = {}
+        self.formula_parser = FormulaParser (self.symbol_atom_map)
+        self.auxiliary_atoms = []
+        self.formula_cache = formula_cache
+        self.cone_report = None
+        if cone_of_influence:
+            self.reduce_cone_of_influence ()
+        self.cache_context = FormulaCache.key (self.state_variables, self.atom_encodings, int_encoding, cnf_encoding)
         self.create_state_atoms ()
-        self.build_initial_state_constraints ()
-        self.build_transition_constraints ()
-        self.build_safety_constraints ()
+        self.cached_build ("domain_constraints", amo_encoding, self.build_domain_constraints)
+        self.cached_build ("initial_state_constraints", self.initial_state, self.build_initial_state_constraints)
+        if self.relational:
+            self.build_action_constraints ()
+        else:
+            self.cached_build ("transition_constraints", [self.transition_relations, self.incremental_encoding],
+                               self.build_transition_constraints)
+        self.cached_build ("safety_violation_constraints", self.safety_property, self.build_safety_constraints)
+
+    '''
+        Runs `build`, which fills the attribute `name` (a list or a dictionary of
+        normalized formulas), unless `formula_cache` (a `FormulaCache`, usually backed by
+        a directory) already holds the result for the same section `content` and the
+        same state variables and encoding options. Auxiliary atoms are cached as
+        placeholders (see `abstract_auxiliary_atoms`). The number of steps is not part
+        of the key, so a section is reused when only `steps` changes.
+    '''
+    def cached_build (self, name, content, build):
+        if self.formula_cache is None:
+            build ()
+            return
+        key = FormulaCache.key (self.cache_context, name, content)
+        entry = self.formula_cache.get (key)
+        if entry is not None:
+            names = [self.add_auxiliary_atom () for i in range (entry ["aux"])]
+            substitute = lambda text: re.sub (r'@(\d+)', lambda match: names [int (match.group (1))], text)
+            value = entry ["value"]
+            if isinstance (value, dict):
+                setattr (self, name, {k: substitute (v) for k, v in value.items ()})
+            else:
+                setattr (self, name, [substitute (v) for v in value])
+            return
+        first = len (self.auxiliary_atoms)
+        build ()
+        value = getattr (self, name)
+        if isinstance (value, dict):
+            value = {k: self.abstract_auxiliary_atoms (v, first) for k, v in value.items ()}
+        else:
+            value = [self.abstract_auxiliary_atoms (v, first) for v in value]
+        self.formula_cache.put (key, {"value": value, "aux": len (self.auxiliary_atoms) - first})
+
+    '''
+        Cone-of-influence reduction, run before any atom is created: keeps only the
+        atoms, rules and initial state formulas that may influence the safety properties,
+        and records what was dropped in `cone_report`.
+
+        The cone of a property starts with the atoms it refers to, and grows to a fixpoint:
+        - with a relational semantics, a rule belongs to the cone if its effects refer to
+          an atom of the cone (a rule changing no atom of the cone only stutters with
+          respect to the property), and then all the atoms of its preconditions and
+          effects do;
+        - with the same-step semantics, a rule constrains all its atoms within each step,
+          so it belongs to the cone if any of its atoms does;
+        - an initial state formula belongs to the cone if any of its atoms does.
+        Formulas without atoms (e.g. "False") are always kept. The dropped constraints
+        only refer to dropped atoms, which are assumed to be consistent on their own, as
+        in the usual cone-of-influence reduction; a counterexample keeps its depth.
+
+        `cone_report` holds the cone of every property ("properties": property, atoms
+        and rules), and the kept and pruned atoms, rules and initial state formulas.
+    '''
+    def reduce_cone_of_influence (self):
+        atoms = {}
+        owners = {}
+        for type, states in self.state_variables.items ():
+            for symbol, val in states.items ():
+                atom = Atom (symbol, type, val, self.atom_encodings.get (symbol, self.int_encoding))
+                atoms [symbol] = atom
+                for bit in atom.bits:
+                    atoms [bit] = Atom (bit, self.boolean_str, None)
+                    owners [bit] = symbol
+        parser = FormulaParser (atoms)
+        def symbols (formulas):
+            result = set ()
+            for formula in formulas:
+                if formula.strip ():
+                    result |= parser.symbols (parser.parse (formula))
+            return {owners.get (symbol, symbol) for symbol in result}
+        reads = {}
+        writes = {}
+        for rule_name, rule in self.transition_relations.items ():
+            reads [rule_name] = symbols (rule ["preconditions"])
+            writes [rule_name] = symbols (rule ["effects"])
+        init_symbols = [symbols ([formula]) for formula in self.initial_state]
+
+        def cone (relevant):
+            relevant = set (relevant)
+            rules = {rule_name for rule_name in self.transition_relations
+                     if not reads [rule_name] and not writes [rule_name]}
+            changed = True
+            while changed:
+                changed = False
+                for rule_name in self.transition_relations:
+                    influence = writes [rule_name] if self.relational else reads [rule_name] | writes [rule_name]
+                    if rule_name not in rules and influence & relevant:
+                        rules.add (rule_name)
+                        relevant |= reads [rule_name] | writes [rule_name]
+                        changed = True
+                for formula_symbols in init_symbols:
+                    if formula_symbols & relevant and not formula_symbols <= relevant:
+                        relevant |= formula_symbols
+                        changed = True
+            return relevant, rules
+
+        properties = []
+        kept_atoms = set ()
+        kept_rules = set ()
+        for formula in self.safety_property:
+            relevant, rules = cone (symbols ([formula]))
+            kept_atoms |= relevant
+            kept_rules |= rules
+            properties.append ({"property": formula, "atoms": [symbol for states in self.state_variables.values ()
+                                                               for symbol in states if symbol in relevant],
+                                "rules": [rule_name for rule_name in self.transition_relations if rule_name in rules]})
+        kept_init = [formula for formula, formula_symbols in zip (self.initial_state, init_symbols)
+                     if not formula_symbols or formula_symbols & kept_atoms]
+
+        all_atoms = [symbol for states in self.state_variables.values () for symbol in states]
+        self.cone_report = {
+            "properties": properties,
+            "atoms": [symbol for symbol in all_atoms if symbol in kept_atoms],
+            "rules": [rule_name for rule_name in self.transition_relations if rule_name in kept_rules],
+            "pruned_atoms": [symbol for symbol in all_atoms if symbol not in kept_atoms],
+            "pruned_rules": [rule_name for rule_name in self.transition_relations if rule_name not in kept_rules],
+            "pruned_init": [formula for formula in self.initial_state if formula not in kept_init]}
+        self.state_variables = {type: {symbol: val for symbol, val in states.items () if symbol in kept_atoms}
+                                for type, states in self.state_variables.items ()}
+        self.transition_relations = {rule_name: rule for rule_name, rule in self.transition_relations.items ()
+                                     if rule_name in kept_rules}
+        self.initial_state = kept_init
+
+    # one-line summary of `cone_report`
+    def describe_cone_of_influence (self):
+        report = self.cone_report
+        natoms = len (report ["atoms"]) + len (report ["pruned_atoms"])
+        nrules = len (report ["rules"]) + len (report ["pruned_rules"])
+        return (f"Cone of influence: kept {len (report ['atoms'])}/{natoms} atoms, {len (report ['rules'])}/{nrules} rules; "
+                f"pruned {len (report ['pruned_init'])} initial state formulas")
 
     def add_temporal_atom (self):
         atom = Atom (self.temporal_atom, self.boolean_str, None)
         self.state_atoms.append (atom)
         self.symbol_atom_map [atom.symbol] = atom
 
+    '''
+        Registers a fresh boolean atom naming a sub-formula of the structural CNF
+        encoding, and returns its symbol (AUX0, AUX1, ...).
+    '''
+    def add_auxiliary_atom (self):
+        atom = Atom (self.auxiliary_atom+str (len (self.auxiliary_atoms)), self.boolean_str, None)
+        self.auxiliary_atoms.append (atom)
+        self.state_atoms.append (atom)
+        self.symbol_atom_map [atom.symbol] = atom
+        return atom.symbol
+
     def create_state_atoms (self):
         for type, states in self.state_variables.items():
             for symbol, val in states.items():
-                atom = Atom (symbol, type, val)
+                atom = Atom (symbol, type, val, self.atom_encodings.get (symbol, self.int_encoding))
                 self.state_atoms.append (atom)
                 self.symbol_atom_map [symbol] = atom 
+                for bit in atom.bits:
+                    bit_atom = Atom (bit, self.boolean_str, None)
+                    self.state_atoms.append (bit_atom)
+                    self.symbol_atom_map [bit] = bit_atom
+                    self.bit_owners [bit] = symbol
         if self.incremental_encoding:
             self.add_temporal_atom ()
+        if self.relational:
+            for i, rule_name in enumerate (self.transition_relations):
+                atom = Atom (self.action_atom+str (i), self.boolean_str, None)
+                self.state_atoms.append (atom)
+                self.symbol_atom_map [atom.symbol] = atom
+                self.action_atoms [rule_name] = atom.symbol
+
+    '''
+        Builds, for every `int` atom, the constraint that it takes exactly one value of
+        its domain. For a one-hot atom, it is an exactly-one constraint over its value
+        atoms, encoded as selected by `amo_encoding` (see `CardinalityEncoder`; "none"
+        disables it). For a compact atom, it restricts its bits to the codes of its
+        domain (see `Atom.domain_formulas`). Like the transitions, these constraints
+        are instantiated at every step.
+    '''
+    def build_domain_constraints (self):
+        for atom in list (self.state_atoms):
+            if atom.encoding == self.onehot_encoding_str:
+                if self.amo_encoding != CardinalityEncoder.none_str:
+                    lits = [atom.symbol+self.underscore_str+val for val in atom.domain]
+                    clauses = self.cardinality_encoder.exactly_one (lits, self.amo_encoding)
+                    self.domain_constraints [atom.symbol] = self.cardinality_encoder.to_string (clauses)
+                continue
+            formulas = atom.domain_formulas ()
+            if len (formulas) > 0:
+                formula = self.logicalANDstr.join (self.opening_square_brace+f+self.closing_square_brace for f in formulas)
+                self.domain_constraints [atom.symbol] = self.normalize_formula (formula)
 
     def build_initial_state_constraints (self):
         for formula in self.initial_state:
@@ -554,16 +728,135 @@ class Specification (Helper):
             formula = self.normalize_formula (formula)
             self.transition_constraints [rule_name] = formula
     
+    '''
+        Relational counterpart of `build_transition_constraints`, for the "sequential"
+        and "parallel" semantics. Every rule has an action atom (`action_atoms`, ACT0,
+        ACT1, ...), true at step t iff the rule fires from step t to step t+1. The
+        preconditions of a rule are normalized as a formula of step t, and its effects
+        as a formula of step t+1 (`precondition_constraints`, `effect_constraints`);
+        `CNFConverter` guards both by the action atom. An atom may only change from
+        step t to step t+1 if a rule firing at t has it in its effects (frame axioms,
+        see `CNFConverter.build_relation_template`).
+
+        Which rules may fire together is given by `interference_constraints`:
+        - sequential: at most one rule fires per step;
+        - parallel (exists-step semantics): rules fire together if their effects have
+          no atom in common, and if there is an order in which none of them changes
+          an atom read by the preconditions of a later one. The order is computed
+          statically (`action_order`); pairs of rules violating it are mutually
+          exclusive. Firing such a set in one step reaches the same state as firing
+          its rules one at a time in that order, so a counterexample needs fewer steps.
+    '''
+    def build_action_constraints (self):
+        self.rule_reads = {}
+        self.rule_writes = {}
+        for rule_name, rule in self.transition_relations.items ():
+            self.rule_reads [rule_name] = self.formula_symbols (rule ["preconditions"])
+            self.rule_writes [rule_name] = self.formula_symbols (rule ["effects"])
+        self.cached_build ("precondition_constraints", self.transition_relations,
+                           lambda: self.build_rule_constraints ("preconditions", self.precondition_constraints))
+        self.cached_build ("effect_constraints", self.transition_relations,
+                           lambda: self.build_rule_constraints ("effects", self.effect_constraints))
+        self.cached_build ("interference_constraints", [self.transition_relations, self.semantics, self.amo_encoding],
+                           self.build_interference_constraints)
+
+    def build_rule_constraints (self, part, constraints):
+        joining_str = self.space_str+self.logicalANDstr+self.space_str
+        for rule_name, rule in self.transition_relations.items ():
+            formulas = rule [part] or ["True"]
+            formula = joining_str.join (self.opening_square_brace+f+self.closing_square_brace for f in formulas)
+            constraints [rule_name] = self.normalize_formula (formula)
+
+    # symbols of the state atoms the formulas refer to (bit atoms count as their int atom)
+    def formula_symbols (self, formulas):
+        symbols = set ()
+        for formula in formulas:
+            symbols |= self.formula_parser.symbols (self.formula_parser.parse (formula))
+        return {self.bit_owners.get (symbol, symbol) for symbol in symbols}
+
+    '''
+        Orders the rules for the parallel semantics, so that a rule whose effects change
+        an atom read by the preconditions of another rule comes after it whenever
+        possible (topological order, declaration order among independent rules; a
+        cycle is broken at its first rule in declaration order). Returns the position
+        of each rule.
+    '''
+    def action_order (self):
+        rules = list (self.transition_relations)
+        before = {r: [s for s in rules if s != r and self.rule_writes [r] & self.rule_reads [s]] for r in rules}
+        remaining = list (rules)
+        order = []
+        while remaining:
+            ready = [r for r in remaining if not any (s in remaining for s in before [r])]
+            rule = ready [0] if ready else remaining [0]
+            order.append (rule)
+            remaining.remove (rule)
+        return {rule: i for i, rule in enumerate (order)}
+
+    def build_interference_constraints (self):
+        amo_encoding = self.amo_encoding
+        if amo_encoding == CardinalityEncoder.none_str:
+            amo_encoding = CardinalityEncoder.auto_str
+        rules = list (self.transition_relations)
+        clauses = []
+        if self.semantics == self.sequential_semantics_str:
+            clauses = self.cardinality_encoder.at_most_one ([self.action_atoms [r] for r in rules], amo_encoding)
+        else:
+            symbols = sorted (set ().union (*[self.rule_writes [r] for r in rules]))
+            for symbol in symbols:
+                writers = [self.action_atoms [r] for r in rules if symbol in self.rule_writes [r]]
+                clauses.extend (self.cardinality_encoder.at_most_one (writers, amo_encoding))
+            position = self.action_order ()
+            for r in rules:
+                for s in rules:
+                    if position [r] < position [s] and self.rule_writes [r] & self.rule_reads [s] \
+                       and not self.rule_writes [r] & self.rule_writes [s]:
+                        clauses.append ([self.negation_str+self.action_atoms [r], self.negation_str+self.action_atoms [s]])
+        if len (clauses) > 0:
+            self.interference_constraints.append (self.cardinality_encoder.to_string (clauses))
+
     def build_safety_constraints (self):
         for formula in self.safety_property:
             prefix = ''
             # if self.incremental_encoding:
             #     prefix = self.temporal_atom+self.space_str+self.logicalORstr+self.space_str
             formula = self.normalize_formula (prefix+self.negation_str+self.opening_square_brace+formula+self.closing_square_brace)         
-            formula = formula.split (self.logicalANDstr)
-            formula = [f.replace(self.opening_square_brace,'').replace (self.closing_square_brace,'') for f in formula]
-            for f in formula:
-                self.safety_violation_constraints.append (f)
+            for clause in self.compile_cnf (formula):
+                self.safety_violation_constraints.append (self.formula_parser.clause_string (clause))
+
+'''
+    Dense table of the CNF variables of an unrolling: the variables of step 0 by key
+    (symbol, val), and the uniform stride `step_nvars` between steps, instead of one
+    dictionary per step. `variable (key, t)` returns the variable of a key at step t;
+    `table [t]` builds the dictionary of step t (step 0 is shared, not copied).
+'''
+class StepVariables:
+    __slots__ = ("variables", "step_nvars", "steps")
+
+    def __init__ (self, variables, step_nvars, steps):
+        self.variables = variables
+        self.step_nvars = step_nvars
+        self.steps = steps
+
+    def variable (self, key, t):
+        return self.variables [key] + t * self.step_nvars
+
+    def __getitem__ (self, t):
+        if not 0 <= t <= self.steps:
+            raise KeyError (t)
+        if t == 0:
+            return self.variables
+        offset = t * self.step_nvars
+        return {key: var + offset for key, var in self.variables.items ()}
+
+    def __len__ (self):
+        return self.steps + 1
+
+    def __iter__ (self):
+        return iter (range (self.steps + 1))
+
+    def __contains__ (self, t):
+        return isinstance (t, int) and 0 <= t <= self.steps
 
     '''
     The `CNFConverter` class is responsible for converting a system specification into 
@@ -577,12 +870,13 @@ class Specification (Helper):
     Attributes:
         nvars (int): The total number of CNF variables.
         nclauses (int): The total number of CNF clauses.
-        vars (list): A list of CNF variable indices from 1 to nvars.
-        state_to_cnf_vars (dict): A mapping from state variables and time steps to CNF variables.
-        initial_state_clauses (list): CNF clauses corresponding to the initial state constraints.
-        transition_clauses (list): CNF clauses corresponding to the transition relations.
-        safety_violation_clauses (list): CNF clauses corresponding to safety property violations.
-        cnf_clauses (list): The final list of all CNF clauses (initial state, transition, safety).
+        vars (range): The CNF variable indices from 1 to nvars.
+        state_to_cnf_vars (StepVariables): The CNF variables of the state atoms at every step.
+        initial_state_clauses (ClauseDatabase): CNF clauses corresponding to the initial state constraints.
+        transition_clauses (ClauseDatabase): CNF clauses corresponding to the transition relations.
+        safety_violation_clauses (ClauseDatabase): CNF clauses corresponding to safety property violations.
+        cnf_clauses (ClauseDatabase): All the CNF clauses (initial state, transition, safety), in one flat
+                                      buffer (see `ClauseDatabase`).
 
     Methods:
         __init__(self, steps, data):
@@ -594,7 +888,8 @@ class Specification (Helper):
             Maps the state variables to CNF variables. For each time step (from 0 to `steps`), 
             boolean state variables are assigned one CNF variable, while non-boolean variables 
             are assigned multiple CNF variables, one for each value in their domain.
-            The total number of CNF variables is stored in `nvars`.
+            The total number of CNF variables is stored in `nvars`. The mapping is stored
+            densely, for step 0 only (see `StepVariables`).
 
         build_initial_state_cnf(self):
             Converts the initial state constraints into CNF clauses. The initial state is 
@@ -602,8 +897,9 @@ class Specification (Helper):
             added to `initial_state_clauses`, and the clause count (`nclauses`) is updated.
 
         build_transition_cnf(self):
-            Converts the transition relations into CNF clauses. For each time step, the preconditions 
-            and effects of each transition rule are converted into CNF and added to `transition_clauses`. 
+            Converts the transition relations into CNF clauses. The preconditions and effects of each 
+            transition rule are converted into CNF once (`build_transition_template`), and instantiated 
+            at every time step by variable offset into `transition_clauses`. 
             The clause count (`nclauses`) is updated accordingly.
 
         build_safety_violation_cnf(self):
@@ -630,6 +926,13 @@ class Specification (Helper):
     Args:
         steps (int): The number of time steps to consider.
         data (list): A list containing the state variables, initial state, transition relations, and safety properties.
+        cnf_encoding (str): "sympy", "tseitin" or "pg"; see `Specification`.
+        int_encoding (str): "onehot", "log" or "order"; see `Specification`.
+        amo_encoding (str): "auto", "pairwise", "sequential", "commander", "product", "ladder" or "none".
+        formula_cache (FormulaCache): Optional persistent cache; see `Specification`.
+        semantics (str), cone_of_influence (bool): See `Specification`.
+        streaming (bool): Keep only the templates, without materializing `transition_clauses`,
+                          `safety_violation_clauses` and `cnf_clauses`; see `clause_chunks`.
 
     Returns:
         An instance of the `CNFConverter` class with all constraints represented as CNF clauses, 
@@ -637,132 +940,351 @@ class Specification (Helper):
     '''
 
 class CNFConverter (Specification, Helper):
-    
-    def get_timed_constraints (self,constraints):
-        modified_constraints = []
-        for t in range(0, self.steps + 1):
-            for element in self.safety_violation_constraints:
-                atoms = element.split(self.logicalORstr)
-                updated_atoms = [atom + self.underscore_str + str(t) for atom in atoms]            
-                modified_constraints.append(self.logicalORstr.join(updated_atoms))
-        return modified_constraints
-
-    def __init__ (self, incremental_encoding, steps, data):
-        super ().__init__ (steps, data, incremental_encoding)
+
+    def __init__ (self, incremental_encoding, steps, data, cnf_encoding = Helper.sympy_encoding_str,
+                  int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                  formula_cache = None, semantics = Helper.same_step_semantics_str, cone_of_influence = False,
+                  streaming = False, profiler = None):
+        self.profiler = profiler if profiler is not None else Profiler ()
+        with self.profiler.stage ("normalize"):
+            super ().__init__ (steps, data, incremental_encoding, cnf_encoding, int_encoding, amo_encoding,
+                               formula_cache, semantics, cone_of_influence)
+        with self.profiler.stage ("encode"):
+            self.build_cnf (streaming)
+
+    '''
+        Compiles the normalized constraints into clauses: allocates the variables of
+        every step, compiles the templates, and (unless `streaming`) instantiates the
+        clauses of all steps. `nclauses` and `nliterals` count the clauses and literals
+        of the whole unrolling, and `rule_sizes` the clauses and literals of every
+        transition rule per step.
+    '''
+    def build_cnf (self, streaming):
+        # same-step: depth t assumes the activation literals of steps 0..t; relational: only that of step t
+        self.cumulative_assumptions = not self.relational
+        self.streaming = streaming
         self.nvars = 0
         self.nclauses = 0
-        self.vars = []
+        self.nliterals = 0
+        self.rule_sizes = {}
+        self.vars = range (0)
         self.temporal_bool_vars = {}
         self.temporal_timed_atom = {}
-        self.state_to_cnf_vars = {}
-        self.initial_state_clauses = []
-        self.transition_clauses = []
-        self.safety_violation_clauses = []
-        self.cnf_clauses = []
+        self.state_to_cnf_vars = None
+        self.initial_state_clauses = ClauseDatabase ()
+        self.transition_clauses = ClauseDatabase ()
+        self.safety_violation_clauses = ClauseDatabase ()
+        self.cnf_clauses = ClauseDatabase ()
         self.build_state_to_cnf_vars ()
         self.build_initial_state_cnf ()
         self.build_transition_cnf ()
         self.build_safety_violation_cnf ()
-        self.merge_all_cnf_clauses ()
+        if not self.streaming:
+            self.merge_all_cnf_clauses ()
+        if self.incremental_encoding:
+            self.build_step_template ()
+        self.nliterals = self.count_literals ()
         
              
+    '''
+        Every step allocates the same variables in the same order: its activation
+        literal (incremental or relational encoding), then the state atoms. Only the
+        variables of step 0 are stored (key (symbol, val) -> variable); the variable of a
+        key at step t is its step-0 variable plus t * `step_nvars` (see `StepVariables`).
+        `variable_keys` maps every step-0 variable back to its key.
+    '''
     def build_state_to_cnf_vars(self):
-        idx = 0        
+        idx = 0
+        variables = {}
+        if self.incremental_encoding or self.relational:
+            idx += 1
+        for atom in self.state_atoms:
+            if atom.type == self.boolean_str:
+                idx = idx + 1
+                variables [(atom.symbol, None)] = idx
+            elif atom.encoding != self.onehot_encoding_str:
+                continue # encoded by its bit atoms
+            else:
+                for val in atom.domain:
+                    idx = idx + 1
+                    variables [(atom.symbol, val)] = idx
+        self.step_nvars = idx
         for t in range(0, self.steps + 1):
-            if self.incremental_encoding:
-                idx += 1
-                self.temporal_bool_vars [t] = idx
+            if self.incremental_encoding or self.relational:
+                self.temporal_bool_vars [t] = 1 + t * self.step_nvars
                 self.temporal_timed_atom [t] = self.temporal_atom+self.underscore_str+str (t)
-            self.state_to_cnf_vars[t] = {}  
-            for atom in self.state_atoms:
-                self.state_to_cnf_vars[t] [atom.symbol] = []
-                if atom.type == self.boolean_str:
-                    idx = idx + 1  
-                    self.state_to_cnf_vars[t] [(atom.symbol, None)] = idx
-                else:
-                    for val in atom.domain:
-                        idx = idx + 1
-                        self.state_to_cnf_vars[t] [(atom.symbol, val)] = idx
-        self.nvars = idx
-        self.vars = list (range (1, self.nvars+1))
-
-   
+        self.state_to_cnf_vars = StepVariables (variables, self.step_nvars, self.steps)
+        self.variable_keys = [None] * (self.step_nvars + 1)
+        for key, var in variables.items ():
+            self.variable_keys [var] = key
+        if self.incremental_encoding or self.relational:
+            self.variable_keys [1] = (self.temporal_atom, None)
+        self.nvars = self.step_nvars * (self.steps + 1)
+        self.vars = range (1, self.nvars+1)
+
     def build_initial_state_cnf (self):
         init_state_bool_vars = self.state_to_cnf_vars[0]
         temporal_var = self.temporal_bool_vars [0]
         for formula in self.initial_state_constraints:
             clauses = self.get_cnf_clause (formula, init_state_bool_vars, True)
             for clause in clauses:
-                clause.insert(0, -temporal_var)
+                if not self.relational:
+                    clause.insert(0, -temporal_var)
                 self.initial_state_clauses.append (clause)
                 self.nclauses += 1
 
+    '''
+        Compiles every transition rule once, against the CNF variables of step 0, into a
+        flat zero-terminated literal array (`transition_template`). Since every step
+        allocates its variables in the same order, the variable of an atom at step t is
+        its step-0 variable plus t * `step_nvars`, so the clauses of any step are obtained
+        by shifting the template, without parsing the formulas again.
+
+        `transition_template_signs` holds the sign of each template literal (0 for the
+        clause terminators), and `transition_template_bounds` the (start, end) position
+        of each clause in the template.
+    '''
+    def build_transition_template (self):
+        clauses = []
+        constraints = list (self.transition_constraints.items ()) + list (self.domain_constraints.items ())
+        for rule_name, formula in constraints:
+            first = len (clauses)
+            for clause in self.get_cnf_clause (formula, self.state_to_cnf_vars[0], False):
+                if self.incremental_encoding and not self.relational:
+                    clause.insert(0, -self.temporal_bool_vars [0])
+                clauses.append (clause)
+            if rule_name in self.transition_relations:
+                self.rule_sizes [rule_name] = [len (clauses) - first, sum (len (clause) for clause in clauses [first:])]
+        [self.transition_template, self.transition_template_signs,
+         self.transition_template_bounds] = self.build_template (clauses)
+
+    def build_template (self, clauses):
+        template = []
+        bounds = []
+        for clause in clauses:
+            start = len (template)
+            template.extend (clause)
+            bounds.append ((start, len (template)))
+            template.append (0)
+        template = np.array (template, dtype=np.int64)
+        return [template, np.sign (template), bounds]
+
+    '''
+        Relational semantics: compiles the clauses linking step 0 to step 1 (see
+        `Specification.build_action_constraints`) into `relation_template`, the
+        variables of step 1 being those of step 0 plus `step_nvars`; shifted by
+        t * `step_nvars`, it links step t to step t+1. It holds, for every rule, its
+        preconditions at step 0 and its effects at step 1 guarded by its action atom,
+        the interference constraints, and the frame axioms: every variable of a state
+        atom keeps its value unless a rule having the atom in its effects fires.
+    '''
+    def build_relation_template (self):
+        current = self.state_to_cnf_vars [0]
+        following = {key: var + self.step_nvars for key, var in current.items () if isinstance (key, tuple)}
+        rules = list (self.transition_relations)
+        actions = {rule_name: current [(self.action_atoms [rule_name], None)] for rule_name in rules}
+        clauses = []
+        for rule_name in rules:
+            first = len (clauses)
+            for clause in self.get_cnf_clause (self.precondition_constraints [rule_name], current, False):
+                clauses.append ([-actions [rule_name]] + clause)
+            for clause in self.get_cnf_clause (self.effect_constraints [rule_name], following, False):
+                clauses.append ([-actions [rule_name]] + clause)
+            self.rule_sizes [rule_name] = [len (clauses) - first, sum (len (clause) for clause in clauses [first:])]
+        for formula in self.interference_constraints:
+            clauses.extend (self.get_cnf_clause (formula, current, False))
+        for states in self.state_variables.values ():
+            for symbol in states:
+                writers = [actions [rule_name] for rule_name in rules if symbol in self.rule_writes [rule_name]]
+                for key in self.atom_keys (symbol):
+                    var = current [key]
+                    clauses.append ([-var, var + self.step_nvars] + writers)
+                    clauses.append ([var, -var - self.step_nvars] + writers)
+        [self.relation_template, self.relation_template_signs,
+         self.relation_template_bounds] = self.build_template (clauses)
+
+    # keys of the CNF variables encoding a state atom
+    def atom_keys (self, symbol):
+        atom = self.symbol_atom_map [symbol]
+        if atom.type == self.boolean_str:
+            return [(symbol, None)]
+        if atom.encoding == self.onehot_encoding_str:
+            return [(symbol, val) for val in atom.domain]
+        return [(bit, None) for bit in atom.bits]
+
+    '''
+        Instantiates a template at steps `first` to `last` (inclusive) by integer
+        offset, and returns the literals as a (steps x template length) array.
+    '''
+    def instantiate_template (self, template, signs, first, last):
+        offsets = np.arange (first, last + 1, dtype=np.int64) * self.step_nvars
+        return template [None, :] + signs [None, :] * offsets [:, None]
+
+    def instantiate_transition_template (self, first, last):
+        return self.instantiate_template (self.transition_template, self.transition_template_signs, first, last)
+
     def build_transition_cnf (self):
-        for t in range (0, self.steps+1):
-            bool_vars_t = self.state_to_cnf_vars[t]
-            for rule_name, formula in self.transition_constraints.items():
-                clauses = self.get_cnf_clause (formula, bool_vars_t, False)
-                for clause in clauses:
-                    if self.incremental_encoding:
-                        temporal_var = self.temporal_bool_vars [t]
-                        clause.insert(0, -temporal_var)
-                    self.transition_clauses.append (clause)
-                    self.nclauses += 1
+        self.build_transition_template ()
+        self.nclauses += len (self.transition_template_bounds) * (self.steps + 1)
+        if self.relational:
+            self.build_relation_template ()
+            self.nclauses += len (self.relation_template_bounds) * self.steps
+        if self.streaming:
+            return
+        for t in range (0, self.steps + 1):
+            self.transition_clauses.extend_literals (
+                self.shift_template (self.transition_template, self.transition_template_signs, t))
+        if self.relational:
+            for t in range (0, self.steps):
+                self.transition_clauses.extend_literals (
+                    self.shift_template (self.relation_template, self.relation_template_signs, t))
     
+    '''
+        The safety violation constraints are clauses (e.g., ['door_open', 'elevator_moving',
+        '~door_open|~elevator_floor_3']), compiled once against the variables of step 0 and
+        shifted by t * `step_nvars` for every step t, guarded by the step's activation literal.
+        `safety_template` holds the unguarded clauses of step 0, and
+        `safety_violation_template` the guarded ones as a flat template.
+    '''
     def build_safety_violation_cnf (self):
-        # self.safety_violation_constraints is a list of conjuncts eg., ['door_open', 'elevator_moving', '~door_open|~elevator_floor_3']
-     
-        clause_list = self.get_timed_constraints (self.safety_violation_constraints)    
-        results = []
-        temporal_var = None
-        for clause in clause_list:
-            clause_cnf = []
-            atoms = clause.split('|')
-            for atom in atoms:
-                atom = atom.strip('()')  # Strip any parentheses if present
-                [atomsymbol, val, t] = self.extract_atom_info(atom)
-                bool_var = self.state_to_cnf_vars [int(t)] [(atomsymbol, val)]
-                bool_val = 1
-                if self.negation_str in atom:
-                    bool_val = -1
-                lit = bool_var*bool_val
-                clause_cnf.append (lit)
-                if temporal_var is None:
-                    temporal_var = self.temporal_bool_vars [int(t)]
-            
-            clause_cnf.insert (0,  -temporal_var)
-            self.nclauses += 1
-            self.safety_violation_clauses.append (clause_cnf)
-            temporal_var = None 
+        variables = self.state_to_cnf_vars [0]
+        clauses = []
+        for constraint in self.safety_violation_constraints:
+            for clause in self.compile_cnf (constraint):
+                clauses.append ([variables [key] * sign for key, sign in clause])
+        self.safety_template = clauses
+        self.nclauses += len (clauses) * (self.steps + 1)
+        guarded = [[-self.temporal_bool_vars [0]] + clause for clause in clauses]
+        [self.safety_violation_template, self.safety_violation_template_signs,
+         self.safety_violation_template_bounds] = self.build_template (guarded)
+        if self.streaming:
+            return
+        for t in range (0, self.steps + 1):
+            self.safety_violation_clauses.extend_literals (
+                self.shift_template (self.safety_violation_template, self.safety_violation_template_signs, t))
+
+    # literals of the whole unrolling (clause terminators excluded), from the templates
+    def count_literals (self):
+        nliterals = len (self.initial_state_clauses.literals) - len (self.initial_state_clauses)
+        nliterals += (len (self.transition_template) - len (self.transition_template_bounds)) * (self.steps + 1)
+        nliterals += (len (self.safety_violation_template) - len (self.safety_violation_template_bounds)) * (self.steps + 1)
+        if self.relational:
+            nliterals += (len (self.relation_template) - len (self.relation_template_bounds)) * self.steps
+        return nliterals
 
     def merge_all_cnf_clauses (self):
-        self.cnf_clauses = self.initial_state_clauses.copy()
+        self.cnf_clauses = ClauseDatabase ()
+        self.cnf_clauses.extend (self.initial_state_clauses)
         self.cnf_clauses.extend (self.transition_clauses)
         self.cnf_clauses.extend (self.safety_violation_clauses)
+
+    '''
+        Yields the clauses of `cnf_clauses`, in the same order, as zero-terminated int32
+        arrays holding at most one step each, instantiated from the templates on the fly:
+        the initial state, the transitions of steps 0 to `steps`, (relational semantics)
+        the relations of steps 0 to `steps`-1, and the safety violations of steps 0 to
+        `steps`. Only the current chunk is held in memory, so a streaming converter
+        (`streaming`, which never materializes the clause lists) can feed the solver
+        (`Solver.solve_stream`) or a DIMACS file (`save_cnf`) at any depth.
+    '''
+    def clause_chunks (self):
+        if len (self.initial_state_clauses) > 0:
+            yield np.array (self.initial_state_clauses.as_array ())
+        for t in range (0, self.steps + 1):
+            yield self.shift_template (self.transition_template, self.transition_template_signs, t)
+        if self.relational:
+            for t in range (0, self.steps):
+                yield self.shift_template (self.relation_template, self.relation_template_signs, t)
+        for t in range (0, self.steps + 1):
+            yield self.shift_template (self.safety_violation_template, self.safety_violation_template_signs, t)
+
+    def shift_template (self, template, signs, t):
+        return (template + signs * (t * self.step_nvars)).astype (np.int32)
+
+    '''
+        Compiles the clauses of a single time step (transitions and safety violation,
+        guarded by the step's activation literal) into a flat zero-terminated template
+        over the variables of step 0. Together with `step_literals` and
+        `step_activation`, it lets the incremental driver (`caller.solve_incremental`)
+        add one step at a time to a live solver, whatever `steps` the converter was
+        built with.
+    '''
+    def build_step_template (self):
+        self.step_template = np.concatenate ((self.transition_template, self.safety_violation_template))
+        self.step_template_signs = np.sign (self.step_template)
+        self.step_template_nclauses = len (self.transition_template_bounds) + len (self.safety_violation_template_bounds)
+
+    '''
+        Returns the zero-terminated clauses of step t as an int32 array; step 0 also
+        carries the initial state clauses (unless `initial` is False), and with a
+        relational semantics, step t > 0 the clauses linking step t-1 to step t.
+    '''
+    def step_literals (self, t, initial = True):
+        literals = self.step_template + self.step_template_signs * (t * self.step_nvars)
+        if t > 0 and self.relational:
+            relation = self.relation_template + self.relation_template_signs * ((t - 1) * self.step_nvars)
+            literals = np.concatenate ((relation, literals))
+        if t == 0 and initial:
+            literals = np.concatenate ((self.initial_state_clauses.as_array (), literals))
+        return literals.astype (np.int32)
+
+    def step_activation (self, t):
+        return self.temporal_bool_vars [0] + t * self.step_nvars
+
+    # step-0 CNF variables of the state atoms (not the auxiliary, action or activation atoms)
+    def state_cnf_vars (self):
+        variables = []
+        for states in self.state_variables.values ():
+            for symbol in states:
+                variables.extend (self.state_to_cnf_vars [0] [key] for key in self.atom_keys (symbol))
+        return variables
  
 
-def spec2cnf (inputpath, ouputdir, steps, incremental):
-    directory_path = os.path.dirname(inputpath)
+'''
+    Reads a specification and encodes it, without writing anything to disk. The
+    returned `CNFConverter` holds the clauses (`cnf_clauses`) and the assumptions
+    (`temporal_bool_vars`) that can be handed directly to the solver.
+'''
+def spec2converter (inputpath, steps, incremental, cnf_encoding = Helper.tseitin_encoding_str,
+                    int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+                    formula_cache = None, semantics = Helper.same_step_semantics_str, cone_of_influence = False,
+                    streaming = False, profiler = None):
+    if profiler is None:
+        profiler = Profiler ()
+    with profiler.stage ("parse"):
+        file = FileHandler (inputpath, None, None)
+        file.read_file ()
+    return CNFConverter (incremental, steps, file.data, cnf_encoding, int_encoding, amo_encoding, formula_cache,
+                         semantics, cone_of_influence, streaming, profiler)
+
+'''
+    Writes the clauses of `cnfConverter` to <ouputdir>/<name>_k<steps>.cnf in DIMACS
+    format, and its assumptions to <ouputdir>/<name>_assumptions_k, and returns both paths.
+    The clauses are streamed step by step (`CNFConverter.clause_chunks`) through a
+    buffered `DimacsWriter`; with `compression` ("gzip" or "xz"), the CNF file is
+    compressed and gets the matching extension.
+'''
+def save_cnf (cnfConverter, inputpath, ouputdir, steps, compression = None):
     file_name = os.path.splitext(os.path.basename(inputpath))[0]
-    
-    if len(directory_path)>0:
-        directory_path += "/"
 
-    cnf_file_path = ouputdir+"/"+file_name+"_k"+str(steps)+".cnf"
+    cnf_file_path = ouputdir+"/"+file_name+"_k"+str(steps)+".cnf"+DimacsWriter.compressions.get(compression, "")
     assumptions_file_path = ouputdir+"/"+file_name+"_assumptions_k"
 
-    file = FileHandler (inputpath,cnf_file_path, assumptions_file_path)
-    file.read_file ()
-
-    cnfConverter = CNFConverter (incremental, steps, file.data)
-    
-    cnf_header = "p cnf "+str(cnfConverter.nvars)+" "+str(cnfConverter.nclauses)
-    file.save_to_file (0, cnf_header,
-                    cnfConverter.cnf_clauses)
-    file.save_to_file (1, cnf_header,
-                     list(cnfConverter.temporal_bool_vars.values()))
+    with cnfConverter.profiler.stage ("write"):
+        with DimacsWriter (cnf_file_path, cnfConverter.nvars, cnfConverter.nclauses, compression) as writer:
+            for literals in cnfConverter.clause_chunks ():
+                writer.write (literals)
+        file = FileHandler (inputpath, cnf_file_path, assumptions_file_path)
+        cnf_header = "p cnf "+str(cnfConverter.nvars)+" "+str(cnfConverter.nclauses)
+        file.save_to_file (1, cnf_header,
+                         list(cnfConverter.temporal_bool_vars.values()))
 
     return [cnf_file_path, assumptions_file_path]
-    
-
 
+def spec2cnf (inputpath, ouputdir, steps, incremental, cnf_encoding = Helper.tseitin_encoding_str,
+              int_encoding = Helper.onehot_encoding_str, amo_encoding = CardinalityEncoder.auto_str,
+              formula_cache = None, semantics = Helper.same_step_semantics_str, cone_of_influence = False,
+              compression = None):
+    cnfConverter = spec2converter (inputpath, steps, incremental, cnf_encoding, int_encoding, amo_encoding,
+                                   formula_cache, semantics, cone_of_influence, True)
+    return save_cnf (cnfConverter, inputpath, ouputdir, steps, compression)
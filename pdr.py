@@ -0,0 +1,271 @@
+import heapq
+import time
+from caller import Solver
+
+'''
+    The `PDR` class is an IC3 / property-directed reachability engine on the relational
+    encoding of `CNFConverter` (semantics "sequential" or "parallel"). It proves that
+    the property holds at every step by building an inductive invariant, or finds a
+    counterexample, without unrolling the transition relation.
+
+    A single CaDiCaL session holds one frame of the encoding: the state constraints of
+    steps 0 and 1 and the relation between them (`CNFConverter.step_literals`), the
+    initial state guarded by `init_act`, and the violation at step 0 guarded by the
+    step's activation literal. The frames F_1 ... F_k are sets of lemmas, clauses over
+    the state variables of step 0; a lemma of level i belongs to F_1 ... F_i, and is
+    guarded by the activation literal of level i, so F_i is selected by assuming the
+    activation literals of levels i to k.
+
+    A state (cube) reaching a violation is blocked at level i by checking that it has
+    no predecessor in F_(i-1) (relative induction, the cube of the next state being
+    assumed). The cube is then generalized with the failed assumptions of the solver
+    (`ipasir_failed`), shrunk further by dropping literals, and its negation is added as
+    a lemma at the highest level where it is still relatively inductive. Lemmas are
+    pushed forward after each new frame; two equal frames give the invariant.
+
+    Attributes:
+        solver (Solver): The CaDiCaL session.
+        states (list): The CNF variables of the state atoms at step 0.
+        lemmas (list): lemmas [i] holds the lemmas of level i (lemmas [0] is unused).
+        invariant (list): The inductive invariant (clauses over `states`) once proved.
+        trace (list): The states of the counterexample (cubes over `states`), if any.
+
+    Example:
+        cnfConverter = spec2converter ("model.JSON", 0, 1, semantics = "sequential")
+        result, k = PDR (cnfConverter).check (50)
+'''
+
+class Interrupted (Exception):
+    pass
+
+class PDR:
+    def __init__ (self, cnfConverter, solver = None):
+        if not cnfConverter.relational:
+            raise ValueError ("PDR needs a relational semantics (\"sequential\" or \"parallel\")")
+        self.cnfConverter = cnfConverter
+        self.own_solver = solver is None
+        self.solver = solver if solver is not None else Solver ()
+        self.step_nvars = cnfConverter.step_nvars
+        self.states = cnfConverter.state_cnf_vars ()
+        self.last_var = 2 * self.step_nvars
+        self.init_act = self.new_var ()
+        self.bad_act = cnfConverter.step_activation (0)
+        self.frame_acts = []
+        self.lemmas = [[]]
+        self.invariant = None
+        self.trace = None
+        self.counter = 0
+        self.solver.add_literals (cnfConverter.step_literals (0, False))
+        self.solver.add_literals (cnfConverter.step_literals (1, False))
+        for clause in cnfConverter.initial_state_clauses:
+            self.solver.add_clause ([-self.init_act] + clause)
+
+    def new_var (self):
+        self.last_var += 1
+        return self.last_var
+
+    def release (self):
+        if self.own_solver:
+            self.solver.release ()
+
+    def prime (self, literal):
+        return literal + self.step_nvars if literal > 0 else literal - self.step_nvars
+
+    def solve (self, assumptions):
+        self.solver.add_assmuptions (assumptions)
+        result = self.solver.solve ()
+        if result not in (10, 20):
+            raise Interrupted ()
+        return result
+
+    # the state of step 0 in the last model
+    def get_cube (self):
+        return [var if self.solver.val (var) > 0 else -var for var in self.states]
+
+    def frame_assumptions (self, i):
+        if i == 0:
+            return [self.init_act]
+        return self.frame_acts [i - 1:]
+
+    def new_frame (self):
+        self.frame_acts.append (self.new_var ())
+        self.lemmas.append ([])
+
+    def add_lemma (self, clause, level):
+        self.lemmas [level].append (clause)
+        self.solver.add_clause ([-self.frame_acts [level - 1]] + clause)
+
+    def intersects_init (self, cube):
+        return self.solve ([self.init_act] + cube) == 10
+
+    # whether a lemma of F_level already excludes the cube
+    def blocked (self, cube, level):
+        literals = set (cube)
+        for j in range (level, len (self.lemmas)):
+            for clause in self.lemmas [j]:
+                if all (-literal in literals for literal in clause):
+                    return True
+        return False
+
+    '''
+        Relative induction: checks F_(level-1) & ~cube & T & cube'. Returns
+        [True, predecessor] if the cube has a predecessor (a cube of step 0), and
+        [False, core] otherwise, core being the literals of the cube whose primed
+        assumption took part in the proof.
+    '''
+    def predecessor (self, cube, level):
+        guard = self.new_var ()
+        self.solver.add_clause ([-guard] + [-literal for literal in cube])
+        primed = [self.prime (literal) for literal in cube]
+        try:
+            if self.solve (self.frame_assumptions (level - 1) + [guard] + primed) == 10:
+                return [True, self.get_cube ()]
+            return [False, [literal for literal, p in zip (cube, primed) if self.solver.failed (p)]]
+        finally:
+            self.solver.add_clause ([-guard])
+
+    # adds literals of `cube` back to `core` until it no longer intersects the initial states
+    def exclude_init (self, core, cube):
+        core = list (core)
+        for literal in cube:
+            if not self.intersects_init (core):
+                break
+            if literal not in core:
+                core.append (literal)
+        return core
+
+    '''
+        Shrinks a cube blocked at `level` (`core` being the failed literals of the
+        blocking query): keeps the core, then tries to drop each remaining literal.
+    '''
+    def generalize (self, cube, core, level):
+        cube = self.exclude_init ([literal for literal in cube if literal in core], cube)
+        for literal in list (cube):
+            if literal not in cube or len (cube) == 1:
+                continue
+            candidate = [l for l in cube if l != literal]
+            if self.intersects_init (candidate):
+                continue
+            found, core = self.predecessor (candidate, level)
+            if not found:
+                cube = self.exclude_init ([l for l in candidate if l in core], candidate)
+        return cube
+
+    '''
+        Blocks the cube at `level`, recursively blocking its predecessors. Returns the
+        counterexample (a list of cubes from an initial state) if one of them is an
+        initial state, None otherwise.
+    '''
+    def block (self, cube, level):
+        top = len (self.frame_acts)
+        queue = [(level, self.counter, cube, None)]
+        while queue:
+            level, _, cube, successor = heapq.heappop (queue)
+            if level == 0:
+                trace = []
+                node = (cube, successor)
+                while node is not None:
+                    trace.append (node [0])
+                    node = node [1]
+                return trace
+            if self.blocked (cube, level):
+                continue
+            found, result = self.predecessor (cube, level)
+            self.counter += 1
+            if found:
+                predecessor_level = 0 if self.intersects_init (result) else level - 1
+                heapq.heappush (queue, (predecessor_level, self.counter, result, (cube, successor)))
+                heapq.heappush (queue, (level, self.counter, cube, successor))
+                continue
+            lemma_cube = self.generalize (cube, result, level)
+            while level < top and not self.predecessor (lemma_cube, level + 1) [0]:
+                level += 1
+            if not self.blocked (lemma_cube, level):
+                self.add_lemma ([-literal for literal in lemma_cube], level)
+            if level < top:
+                heapq.heappush (queue, (level + 1, self.counter, cube, successor))
+        return None
+
+    '''
+        Pushes every lemma of level i to level i+1 if it is inductive relative to F_i.
+        Returns the level i whose lemmas were all pushed (F_i = F_(i+1) is then an
+        inductive invariant), or None.
+    '''
+    def propagate (self):
+        top = len (self.frame_acts)
+        for i in range (1, top):
+            for clause in list (self.lemmas [i]):
+                cube = [-literal for literal in clause]
+                if not self.predecessor (cube, i + 1) [0]:
+                    self.lemmas [i].remove (clause)
+                    if not self.blocked (cube, i + 1):
+                        self.add_lemma (clause, i + 1)
+            if len (self.lemmas [i]) == 0:
+                return i
+        return None
+
+    '''
+        Runs IC3 with at most `max_frames` frames (and `timeout` seconds). Returns
+        [result, k] with result 10 (counterexample of k steps, in `trace`), 20 (proved
+        with k frames, the invariant being in `invariant`) or 0 (unknown).
+    '''
+    def check (self, max_frames, timeout = None):
+        if timeout is not None:
+            deadline = time.time () + timeout
+            self.solver.set_terminate (lambda: time.time () > deadline)
+        try:
+            if self.solve ([self.init_act, self.bad_act]) == 10:
+                self.trace = [self.get_cube ()]
+                return [10, 0]
+            self.new_frame ()
+            while True:
+                k = len (self.frame_acts)
+                while self.solve (self.frame_assumptions (k) + [self.bad_act]) == 10:
+                    trace = self.block (self.get_cube (), k)
+                    if trace is not None:
+                        self.trace = trace
+                        return [10, len (trace) - 1]
+                self.new_frame ()
+                level = self.propagate ()
+                if level is not None:
+                    self.invariant = [clause for lemmas in self.lemmas [level + 1:] for clause in lemmas]
+                    return [20, k]
+                if k >= max_frames:
+                    return [0, k]
+        except Interrupted:
+            return [0, len (self.frame_acts)]
+        finally:
+            if timeout is not None:
+                self.solver.set_terminate (None)
+
+    # names of the literals of a clause or a cube over the state variables
+    def literal_names (self, literals):
+        names = {var: self.cnfConverter.formula_parser.key_name (key)
+                 for key, var in self.cnfConverter.state_to_cnf_vars [0].items () if isinstance (key, tuple)}
+        return [names [abs (literal)] if literal > 0 else "~" + names [abs (literal)] for literal in literals]
+
+'''
+    Runs `PDR` and prints its verdict, the invariant or the counterexample. Returns
+    [result, k] as `PDR.check`.
+'''
+def prove (cnfConverter, max_frames, timeout = None, solver = None, verbose = True):
+    pdr = PDR (cnfConverter, solver)
+    try:
+        result, k = pdr.check (max_frames, timeout)
+        if verbose:
+            if result == 10:
+                for t, cube in enumerate (pdr.trace):
+                    print (f"step {t + 1}: " + " ".join (name for name in pdr.literal_names (cube) if not name.startswith ("~")))
+                print (f"SATISFIABLE. The property does not hold at step {k + 1}")
+            elif result == 20:
+                print ("Inductive invariant:")
+                for clause in pdr.invariant:
+                    print ("  " + " | ".join (pdr.literal_names (clause)))
+                print (f"UNSATISFIABLE: inductive invariant found with {k} frames. The property holds at every step!")
+            else:
+                budget = pdr.solver.budget
+                reason = f" ({budget.describe ()})" if budget is not None and budget.reason else ""
+                print (f"UNKNOWN: no invariant and no counterexample with {k} frames{reason}")
+        return [result, k]
+    finally:
+        pdr.release ()
@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from model_to_cnf import FileHandler, CNFConverter, Helper
+from caller import Solver, Budget, ClauseRing
+from kinduction import prove
+import pdr
+from cardinality import CardinalityEncoder
+from formula_cache import FormulaCache
+
+'''
+    Batch checking of many specifications, fanned out over a process pool with one
+    CaDiCaL instance per worker.
+
+    A problem is a specification, or a single safety property of a specification
+    (`per_property`). Each problem can be raced under several CaDiCaL option
+    configurations: the first configuration to reach a definite verdict wins, the
+    pending ones are cancelled and the running ones are stopped through
+    `ipasir_set_terminate`, by raising the problem's flag in a shared memory block
+    polled by the workers' terminate callbacks. Every run can also be given a budget
+    (timeout, conflicts, decisions, see `Budget`), after which it stops with an
+    UNKNOWN verdict and the reason, so that it can be retried with a larger budget.
+
+    With clause sharing (bmc and incremental engines), the configurations racing on a
+    problem also share their short learned clauses through a ring buffer in shared
+    memory (see `ClauseRing` and `Solver.share_clauses`), so that a clause learned by
+    one of them is not learned again by the others.
+
+    Example:
+        python portfolio.py input_files 10 --per-property --race --report report.json
+        python portfolio.py hard_specs 40 --engine incremental --race --share
+'''
+
+result_names = {10: "SAT", 20: "UNSAT", 0: "UNKNOWN"}
+
+# option configurations raced by --race: default, SAT-oriented and UNSAT-oriented search
+default_configs = [{}, {"stabilizeonly": 1}, {"stabilize": 0}, {"phase": 0}]
+
+'''
+    Returns the specifications to check: the JSON files of a directory, or the entries
+    of a manifest. A manifest is either a JSON list whose items are paths or objects
+    {"path": ..., "steps": ...}, or a text file with one path per line. Relative paths
+    are resolved against the manifest's directory.
+
+    Returns a list of (path, steps) pairs, steps being None when not given.
+'''
+def collect_specs (path):
+    if os.path.isdir(path):
+        return [(os.path.join(path, name), None) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".json")]
+    base = os.path.dirname(path)
+    with open(path, 'r') as f:
+        text = f.read()
+    try:
+        entries = json.loads(text)
+    except ValueError:
+        entries = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith('#')]
+    if isinstance(entries, dict):
+        # a single specification rather than a manifest
+        return [(path, None)]
+    specs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        specs.append((os.path.join(base, entry["path"]), entry.get("steps")))
+    return specs
+
+'''
+    Worker: encodes and solves one problem under one option configuration. Runs in a
+    pool process, with its own solver.
+'''
+def check_job (job):
+    start = time.time()
+    file = FileHandler(job["path"], None, None)
+    file.read_file()
+    data = file.data
+    if job["property"] is not None:
+        data[3] = [data[3][job["property"]]]
+
+    formula_cache = None
+    if job["cache_dir"] is not None:
+        formula_cache = FormulaCache(job["cache_dir"], job["cache_size"])
+
+    race = None
+    cancel = None
+    if job["race_memory"] is not None:
+        race = shared_memory.SharedMemory(name=job["race_memory"])
+        index = job["race"]
+        cancel = lambda: race.buf[index] != 0
+    budget = Budget(job["timeout"], job["conflicts"], job["decisions"], cancel)
+    ring = None
+    with Solver() as solver:
+        solver.verbose = False
+        for name, val in job["config"].items():
+            solver.set_option(name, val)
+        solver.set_budget(budget)
+        if job["share_ring"] is not None:
+            ring = ClauseRing(job["share_ring"])
+            solver.share_clauses(ring, job["worker"], job["share_length"])
+        try:
+            if job["engine"] == "kinduction":
+                cnfConverter = CNFConverter(1, 0, data, job["encoding"], job["int_encoding"], job["amo_encoding"],
+                                            formula_cache, job["semantics"], job["coi"])
+                with Solver() as step:
+                    step.verbose = False
+                    for name, val in job["config"].items():
+                        step.set_option(name, val)
+                    step.set_budget(budget)
+                    result, depth = prove(cnfConverter, job["steps"], job["simple_path"], None, solver, step, False)
+                    step.set_budget(None)
+            elif job["engine"] == "pdr":
+                cnfConverter = CNFConverter(1, 0, data, job["encoding"], job["int_encoding"], job["amo_encoding"],
+                                            formula_cache, job["semantics"], job["coi"])
+                result, depth = pdr.prove(cnfConverter, job["steps"], None, solver, False)
+            elif job["engine"] == "incremental":
+                cnfConverter = CNFConverter(1, 0, data, job["encoding"], job["int_encoding"], job["amo_encoding"],
+                                            formula_cache, job["semantics"], job["coi"])
+                next_step = lambda t: (cnfConverter.step_literals(t), cnfConverter.step_activation(t))
+                result, depth = solver.solve_incremental(next_step, job["steps"], None,
+                                                         cnfConverter.cumulative_assumptions)
+            else:
+                cnfConverter = CNFConverter(1, job["steps"], data, job["encoding"], job["int_encoding"],
+                                            job["amo_encoding"], formula_cache, job["semantics"], job["coi"], True)
+                result, depth = solver.solve_stream(cnfConverter.nvars, cnfConverter.clause_chunks(),
+                                                    list(cnfConverter.temporal_bool_vars.values()),
+                                                    cnfConverter.cumulative_assumptions)
+        finally:
+            solver.set_budget(None)
+            if race is not None:
+                race.close()
+            if ring is not None:
+                shared = solver.shared_clauses()
+                solver.share_clauses(None)
+                ring.close()
+
+    run = {"race": job["race"], "config": job["config"], "result": result_names.get(result, "UNKNOWN"),
+           "step": depth + 1, "time": time.time() - start}
+    if run["result"] == "UNKNOWN" and budget.reason is not None:
+        run["reason"] = budget.reason
+    if ring is not None:
+        run["shared_clauses"] = shared
+    if cnfConverter.cone_report is not None:
+        run["pruned_atoms"] = len(cnfConverter.cone_report["pruned_atoms"])
+        run["pruned_rules"] = len(cnfConverter.cone_report["pruned_rules"])
+    return run
+
+'''
+    Checks every problem of `path` (see `collect_specs`) with `workers` processes, and
+    returns the aggregated report: one entry per problem with its verdict, the step at
+    which it was reached, the winning configuration and the time of every run. With
+    the kinduction and pdr engines, UNSAT means that the property was proved for every
+    depth; both need a relational `semantics`. With `cache_dir`, the workers share a persistent cache of normalized formulas
+    (see `FormulaCache`) of at most `cache_size` bytes. With `cone_of_influence`, every
+    problem is reduced to the cone of its properties (of its single property with
+    `per_property`), and the runs report how many atoms and rules were pruned. Every
+    run is limited to `timeout` seconds, `conflicts` and `decisions` if given; a run
+    stopped by its budget reports UNKNOWN with the reason ("timeout", "conflicts" or
+    "decisions"; "cancelled" for the runs stopped by a race). A run that fails (e.g.,
+    on an unreadable specification) reports ERROR with the error, its problem getting
+    the ERROR verdict unless another run reaches a verdict; the rest of the batch
+    goes on. With `share_clauses`,
+    the runs racing on a problem share their learned clauses of at most
+    `share_length` literals, and report how many they exported and imported.
+'''
+def run_batch (path, steps, engine = "bmc", cnf_encoding = Helper.tseitin_encoding_str,
+               configs = None, workers = None, per_property = False, int_encoding = Helper.onehot_encoding_str,
+               amo_encoding = CardinalityEncoder.auto_str, cache_dir = None, cache_size = 256 * 1024 * 1024,
+               semantics = Helper.same_step_semantics_str, simple_path = False, cone_of_influence = False,
+               timeout = None, conflicts = None, decisions = None, share_clauses = False, share_length = 2):
+    if share_clauses and engine not in ("bmc", "incremental"):
+        raise ValueError("clause sharing is only supported by the bmc and incremental engines")
+    if engine in ("kinduction", "pdr") and semantics == Helper.same_step_semantics_str:
+        raise ValueError(f"the {engine} engine needs a relational semantics (\"sequential\" or \"parallel\")")
+    start = time.time()
+    configs = configs or [{}]
+    problems = []
+    for spec_path, spec_steps in collect_specs(path):
+        properties = [None]
+        if per_property:
+            file = FileHandler(spec_path, None, None)
+            try:
+                file.read_file()
+                properties = list(range(len(file.data[3])))
+            except (OSError, ValueError, KeyError):
+                # checked as a whole, its job reports the error
+                pass
+        for prop in properties:
+            problems.append({"path": spec_path, "property": prop,
+                             "steps": spec_steps if spec_steps is not None else steps,
+                             "verdict": "UNKNOWN", "step": None, "winner": None, "runs": []})
+
+    race_memory = None
+    if len(configs) > 1 and len(problems) > 0:
+        race_memory = shared_memory.SharedMemory(create=True, size=len(problems))
+        race_memory.buf[:len(problems)] = bytes(len(problems))
+    # one ring of learned clauses per raced problem
+    rings = []
+    if share_clauses and len(configs) > 1:
+        rings = [ClauseRing() for _ in problems]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for index, problem in enumerate(problems):
+                for worker, config in enumerate(configs):
+                    job = {"path": problem["path"], "property": problem["property"], "steps": problem["steps"],
+                           "engine": engine, "encoding": cnf_encoding, "int_encoding": int_encoding,
+                           "amo_encoding": amo_encoding, "semantics": semantics, "simple_path": simple_path,
+                           "coi": cone_of_influence,
+                           "timeout": timeout, "conflicts": conflicts, "decisions": decisions,
+                           "cache_dir": cache_dir, "cache_size": cache_size,
+                           "config": config, "race": index,
+                           "race_memory": race_memory.name if race_memory is not None else None,
+                           "share_ring": rings[index].name if rings else None, "worker": worker,
+                           "share_length": share_length}
+                    futures[executor.submit(check_job, job)] = (index, config)
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    run = future.result()
+                except Exception as exc:
+                    # a failing job (e.g., an unreadable specification) only fails its own run
+                    index, config = futures[future]
+                    run = {"race": index, "config": config, "result": "ERROR", "error": str(exc)}
+                problem = problems[run["race"]]
+                problem["runs"].append(run)
+                if run["result"] == "ERROR":
+                    if problem["winner"] is None:
+                        problem["verdict"] = "ERROR"
+                    continue
+                if run["result"] != "UNKNOWN" and problem["winner"] is None:
+                    problem["verdict"] = run["result"]
+                    problem["step"] = run["step"]
+                    problem["winner"] = run["config"]
+                    if race_memory is not None:
+                        race_memory.buf[run["race"]] = 1
+                        for other, (index, _) in futures.items():
+                            if index == run["race"]:
+                                other.cancel()
+    finally:
+        if race_memory is not None:
+            race_memory.close()
+            race_memory.unlink()
+        for ring in rings:
+            ring.close()
+            ring.unlink()
+
+    for problem in problems:
+        for run in problem["runs"]:
+            del run["race"]
+    return {"problems": problems, "wall_time": time.time() - start}
+
+'''
+    Parses a configuration given as "name=val,name=val" into a dictionary.
+'''
+def parse_config (text):
+    config = {}
+    for item in text.split(","):
+        if item.strip():
+            name, val = item.split("=")
+            config[name.strip()] = int(val)
+    return config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a directory or a manifest of specifications in parallel.")
+    parser.add_argument("path", help="directory of JSON specifications, or manifest file")
+    parser.add_argument("steps", type=int, help="steps (maximum depth for the incremental engine)")
+    parser.add_argument("--engine", choices=["bmc", "incremental", "kinduction", "pdr"], default="bmc")
+    parser.add_argument("--encoding", choices=Helper.cnf_encodings, default=Helper.tseitin_encoding_str)
+    parser.add_argument("--int-encoding", choices=Helper.int_encodings, default=Helper.onehot_encoding_str)
+    parser.add_argument("--amo-encoding", choices=CardinalityEncoder.encodings, default=CardinalityEncoder.auto_str)
+    parser.add_argument("--semantics", choices=Helper.semantics, default=Helper.same_step_semantics_str)
+    parser.add_argument("--simple-path", action="store_true", help="kinduction engine: simple-path constraints")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--per-property", action="store_true", help="check every safety property separately")
+    parser.add_argument("--config", action="append", type=parse_config, default=None,
+                        help="CaDiCaL options \"name=val,...\" to race; repeat for several configurations")
+    parser.add_argument("--race", action="store_true", help="race the default portfolio of configurations")
+    parser.add_argument("--report", default=None, help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--cache-dir", default=None, help="persistent cache of normalized formulas, shared by the workers")
+    parser.add_argument("--cache-size", type=int, default=256, help="maximum size of the cache directory, in MB (default: 256)")
+    parser.add_argument("--coi", action="store_true", help="cone-of-influence reduction of every problem")
+    parser.add_argument("--timeout", type=float, default=None, help="time budget of every run, in seconds")
+    parser.add_argument("--conflicts", type=int, default=None, help="conflict budget of every run")
+    parser.add_argument("--decisions", type=int, default=None, help="decision budget of every run")
+    parser.add_argument("--share", action="store_true",
+                        help="share learned clauses between the raced configurations (bmc and incremental engines)")
+    parser.add_argument("--share-length", type=int, default=2,
+                        help="longest learned clause shared, in literals (default: 2, units and binary clauses)")
+    args = parser.parse_args()
+    if args.engine in ("kinduction", "pdr") and args.semantics == Helper.same_step_semantics_str:
+        parser.error(f"the {args.engine} engine needs --semantics sequential or parallel")
+
+    configs = args.config or (default_configs if args.race else None)
+    report = run_batch(args.path, args.steps, args.engine, args.encoding, configs, args.workers, args.per_property,
+                       args.int_encoding, args.amo_encoding, args.cache_dir, args.cache_size * 1024 * 1024,
+                       args.semantics, args.simple_path, args.coi, args.timeout, args.conflicts, args.decisions,
+                       args.share, args.share_length)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,132 @@
+import cProfile
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from formula_cache import formula_memo
+
+# optional sampling profiler
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+'''
+    The `Profiler` class collects where a run spends its time and memory, stage by
+    stage (parse, normalize, encode, write, load, solve, ...): the wall-clock and CPU
+    time of every stage, and the peak resident set size of the process when the stage
+    ends, with its growth during the stage. It also gathers counters: the size of the
+    encoding (variables, clauses, literals, and the clauses and literals of every rule
+    per step, see `CNFConverter.rule_sizes`), the normalizations and the hits of the
+    memo of normalized formulas (see `formula_memo`), and the search statistics of the
+    CaDiCaL sessions (see `Solver.statistics`).
+
+    `report` returns all of it as a JSON-serializable dictionary. With `profile`
+    ("cprofile", or "pyinstrument" if installed), the whole run between `start` and
+    `stop` is also profiled function by function, and the profile dumped to a file.
+
+    Example:
+        profiler = Profiler ()
+        cnfConverter = spec2converter ("model.JSON", 10, 1, profiler = profiler)
+        with profiler.stage ("write"):
+            save_cnf (cnfConverter, "model.JSON", "out", 10)
+        profiler.record_converter (cnfConverter)
+        profiler.dump ("stats.json")
+'''
+
+profilers = ["cprofile", "pyinstrument"]
+
+# peak resident set size of the process, in bytes (ru_maxrss is in kilobytes on Linux)
+def peak_rss ():
+    rss = resource.getrusage (resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+class Profiler:
+    def __init__ (self, profile = None):
+        if profile == "pyinstrument" and pyinstrument is None:
+            raise ValueError ("the pyinstrument profiler is not installed")
+        self.profile = profile
+        self.session = None
+        self.stages = {}
+        self.counters = {}
+        self.rules = {}
+        self.solvers = {}
+        self.memo_hits = formula_memo.hits
+        self.memo_misses = formula_memo.misses
+
+    '''
+        Context manager timing a stage. A stage entered several times (e.g., one solver
+        call per depth) accumulates its times and counts its calls.
+    '''
+    @contextmanager
+    def stage (self, name):
+        wall = time.perf_counter ()
+        cpu = time.process_time ()
+        rss = peak_rss ()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault (name, {"wall": 0.0, "cpu": 0.0, "calls": 0, "peak_rss": 0, "rss_growth": 0})
+            stage ["wall"] += time.perf_counter () - wall
+            stage ["cpu"] += time.process_time () - cpu
+            stage ["calls"] += 1
+            stage ["peak_rss"] = peak_rss ()
+            stage ["rss_growth"] += stage ["peak_rss"] - rss
+
+    # wall-clock time of a stage, 0 if it did not run
+    def wall (self, name):
+        return self.stages [name] ["wall"] if name in self.stages else 0.0
+
+    def count (self, name, value = 1):
+        self.counters [name] = self.counters.get (name, 0) + value
+
+    # size of the encoding of `cnfConverter`
+    def record_converter (self, cnfConverter):
+        self.counters ["steps"] = cnfConverter.steps
+        self.counters ["step_vars"] = cnfConverter.step_nvars
+        self.counters ["vars"] = cnfConverter.nvars
+        self.counters ["clauses"] = cnfConverter.nclauses
+        self.counters ["literals"] = cnfConverter.nliterals
+        self.counters ["auxiliary_atoms"] = len (cnfConverter.auxiliary_atoms)
+        self.rules = {name: {"clauses": size [0], "literals": size [1]} for name, size in cnfConverter.rule_sizes.items ()}
+
+    # search statistics of a CaDiCaL session, under `name`
+    def record_solver (self, solver, name = "solver"):
+        self.solvers [name] = solver.statistics ()
+
+    def start (self):
+        if self.profile == "cprofile":
+            self.session = cProfile.Profile ()
+            self.session.enable ()
+        elif self.profile == "pyinstrument":
+            self.session = pyinstrument.Profiler ()
+            self.session.start ()
+
+    '''
+        Stops the function profile, and dumps it to `path`: pstats data with cProfile
+        (to read with `python -m pstats`), an HTML page (.html) or a text tree with
+        pyinstrument.
+    '''
+    def stop (self, path):
+        if self.session is None:
+            return
+        if self.profile == "cprofile":
+            self.session.disable ()
+            self.session.dump_stats (path)
+        else:
+            self.session.stop ()
+            with open (path, 'w') as f:
+                f.write (self.session.output_html () if path.endswith (".html") else self.session.output_text ())
+        self.session = None
+
+    def report (self):
+        counters = dict (self.counters)
+        counters ["normalize_calls"] = formula_memo.hits + formula_memo.misses - self.memo_hits - self.memo_misses
+        counters ["normalize_memo_hits"] = formula_memo.hits - self.memo_hits
+        return {"stages": self.stages, "counters": counters, "rules": self.rules, "solvers": self.solvers,
+                "peak_rss": peak_rss ()}
+
+    def dump (self, path):
+        with open (path, 'w') as f:
+            json.dump (self.report (), f, indent=2)
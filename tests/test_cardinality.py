@@ -0,0 +1,63 @@
+import itertools
+from cardinality import CardinalityEncoder
+from caller import Solver
+
+# Run from the repository root (python -m pytest tests): caller.py loads ./cadical-lib/libcadical.so.
+
+encodings = [CardinalityEncoder.auto_str, CardinalityEncoder.pairwise_str, CardinalityEncoder.sequential_str,
+             CardinalityEncoder.commander_str, CardinalityEncoder.product_str, CardinalityEncoder.ladder_str]
+
+def encoder ():
+    counter = itertools.count()
+    return CardinalityEncoder(lambda: f"AUX{next(counter)}")
+
+# a session with the clauses, the inputs being its variables 1..n
+def session (clauses, inputs):
+    ids = {name: i + 1 for i, name in enumerate(inputs)}
+    def literal (name):
+        negated = name.startswith("~")
+        var = ids.setdefault(name.lstrip("~"), len(ids) + 1)
+        return -var if negated else var
+    solver = Solver()
+    solver.verbose = False
+    solver.add_clauses([[literal(name) for name in clause] for clause in clauses])
+    return solver
+
+# the assignments of `inputs` (as tuples of booleans) under which the clauses are satisfiable
+def projected_models (clauses, inputs):
+    models = set()
+    with session(clauses, inputs) as solver:
+        for values in itertools.product([False, True], repeat=len(inputs)):
+            solver.add_assmuptions([i + 1 if value else -(i + 1) for i, value in enumerate(values)])
+            if solver.solve() == 10:
+                models.add(values)
+    return models
+
+def test_at_most_one ():
+    for n in range(1, 11):
+        inputs = [f"x_{i}" for i in range(n)]
+        expected = {values for values in itertools.product([False, True], repeat=n) if sum(values) <= 1}
+        for encoding in encodings:
+            assert projected_models(encoder().at_most_one(inputs, encoding), inputs) == expected, (encoding, n)
+
+def test_exactly_one ():
+    for n in range(1, 11):
+        inputs = [f"x_{i}" for i in range(n)]
+        expected = {values for values in itertools.product([False, True], repeat=n) if sum(values) == 1}
+        for encoding in encodings:
+            assert projected_models(encoder().exactly_one(inputs, encoding), inputs) == expected, (encoding, n)
+
+# recursive product and commander encodings: every assignment with at most two true inputs
+def test_large_domains ():
+    n = 40
+    inputs = [f"x_{i}" for i in range(n)]
+    for encoding in encodings:
+        for exactly in [False, True]:
+            enc = encoder()
+            clauses = enc.exactly_one(inputs, encoding) if exactly else enc.at_most_one(inputs, encoding)
+            with session(clauses, inputs) as solver:
+                for true_inputs in itertools.chain([()], itertools.combinations(range(n), 1),
+                                                   itertools.combinations(range(n), 2)):
+                    solver.add_assmuptions([i + 1 if i in true_inputs else -(i + 1) for i in range(n)])
+                    expected = 10 if len(true_inputs) == 1 or (len(true_inputs) == 0 and not exactly) else 20
+                    assert solver.solve() == expected, (encoding, exactly, true_inputs)
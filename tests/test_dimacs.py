@@ -0,0 +1,51 @@
+import random
+import pytest
+import dimacs
+from dimacs import DimacsWriter, read_dimacs
+from clause_db import ClauseDatabase
+
+def random_clauses (seed, count = 500, nvars = 120):
+    rng = random.Random(seed)
+    return [[rng.choice([-1, 1]) * rng.randint(1, nvars) for _ in range(rng.randint(1, 6))] for _ in range(count)]
+
+@pytest.fixture(params=["native", "python"])
+def tokenizer (request, monkeypatch):
+    if request.param == "native":
+        if dimacs.native is None:
+            pytest.skip("helper library not built (make -C cadical-lib)")
+    else:
+        monkeypatch.setattr(dimacs, "native", None)
+    return request.param
+
+# counts collected while writing (patched header) or given up front, small buffers and blocks
+@pytest.mark.parametrize("extension", [".cnf", ".cnf.gz", ".cnf.xz"])
+@pytest.mark.parametrize("known", [False, True])
+def test_round_trip (tmp_path, tokenizer, extension, known):
+    clauses = random_clauses(len(extension) + known)
+    nvars = max(abs(literal) for clause in clauses for literal in clause)
+    path = str(tmp_path / ("model" + extension))
+    with DimacsWriter(path, nvars if known else None, len(clauses) if known else None, buffer_size = 256) as writer:
+        writer.write_clauses(clauses[:100])
+        database = ClauseDatabase()
+        database.extend(clauses[100:])
+        writer.write_clauses(database)
+    assert [writer.nvars, writer.nclauses] == [nvars, len(clauses)]
+    header_nvars, header_nclauses, read = read_dimacs(path, block_size = 512)
+    assert [header_nvars, header_nclauses] == [nvars, len(clauses)]
+    assert list(read) == clauses
+    if extension == ".cnf" and not known:
+        with open(path) as f:
+            header = f.readline()
+        assert len(header) == DimacsWriter.header_width and header.split() == ["p", "cnf", str(nvars), str(len(clauses))]
+
+# comments, a header after them and the "%" end marker
+def test_special_lines (tmp_path, tokenizer):
+    path = tmp_path / "bench.cnf"
+    path.write_text("c generated\nc by hand\np cnf 3 2\n1 -2 0\nc inside\n2 3\n 0\n%\n0\n")
+    nvars, nclauses, clauses = read_dimacs(str(path))
+    assert [nvars, nclauses, list(clauses)] == [3, 2, [[1, -2], [2, 3]]]
+
+def test_wrong_clause_count (tmp_path):
+    with pytest.raises(ValueError):
+        with DimacsWriter(str(tmp_path / "model.cnf"), 2, 3) as writer:
+            writer.write_clauses([[1, 2], [-1]])
@@ -0,0 +1,74 @@
+import itertools
+from model_to_cnf import Atom
+from int_comp import IntComparator
+from caller import Solver
+
+# Run from the repository root (python -m pytest tests): caller.py loads ./cadical-lib/libcadical.so.
+
+encodings = [IntComparator.onehot_encoding_str, IntComparator.log_encoding_str, IntComparator.order_encoding_str]
+
+# 0..n-1 (the log encoding is then a bit-vector of the value) and a sparse domain
+domains = [[str(i) for i in range(5)], ["2", "3", "5", "7"]]
+
+# the values of the boolean atoms encoding `atom` = `val`
+def assignment (atom, val):
+    i = atom.domain.index(val)
+    if atom.encoding == IntComparator.log_encoding_str:
+        return {bit: bool((i >> b) & 1) for b, bit in enumerate(atom.bits)}
+    if atom.encoding == IntComparator.order_encoding_str:
+        return {bit: j < i for j, bit in enumerate(atom.bits)}
+    return {atom.symbol + "_" + other: other == val for other in atom.domain}
+
+'''
+    Checks `compare (left, op, right)` against `holds` for every value of the atoms
+    among `left` and `right` (an `Atom` or an int each): the atoms are fixed by
+    assumptions, and the literal returned must take the value of the comparison.
+'''
+def check (left, op, right):
+    counter = itertools.count()
+    comparator = IntComparator(lambda: f"AUX{next(counter)}")
+    lit = comparator.compare(left, op, right)
+    atoms = [side for side in (left, right) if isinstance(side, Atom)]
+    ids = {}
+    def var (name):
+        return ids.setdefault(name.lstrip("~"), len(ids) + 1)
+    def literal (name):
+        return -var(name) if name.startswith("~") else var(name)
+    with Solver() as solver:
+        solver.verbose = False
+        solver.add_clauses([[literal(name) for name in clause] for clause in comparator.take_clauses()])
+        for values in itertools.product(*[atom.domain for atom in atoms]):
+            fixed = {}
+            for atom, val in zip(atoms, values):
+                fixed.update(assignment(atom, val))
+            solver.add_assmuptions([var(name) if value else -var(name) for name, value in fixed.items()])
+            assert solver.solve() == 10, (left, op, right, values)
+            value = iter(int(val) for val in values)
+            x = next(value) if isinstance(left, Atom) else left
+            y = next(value) if isinstance(right, Atom) else right
+            expected = comparator.holds(x, op, y)
+            got = lit if isinstance(lit, bool) else solver.val(literal(lit)) == literal(lit)
+            assert got == expected, (left.symbol if isinstance(left, Atom) else left, op,
+                                     right.symbol if isinstance(right, Atom) else right, x, y)
+
+def test_atom_and_atom ():
+    for x_encoding, y_encoding in itertools.product(encodings, repeat=2):
+        for x_domain, y_domain in itertools.product(domains, repeat=2):
+            x = Atom("x", "int", x_domain, x_encoding)
+            y = Atom("y", "int", y_domain, y_encoding)
+            for op in IntComparator.operators:
+                check(x, op, y)
+
+def test_atom_and_constant ():
+    for encoding in encodings:
+        for domain in domains:
+            x = Atom("x", "int", domain, encoding)
+            for op in IntComparator.operators:
+                for k in range(0, 10):
+                    check(x, op, k)
+                    check(k, op, x)
+
+def test_constants ():
+    for op in IntComparator.operators:
+        for a, b in itertools.product(range(3), repeat=2):
+            assert IntComparator(None).compare(a, op, b) == IntComparator(None).holds(a, op, b)
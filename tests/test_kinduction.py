@@ -0,0 +1,28 @@
+from model_to_cnf import CNFConverter, specification_data
+from kinduction import prove
+
+# Run from the repository root (python -m pytest tests): caller.py loads ./cadical-lib/libcadical.so.
+
+# a conjunction of disjunctions, left untouched by the only rules (which toggle e): 1-inductive
+invariant = {
+    "states": {"boolean": {name: ["true", "false"] for name in "abcde"}},
+    "init": "a,~b,c,~d,~e",
+    "transitions": {"set_e": {"preconditions": ["~e"], "effects": ["e"]},
+                    "reset_e": {"preconditions": ["e"], "effects": ["~e"]}},
+    "safety": ["(a | b) & (c | d)"]}
+
+def check (spec, encoding, semantics, max_k = 5):
+    cnfConverter = CNFConverter(1, 0, specification_data(spec), encoding, "onehot", "auto", None, semantics)
+    return prove(cnfConverter, max_k, verbose = False)
+
+# the induction hypothesis must not be met by breaking the definitions of the auxiliary atoms
+def test_structural_encodings_prove_invariant ():
+    for encoding in ["sympy", "tseitin", "pg"]:
+        for semantics in ["sequential", "parallel"]:
+            assert check(invariant, encoding, semantics) == [20, 0], (encoding, semantics)
+
+def test_violation_is_found ():
+    spec = dict(invariant, safety = ["(a | b) & e"])
+    for encoding in ["sympy", "tseitin", "pg"]:
+        result, k = check(spec, encoding, "sequential")
+        assert result == 10 and k == 0, encoding
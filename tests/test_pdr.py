@@ -0,0 +1,31 @@
+import json
+from model_to_cnf import CNFConverter, specification_data
+from caller import Solver
+import pdr
+
+# Run from the repository root (python -m pytest tests): caller.py loads ./cadical-lib/libcadical.so.
+
+with open("input_files/model2.JSON") as f:
+    model2 = json.load(f)
+
+def converter (safety, steps, streaming = False):
+    return CNFConverter(1, steps, specification_data(dict(model2, safety = safety)), "tseitin", "onehot", "auto",
+                        None, "sequential", False, streaming)
+
+def bmc (safety, steps):
+    cnfConverter = converter(safety, steps, True)
+    with Solver() as solver:
+        solver.verbose = False
+        return solver.solve_stream(cnfConverter.nvars, cnfConverter.clause_chunks(),
+                                   list(cnfConverter.temporal_bool_vars.values()), cnfConverter.cumulative_assumptions)
+
+# error is only raised together with index_5
+def test_property_is_proved ():
+    result, k = pdr.prove(converter(["~error | index_5"], 0), 20, verbose = False)
+    assert result == 20
+
+def test_violation_matches_bmc ():
+    for safety in [["~error"], ["~my_list_three_14"], ["~(index_3 & array_end)"]]:
+        result, k = pdr.prove(converter(safety, 0), 20, verbose = False)
+        assert result == 10, safety
+        assert [result, k] == list(bmc(safety, 12)), safety
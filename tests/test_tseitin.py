@@ -0,0 +1,57 @@
+import itertools
+import random
+from sympy import symbols, true, false
+from sympy.logic.boolalg import And, Or, Not, Implies, Equivalent, Xor, ITE, to_cnf
+from tseitin import TseitinEncoder
+from caller import Solver
+
+# Run from the repository root (python -m pytest tests): caller.py loads ./cadical-lib/libcadical.so.
+
+atoms = symbols("a b c d")
+
+def random_formula (rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        atom = rng.choice(atoms)
+        return Not(atom) if rng.random() < 0.5 else atom
+    op = rng.choice([And, Or, Not, Implies, Equivalent, Xor, ITE])
+    if op is Not:
+        return Not(random_formula(rng, depth - 1))
+    arity = 3 if op is ITE else 2 if op in (Implies, Equivalent) else rng.choice([2, 3])
+    return op(*[random_formula(rng, depth - 1) for _ in range(arity)])
+
+# the assignments of the atoms (as tuples of booleans) under which the clauses are satisfiable
+def projected_models (clauses):
+    ids = {atom.name: i + 1 for i, atom in enumerate(atoms)}
+    def literal (name):
+        negated = name.startswith("~")
+        var = ids.setdefault(name.lstrip("~"), len(ids) + 1)
+        return -var if negated else var
+    models = set()
+    with Solver() as solver:
+        solver.verbose = False
+        solver.add_clauses([[literal(name) for name in clause] for clause in clauses])
+        for values in itertools.product([False, True], repeat=len(atoms)):
+            solver.add_assmuptions([i + 1 if value else -(i + 1) for i, value in enumerate(values)])
+            if solver.solve() == 10:
+                models.add(values)
+    return models
+
+def truth_table (expr):
+    return {values for values in itertools.product([False, True], repeat=len(atoms))
+            if expr.xreplace(dict(zip(atoms, [true if value else false for value in values]))) == true}
+
+def test_structural_encodings_match_to_cnf ():
+    rng = random.Random(7)
+    for _ in range(200):
+        expr = random_formula(rng, 3)
+        expected = truth_table(to_cnf(expr))
+        for plaisted_greenbaum in [False, True]:
+            counter = itertools.count()
+            encoder = TseitinEncoder(lambda: f"AUX{next(counter)}", plaisted_greenbaum)
+            assert projected_models(encoder.encode(expr)) == expected, (expr, plaisted_greenbaum)
+
+def test_constants ():
+    for expr, expected in [(true, 16), (false, 0), (Or(atoms[0], false), 8), (And(atoms[0], true), 8)]:
+        counter = itertools.count()
+        clauses = TseitinEncoder(lambda: f"AUX{next(counter)}", True).encode(expr)
+        assert len(projected_models(clauses)) == expected, expr
@@ -0,0 +1,202 @@
+from sympy import Symbol
+from sympy.logic.boolalg import And, Or, Not, Implies, Equivalent, Xor, ITE, BooleanTrue, BooleanFalse
+
+'''
+    The `TseitinEncoder` class converts a SymPy boolean expression into CNF using
+    structural (Tseitin) encoding. Every non-literal sub-formula is named by a fresh
+    auxiliary atom, so the number of clauses grows linearly with the size of the
+    formula, instead of exponentially as with distribution-based `to_cnf`.
+
+    With `plaisted_greenbaum` enabled, only the implication direction required by the
+    polarity of a sub-formula is emitted (Plaisted-Greenbaum encoding), which roughly
+    halves the number of definition clauses. The result is equisatisfiable with the
+    input, which is all we need since every encoded formula is asserted.
+
+    Top-level conjunctions are split into separate clauses, and top-level disjunctions
+    of literals are emitted as they are, so a formula that is already in CNF is returned
+    unchanged and no auxiliary atom is introduced for it.
+
+    Attributes:
+        new_auxiliary_atom (callable): Returns the name of a fresh auxiliary atom each
+                                       time it is called.
+        plaisted_greenbaum (bool): Emit polarity-based (one-sided) definitions.
+
+    Example:
+        Input: Implies(index_0 | loop_cond, index_1 & ~error)
+        Output: [['~AUX0', 'index_1'], ['~AUX0', '~error'], ['~index_0', 'AUX0'], ['~loop_cond', 'AUX0']]
+                (with plaisted_greenbaum=True, modulo ordering)
+'''
+
+class TseitinEncoder:
+    negation_str = "~"
+    logicalANDstr = "&"
+    logicalORstr = "|"
+
+    def __init__ (self, new_auxiliary_atom, plaisted_greenbaum = False):
+        self.new_auxiliary_atom = new_auxiliary_atom
+        self.plaisted_greenbaum = plaisted_greenbaum
+        self.clauses = []
+        self.definitions = {}
+
+    def negate (self, lit):
+        if lit.startswith (self.negation_str):
+            return lit [1:]
+        return self.negation_str + lit
+
+    '''
+        Rewrites implications, and pushes a negation through a conjunction or a
+        disjunction, so that every remaining node is one of Symbol, Not, And, Or,
+        Equivalent, Xor or ITE.
+    '''
+    def simplify_node (self, expr):
+        if isinstance (expr, Implies):
+            return Or (Not (expr.args[0]), expr.args[1])
+        if isinstance (expr, Not):
+            arg = expr.args[0]
+            if isinstance (arg, Not):
+                return arg.args[0]
+            if isinstance (arg, And):
+                return Or (*[Not (a) for a in arg.args])
+            if isinstance (arg, Or):
+                return And (*[Not (a) for a in arg.args])
+            if isinstance (arg, Implies):
+                return And (arg.args[0], Not (arg.args[1]))
+        return expr
+
+    '''
+        Returns a literal equisatisfiably representing `expr` in the given polarity
+        (1: only used positively, -1: only used negatively, 0: both). Definitions are
+        cached per (sub-formula, polarity), so shared sub-formulas are encoded once.
+    '''
+    def literal (self, expr, polarity):
+        expr = self.simplify_node (expr)
+        if isinstance (expr, Symbol):
+            return expr.name
+        if isinstance (expr, Not):
+            return self.negate (self.literal (expr.args[0], -polarity))
+        if isinstance (expr, (BooleanTrue, BooleanFalse)):
+            aux = self.new_auxiliary_atom ()
+            self.clauses.append ([aux if isinstance (expr, BooleanTrue) else self.negate (aux)])
+            return aux
+
+        if not self.plaisted_greenbaum:
+            polarity = 0
+        key = (expr, polarity)
+        if key in self.definitions:
+            return self.definitions [key]
+        aux = self.new_auxiliary_atom ()
+        self.definitions [key] = aux
+        pos = polarity >= 0
+        neg = polarity <= 0
+
+        if isinstance (expr, (And, Or)):
+            lits = [self.literal (arg, polarity) for arg in expr.args]
+            head = aux
+            if isinstance (expr, Or):
+                # aux <-> (l1 | ... | ln)  ==  ~aux <-> (~l1 & ... & ~ln)
+                head, lits = self.negate (aux), [self.negate (l) for l in lits]
+                pos, neg = neg, pos
+            if pos:
+                for l in lits:
+                    self.clauses.append ([self.negate (head), l])
+            if neg:
+                self.clauses.append ([self.negate (l) for l in lits] + [head])
+        elif isinstance (expr, (Equivalent, Xor)):
+            lits = [self.literal (arg, 0) for arg in expr.args]
+            if isinstance (expr, Equivalent):
+                # Equivalent(l1, ..., ln): all true or all false
+                for a, b in zip (lits, lits[1:] + lits[:1]):
+                    if pos:
+                        self.clauses.append ([self.negate (aux), self.negate (a), b])
+                if neg:
+                    self.clauses.append ([aux] + [self.negate (l) for l in lits])
+                    self.clauses.append ([aux] + lits)
+            else:
+                acc = lits [0]
+                for l in lits [1:]:
+                    acc = self.xor2 (acc, l)
+                if pos:
+                    self.clauses.append ([self.negate (aux), acc])
+                if neg:
+                    self.clauses.append ([aux, self.negate (acc)])
+        elif isinstance (expr, ITE):
+            c, a, b = [self.literal (arg, 0 if i == 0 else polarity) for i, arg in enumerate (expr.args)]
+            if pos:
+                self.clauses.append ([self.negate (aux), self.negate (c), a])
+                self.clauses.append ([self.negate (aux), c, b])
+            if neg:
+                self.clauses.append ([aux, self.negate (c), self.negate (a)])
+                self.clauses.append ([aux, c, self.negate (b)])
+        else:
+            raise ValueError (f"Unsupported boolean operator: {expr.func.__name__}")
+        return aux
+
+    def xor2 (self, a, b):
+        x = self.new_auxiliary_atom ()
+        self.clauses.append ([self.negate (x), a, b])
+        self.clauses.append ([self.negate (x), self.negate (a), self.negate (b)])
+        self.clauses.append ([x, self.negate (a), b])
+        self.clauses.append ([x, a, self.negate (b)])
+        return x
+
+    '''
+        Splits a disjunction into its disjuncts, flattening nested disjunctions and
+        negated conjunctions, so that a clause-shaped formula needs no auxiliary atom.
+    '''
+    def disjuncts (self, expr):
+        expr = self.simplify_node (expr)
+        if isinstance (expr, Or):
+            result = []
+            for arg in expr.args:
+                result.extend (self.disjuncts (arg))
+            return result
+        return [expr]
+
+    def conjuncts (self, expr):
+        expr = self.simplify_node (expr)
+        if isinstance (expr, And):
+            result = []
+            for arg in expr.args:
+                result.extend (self.conjuncts (arg))
+            return result
+        return [expr]
+
+    '''
+        Encodes `expr` and returns the list of clauses, each clause being a list of
+        literal strings (e.g., ['~door_open', 'AUX3']).
+    '''
+    def encode (self, expr):
+        self.clauses = []
+        self.definitions = {}
+        top = []
+        for conjunct in self.conjuncts (expr):
+            if isinstance (conjunct, BooleanTrue):
+                continue
+            clause = [self.literal (d, 1) for d in self.disjuncts (conjunct)
+                      if not isinstance (d, BooleanFalse)]
+            if len (clause) == 0:
+                # unsatisfiable conjunct: assert both phases of a fresh atom
+                aux = self.new_auxiliary_atom ()
+                top.extend ([[aux], [self.negate (aux)]])
+            else:
+                top.append (clause)
+        clauses = top + self.clauses
+        if len (clauses) == 0:
+            # valid formula: keep a tautology so that the CNF text is never empty
+            aux = self.new_auxiliary_atom ()
+            clauses.append ([aux, self.negate (aux)])
+        self.clauses = []
+        return clauses
+
+    '''
+        Formats clauses in the textual CNF form produced by `str(to_cnf(...))` with spaces
+        removed, e.g., "(~AUX0|index_1)&~error".
+    '''
+    def to_string (self, clauses):
+        parts = []
+        for clause in clauses:
+            if len (clause) == 1:
+                parts.append (clause [0])
+            else:
+                parts.append ("(" + self.logicalORstr.join (clause) + ")")
+        return self.logicalANDstr.join (parts)